@@ -1,4 +1,10 @@
+VALID_STATUSES = ('open', 'in_progress', 'completed', 'cancelled')
+
+
 class Task:
+    __slots__ = ('_id', '_title', '_description', '_created_by_user_id', '_accepted_by_user_id',
+                 '_status', '_price', '_deadline', '_created_at', '_updated_at')
+
     def __init__(self, id: int, title: str, created_by_user_id: int,
                  description: str = None, accepted_by_user_id: int = None,
                  status: str = 'open', price: float = None, deadline: str = None,
@@ -15,9 +21,17 @@ class Task:
         self._updated_at = updated_at
         
         # Валидация статуса
-        valid_statuses = ['open', 'in_progress', 'completed', 'cancelled']
-        if self._status not in valid_statuses:
-            raise ValueError(f"Status must be one of {valid_statuses}, got '{self._status}'")
+        if self._status not in VALID_STATUSES:
+            raise ValueError(f"Status must be one of {list(VALID_STATUSES)}, got '{self._status}'")
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def updated_at(self):
+        """Версия строки для ETag"""
+        return self._updated_at
 
     def to_dict(self):
         return {
@@ -32,4 +46,3 @@ class Task:
             "created_at": self._created_at,
             "updated_at": self._updated_at
         }
-
@@ -1,8 +1,11 @@
 class User:
+    __slots__ = ('_id', '_first_name', '_last_name', '_middle_name', '_email', '_phone', '_password',
+                 '_order_count', '_balance', '_registration_date', '_last_login', '_is_active', '_rating', '_updated_at')
+
     def __init__(self, id: int, first_name: str,
      last_name: str, middle_name: str, email: str, phone: str, order_count: int,
      balance: float, registration_date: str, last_login: str,
-     is_active: bool, password: str, rating: float = 0.0):
+     is_active: bool, password: str, rating: float = 0.0, updated_at: str = None):
         self._id = id
         self._first_name = first_name
         self._last_name = last_name
@@ -16,8 +19,18 @@ class User:
         self._last_login = last_login
         self._is_active = is_active
         self._rating = rating
+        self._updated_at = updated_at
     
 
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def updated_at(self):
+        """Версия строки для ETag"""
+        return self._updated_at
+
     def to_dict(self):
         return {
             "id": self._id,
@@ -31,5 +44,6 @@ class User:
             "registration_date": self._registration_date,
             "last_login": self._last_login,
             "is_active": self._is_active,
-            "rating": self._rating
+            "rating": self._rating,
+            "updated_at": self._updated_at
         }
@@ -1,26 +1,70 @@
-from fastapi import FastAPI
-from routers import main, users, tasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from database.async_connection import AsyncDatabaseConnection
+from database.config import USE_ASYNC_DB
+from database.connection import DatabaseConnection
+from routers import main, users, tasks, notifications, admin
+from routers.middleware import ReadSessionMiddleware
+from routers.responses import UTF8ORJSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Открывает пул соединений при старте приложения и закрывает при остановке"""
+    if USE_ASYNC_DB:
+        await AsyncDatabaseConnection.initialize_pool()
+    else:
+        # Прогрев: min_conn соединений открываются до первого запроса
+        await run_in_threadpool(DatabaseConnection.get_connection_pool)
+    yield
+    if USE_ASYNC_DB:
+        await AsyncDatabaseConnection.close_pool()
+    DatabaseConnection.close_all_connections()
+
 
 # Создание экземпляра приложения FastAPI
 app = FastAPI(
     title="JobDesk API",
     description="API for the JobDesk project",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson + charset=utf-8 в media type для всех ответов
+    default_response_class=UTF8ORJSONResponse
 )
 
-# Устанавливаем кодировку UTF-8 для всех ответов
-@app.middleware("http")
-async def add_charset_header(request, call_next):
-    response = await call_next(request)
-    if response.headers.get("content-type", "").startswith("application/json"):
-        response.headers["content-type"] = "application/json; charset=utf-8"
-    return response
+# Чтение с реплик и возврат к основной БД после записи клиента (database/routing.py)
+app.add_middleware(ReadSessionMiddleware)
+
+# Ошибки отдаются тем же классом ответа, что и данные (UTF-8 в content-type)
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request, exc):
+    return UTF8ORJSONResponse({"detail": exc.detail}, status_code=exc.status_code,
+                              headers=getattr(exc, "headers", None))
+
+
+@app.exception_handler(RequestValidationError)
+async def validation_exception_handler(request, exc):
+    return UTF8ORJSONResponse({"detail": jsonable_encoder(exc.errors())}, status_code=422)
+
 
 # Подключение роутеров
 app.include_router(main.router)
 app.include_router(users.router)
 app.include_router(tasks.router)
+app.include_router(notifications.router)
+app.include_router(admin.router)
+
 
+# Эндпоинт для экспорта метрик (кэш сущностей и т.д.)
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Эндпоинт для Prometheus метрик"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,77 @@
+"""
+Скорость массового импорта задач через COPY (repositories/bulk.py)
+в сравнении с INSERT по одной строке.
+
+Скрипт генерирует CSV на --rows задач во временный файл, импортирует его,
+замеряет INSERT по строке на --insert-rows задачах и удаляет все
+созданные задачи. Нужен хотя бы один пользователь в "User".
+
+Запуск:
+    python -m benchmarks.bench_bulk_import --rows 1000000 --insert-rows 10000
+"""
+import argparse
+import csv
+import sys
+import tempfile
+import time
+
+from database.connection import DatabaseConnection, get_db_cursor
+from repositories.bulk import import_tasks
+
+MARKER = "bulk-benchmark"
+
+
+def write_csv(path: str, rows: int, user_id: int):
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        writer = csv.writer(out)
+        writer.writerow(["title", "description", "created_by_user_id", "status", "price", "deadline"])
+        for index in range(rows):
+            writer.writerow([f"{MARKER} {index}", f"Задача для бенчмарка {index}", user_id,
+                             "open", index % 10000 / 10, "2030-01-01T00:00:00"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--insert-rows", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute('SELECT min(id) FROM "User"')
+            user_id = cursor.fetchone()[0]
+        if user_id is None:
+            print("No users found: seed at least one row into \"User\" first")
+            return 1
+
+        with tempfile.NamedTemporaryFile(suffix=".csv") as source:
+            write_csv(source.name, args.rows, user_id)
+            started = time.perf_counter()
+            with open(source.name, encoding="utf-8", newline="") as lines:
+                result = import_tasks(lines, "csv", sys.stdout, args.batch_size)
+            copy_seconds = time.perf_counter() - started
+        print(f"COPY import: {result.imported} rows in {copy_seconds:.1f} s "
+              f"({result.imported / copy_seconds:.0f} rows/s), rejected {result.rejected}")
+
+        started = time.perf_counter()
+        for index in range(args.insert_rows):
+            with get_db_cursor() as cursor:
+                cursor.execute(
+                    "INSERT INTO Task (title, description, created_by_user_id, status, price, deadline) "
+                    "VALUES (%s, %s, %s, 'open', %s, '2030-01-01')",
+                    (f"{MARKER} insert {index}", "Задача для бенчмарка", user_id, index % 10000 / 10)
+                )
+        insert_seconds = time.perf_counter() - started
+        insert_rate = args.insert_rows / insert_seconds
+        print(f"INSERT per row: {args.insert_rows} rows in {insert_seconds:.1f} s ({insert_rate:.0f} rows/s), "
+              f"{args.rows} rows would take ~{args.rows / insert_rate / 60:.0f} min")
+    finally:
+        with get_db_cursor() as cursor:
+            cursor.execute("DELETE FROM Task WHERE title LIKE %s", (f"{MARKER}%",))
+        DatabaseConnection.close_all_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
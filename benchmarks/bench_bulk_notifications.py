@@ -0,0 +1,70 @@
+"""
+Сравнение пропускной способности пакетной отправки уведомлений
+(POST /notifications/send-bulk) с поштучными эндпоинтами.
+
+Запуск (нужен запущенный app.py и пользователи с ID из диапазона):
+    python -m benchmarks.bench_bulk_notifications --recipients 200 --first-user-id 1
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_URL = "http://127.0.0.1:8000"
+
+
+def send_single(session: requests.Session, recipient_id: int) -> int:
+    response = session.post(
+        f"{BASE_URL}/notifications/send-new-response",
+        params={"recipient_id": recipient_id, "responder_name": "Benchmark"},
+        timeout=10
+    )
+    return response.status_code
+
+
+def run_single(recipient_ids, workers: int) -> float:
+    session = requests.Session()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        statuses = list(executor.map(lambda rid: send_single(session, rid), recipient_ids))
+    elapsed = time.perf_counter() - start
+    failed = sum(status != 200 for status in statuses)
+    print(f"single: {len(recipient_ids)} requests, {failed} failed, {elapsed:.3f}s, "
+          f"{len(recipient_ids) / elapsed:.0f} notifications/s")
+    return elapsed
+
+
+def run_bulk(recipient_ids) -> float:
+    payload = [
+        {"recipient_id": rid, "type": "new_response", "params": {"responder_name": "Benchmark"}}
+        for rid in recipient_ids
+    ]
+    start = time.perf_counter()
+    response = requests.post(f"{BASE_URL}/notifications/send-bulk", json=payload, timeout=30)
+    elapsed = time.perf_counter() - start
+    failed = sum(item["status"] != "sent" for item in response.json())
+    print(f"bulk:   1 request,  {failed} failed, {elapsed:.3f}s, "
+          f"{len(recipient_ids) / elapsed:.0f} notifications/s")
+    return elapsed
+
+
+def main():
+    global BASE_URL
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recipients", type=int, default=200)
+    parser.add_argument("--first-user-id", type=int, default=1)
+    parser.add_argument("--users", type=int, default=5, help="Сколько разных пользователей существует")
+    parser.add_argument("--workers", type=int, default=10)
+    parser.add_argument("--base-url", default=BASE_URL)
+    args = parser.parse_args()
+    BASE_URL = args.base_url
+
+    recipient_ids = [args.first_user_id + i % args.users for i in range(args.recipients)]
+    single = run_single(recipient_ids, args.workers)
+    bulk = run_bulk(recipient_ids)
+    print(f"speedup: {single / bulk:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
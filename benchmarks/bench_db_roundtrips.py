@@ -0,0 +1,111 @@
+"""
+Бенчмарк накладных расходов get_db_cursor: количество обращений к серверу
+на вызов репозитория и задержка p50/p99 до и после настройки соединений
+при создании и подготовленных операторов.
+
+Запросы считаются на уровне соединения: все курсоры пула создаются
+считающей фабрикой, BEGIN и COMMIT транзакции тоже учитываются. Режим
+after загружает задачу в обход кэша (reload_task_by_id), cached - через
+кэш (get_task_by_id), чтобы показать вклад кэша отдельно.
+
+Запуск (из корня проекта, нужна БД из database/config.py с данными в Task):
+    python -m benchmarks.bench_db_roundtrips --iterations 5000 --task-id 1
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from psycopg2.extensions import cursor as BaseCursor, register_type, STATUS_IN_TRANSACTION, UNICODE
+
+import database.connection as connection
+from database.connection import DatabaseConnection, PreparedStatementConnection
+from repositories import task_repository
+
+
+class CountingConnection(PreparedStatementConnection):
+    """Соединение, считающее запросы всех своих курсоров, BEGIN и COMMIT/ROLLBACK"""
+    round_trips = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Фабрика по умолчанию: ею создаются и обычные курсоры get_db_cursor
+        self.cursor_factory = CountingCursor
+
+    def commit(self):
+        if self.status == STATUS_IN_TRANSACTION:
+            CountingConnection.round_trips += 1
+        return super().commit()
+
+    def rollback(self):
+        if self.status == STATUS_IN_TRANSACTION:
+            CountingConnection.round_trips += 1
+        return super().rollback()
+
+
+class CountingCursor(BaseCursor):
+    """Курсор, считающий отправленные на сервер запросы"""
+
+    def execute(self, query, vars=None):
+        if not self.connection.autocommit and self.connection.status != STATUS_IN_TRANSACTION:
+            CountingConnection.round_trips += 1  # psycopg2 отправляет BEGIN отдельным запросом
+        CountingConnection.round_trips += 1
+        return super().execute(query, vars)
+
+
+def legacy_get_task_by_id(task_id: int):
+    """Путь до изменений: настройка соединения при каждом вызове + обычный запрос"""
+    conn = DatabaseConnection.get_connection()
+    try:
+        conn.set_client_encoding('UTF8')
+        register_type(UNICODE, conn)
+        cursor = conn.cursor()
+        cursor.execute("SET client_encoding = 'UTF8'")
+        cursor.execute('SELECT * FROM Task WHERE id = %s', (task_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        conn.commit()
+        return row
+    finally:
+        DatabaseConnection.return_connection(conn)
+
+
+def measure(fn, iterations: int, task_id: int):
+    """Возвращает (запросов на вызов, p50 мс, p99 мс)"""
+    fn(task_id)  # прогрев: PREPARE выполняется здесь
+    CountingConnection.round_trips = 0
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(task_id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    percentiles = statistics.quantiles(latencies, n=100)
+    return CountingConnection.round_trips / iterations, percentiles[49], percentiles[98]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--task-id", type=int, default=1)
+    args = parser.parse_args()
+
+    # Пул создает соединения фабрикой из модуля: подменяем ее на считающую
+    connection.PreparedStatementConnection = CountingConnection
+    DatabaseConnection.initialize_pool(1, 1)
+
+    results = {
+        "before": measure(legacy_get_task_by_id, args.iterations, args.task_id),
+        "after": measure(task_repository.reload_task_by_id, args.iterations, args.task_id),
+        "cached": measure(task_repository.get_task_by_id, args.iterations, args.task_id),
+    }
+
+    print(f"{'mode':<8}{'queries/call':>14}{'p50, ms':>10}{'p99, ms':>10}")
+    for mode, (queries, p50, p99) in results.items():
+        print(f"{mode:<8}{queries:>14.2f}{p50:>10.3f}{p99:>10.3f}")
+
+    DatabaseConnection.close_all_connections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
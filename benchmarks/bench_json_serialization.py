@@ -0,0 +1,76 @@
+"""
+Сравнение сериализации больших списков: прежний путь FastAPI
+(валидация по response_model=List[dict] + jsonable_encoder + JSONResponse)
+против UTF8ORJSONResponse, которому отдаются готовые словари.
+
+БД не нужна: строки генерируются в памяти.
+
+Запуск:
+    python -m benchmarks.bench_json_serialization --rows 10000
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from routers.responses import UTF8ORJSONResponse
+
+LIST_ADAPTER = TypeAdapter(List[dict])
+
+
+def make_rows(count: int) -> List[dict]:
+    now = str(datetime.now())
+    return [
+        {
+            "id": i,
+            "title": f"Задача {i}",
+            "description": f"Описание задачи {i}",
+            "created_by_user_id": i % 1000,
+            "accepted_by_user_id": (i % 7) or None,
+            "status": "open",
+            "price": 1234.5,
+            "deadline": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def legacy_render(rows: List[dict]) -> bytes:
+    validated = LIST_ADAPTER.validate_python(rows)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def fast_render(rows: List[dict]) -> bytes:
+    return UTF8ORJSONResponse(rows).body
+
+
+def measure(fn, rows, repeat: int) -> float:
+    fn(rows)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(rows)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    legacy = measure(legacy_render, rows, args.repeat)
+    fast = measure(fast_render, rows, args.repeat)
+    print(f"legacy (validate + jsonable_encoder + json): {legacy * 1000:.2f} ms per response")
+    print(f"UTF8ORJSONResponse:                          {fast * 1000:.2f} ms per response")
+    print(f"speedup: {legacy / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
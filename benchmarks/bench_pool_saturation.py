@@ -0,0 +1,82 @@
+"""
+Поведение пула соединений при всплеске нагрузки: больше потоков, чем
+соединений в пуле. Старый psycopg2.pool.ThreadedConnectionPool сразу
+отказывает (PoolError -> 500), BoundedConnectionPool ставит потоки в очередь.
+
+Для каждого пула выводятся число успешных запросов, отказов и задержка
+получения соединения p50/p99.
+
+Запуск (нужна БД из database/config.py):
+    python -m benchmarks.bench_pool_saturation --threads 50 --requests 20 --query-ms 10
+"""
+import argparse
+import statistics
+import threading
+import time
+
+from psycopg2 import pool
+
+from database.config import DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+from database.pool import BoundedConnectionPool
+
+CONNECT_KWARGS = dict(host=DB_HOST, port=DB_PORT, database=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+
+
+def run(label: str, connection_pool, threads: int, requests: int, query_ms: float):
+    waits = []
+    errors = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(requests):
+            started = time.perf_counter()
+            try:
+                conn = connection_pool.getconn()
+            except pool.PoolError as e:
+                with lock:
+                    errors.append(type(e).__name__)
+                continue
+            waited = time.perf_counter() - started
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT pg_sleep(%s)", (query_ms / 1000,))
+                conn.commit()
+            finally:
+                connection_pool.putconn(conn)
+            with lock:
+                waits.append(waited * 1000)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    connection_pool.closeall()
+
+    waits.sort()
+    p99 = waits[min(len(waits) - 1, int(len(waits) * 0.99))] if waits else 0.0
+    print(f"{label}: ok {len(waits)}, failed {len(errors)}, "
+          f"acquire p50 {statistics.median(waits) if waits else 0.0:.2f} ms, p99 {p99:.2f} ms, "
+          f"{len(waits) / elapsed:.0f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--query-ms", type=float, default=10.0)
+    parser.add_argument("--max-conn", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    run("ThreadedConnectionPool", pool.ThreadedConnectionPool(1, args.max_conn, **CONNECT_KWARGS),
+        args.threads, args.requests, args.query_ms)
+    run("BoundedConnectionPool", BoundedConnectionPool(args.max_conn, args.max_conn, acquire_timeout=args.timeout,
+                                                       name="benchmark", **CONNECT_KWARGS),
+        args.threads, args.requests, args.query_ms)
+
+
+if __name__ == "__main__":
+    main()
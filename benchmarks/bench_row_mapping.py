@@ -0,0 +1,128 @@
+"""
+Микробенчмарк преобразования строк Task: старый путь (RealDictCursor-словарь,
+_decode_string, DTO с __dict__, to_dict) против кортежей с общим маппером
+и прямого преобразования строки в словарь для списковых эндпоинтов.
+
+БД не нужна: строки генерируются в памяти.
+
+Запуск:
+    python -m benchmarks.bench_row_mapping --rows 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+
+from repositories.mappers import TASK_COLUMNS, task_from_row, task_dict_from_row
+
+
+class LegacyTask:
+    """Копия DTO до перехода на __slots__"""
+
+    def __init__(self, id, title, created_by_user_id, description=None, accepted_by_user_id=None,
+                 status='open', price=None, deadline=None, created_at=None, updated_at=None):
+        self._id = id
+        self._title = title
+        self._description = description
+        self._created_by_user_id = created_by_user_id
+        self._accepted_by_user_id = accepted_by_user_id
+        self._status = status
+        self._price = price
+        self._deadline = deadline
+        self._created_at = created_at
+        self._updated_at = updated_at
+        valid_statuses = ['open', 'in_progress', 'completed', 'cancelled']
+        if self._status not in valid_statuses:
+            raise ValueError(self._status)
+
+    def to_dict(self):
+        return {
+            "id": self._id,
+            "title": self._title,
+            "description": self._description,
+            "created_by_user_id": self._created_by_user_id,
+            "accepted_by_user_id": self._accepted_by_user_id,
+            "status": self._status,
+            "price": self._price,
+            "deadline": self._deadline,
+            "created_at": self._created_at,
+            "updated_at": self._updated_at
+        }
+
+
+def _decode_string(value):
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return value
+
+
+def legacy_map(task_data):
+    return LegacyTask(
+        id=task_data['id'],
+        title=_decode_string(task_data['title']),
+        created_by_user_id=task_data['created_by_user_id'],
+        description=_decode_string(task_data['description']) if task_data['description'] else None,
+        accepted_by_user_id=task_data['accepted_by_user_id'] if task_data['accepted_by_user_id'] else None,
+        status=_decode_string(task_data['status']),
+        price=float(task_data['price']) if task_data['price'] else None,
+        deadline=str(task_data['deadline']) if task_data['deadline'] else None,
+        created_at=str(task_data['created_at']) if task_data['created_at'] else None,
+        updated_at=str(task_data['updated_at']) if task_data['updated_at'] else None
+    )
+
+
+def make_rows(count: int):
+    now = datetime.now()
+    return [
+        (i, f"Задача {i}", f"Описание задачи {i}", i % 1000, (i % 7) or None,
+         ('open', 'in_progress', 'completed', 'cancelled')[i % 4], Decimal("1234.50"), now, now, now)
+        for i in range(1, count + 1)
+    ]
+
+
+def run(name, fn, rows):
+    """Выполнить преобразование всех строк, вернуть (строк/сек, байт на пике, байт удерживается)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(rows)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    # Скорость меряем отдельно, без накладных расходов tracemalloc
+    gc.collect()
+    start = time.perf_counter()
+    fn(rows)
+    elapsed = time.perf_counter() - start
+    return name, len(rows) / elapsed, peak, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    dict_rows = [dict(zip(TASK_COLUMNS, row)) for row in rows]
+
+    results = [
+        run("legacy dict row -> DTO -> to_dict", lambda _: [legacy_map(r).to_dict() for r in dict_rows], rows),
+        run("tuple -> slotted DTO -> to_dict", lambda rs: [task_from_row(r).to_dict() for r in rs], rows),
+        run("tuple -> slotted DTO (kept)", lambda rs: [task_from_row(r) for r in rs], rows),
+        run("legacy DTO (kept)", lambda _: [legacy_map(r) for r in dict_rows], rows),
+        run("tuple -> dict fast path", lambda rs: [task_dict_from_row(r) for r in rs], rows),
+    ]
+
+    scale = 100_000 / args.rows
+    print(f"{'path':<36}{'rows/sec':>12}{'peak MB/100k':>14}{'held MB/100k':>14}")
+    for name, rate, peak, held in results:
+        print(f"{name:<36}{rate:>12,.0f}{peak * scale / 2**20:>14.1f}{held * scale / 2**20:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Бенчмарк полнотекстового поиска GET /tasks/search на засеянной таблице.
+
+Скрипт в одной транзакции добавляет в Task --rows задач, собранных из
+словаря русских и английских слов, выполняет ANALYZE, проверяет, что поиск
+идет по GIN-индексу idx_task_search_vector, и измеряет задержку p50/p95
+поисковых запросов repositories/task_query.build_search_query. После
+замеров транзакция откатывается. Нужны примененные миграции
+(python -m database.migrate) и хотя бы один пользователь в "User".
+
+Запуск:
+    python -m benchmarks.bench_task_search --rows 1000000 --queries 500
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from database.connection import DatabaseConnection
+from repositories.mappers import TASK_SELECT
+from repositories.task_query import TaskFilter, build_search_query
+
+WORDS = [
+    "ремонт", "крыши", "доставка", "мебели", "уборка", "квартиры", "перевод", "документов",
+    "сборка", "шкафа", "дизайн", "логотипа", "настройка", "сервера", "покраска", "стен",
+    "repair", "delivery", "cleaning", "translation", "assembly", "design", "logo", "server",
+    "setup", "painting", "website", "database", "migration", "garden", "plumbing", "tutoring",
+]
+
+SEED_SQL = """
+INSERT INTO Task (title, description, created_by_user_id, status, price, deadline, created_at, updated_at)
+SELECT w.words[1 + (g %% w.n)] || ' ' || w.words[1 + ((g / 7) %% w.n)] || ' ' || g,
+       w.words[1 + ((g / 3) %% w.n)] || ' ' || w.words[1 + ((g / 11) %% w.n)] || ' '
+           || w.words[1 + ((g / 13) %% w.n)] || ' seeded ' || g,
+       users.ids[1 + (g %% array_length(users.ids, 1))],
+       (ARRAY['open', 'in_progress', 'completed', 'cancelled'])[1 + (g %% 4)],
+       (g %% 100000) / 10.0,
+       now() + (g %% 365) * interval '1 day',
+       now() - (g %% 730) * interval '1 day',
+       now()
+FROM generate_series(1, %s) AS g,
+     (SELECT %s::text[] AS words, %s AS n) AS w,
+     (SELECT array_agg(id) AS ids FROM "User") AS users
+"""
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def random_query(rng: random.Random) -> str:
+    """Одно-два слова, иногда фраза или исключение"""
+    first, second = rng.sample(WORDS, 2)
+    return rng.choice([first, f"{first} {second}", f'"{first} {second}"', f"{first} -{second}"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--target-p95-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    conn = DatabaseConnection.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT count(*) FROM "User"')
+        if cursor.fetchone()[0] == 0:
+            print("No users found: seed at least one row into \"User\" first")
+            return 1
+
+        print(f"Seeding {args.rows} tasks...")
+        started = time.perf_counter()
+        cursor.execute(SEED_SQL, (args.rows, WORDS, len(WORDS)))
+        cursor.execute("ANALYZE Task")
+        print(f"Seeded in {time.perf_counter() - started:.1f} s")
+
+        query, params = build_search_query("ремонт крыши", TaskFilter(status="open"),
+                                           args.limit, 0, columns=TASK_SELECT)
+        cursor.execute("EXPLAIN " + query, params)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+        if "idx_task_search_vector" not in plan:
+            print("Search does not use idx_task_search_vector:")
+            print(plan)
+            return 1
+
+        rng = random.Random(42)
+        samples = []
+        for _ in range(args.queries):
+            task_filter = TaskFilter(status=rng.choice([None, "open"]))
+            query, params = build_search_query(random_query(rng), task_filter, args.limit,
+                                               rng.choice([0, 0, 0, args.limit]), columns=TASK_SELECT)
+            started = time.perf_counter()
+            cursor.execute(query, params)
+            cursor.fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        conn.rollback()
+        DatabaseConnection.return_connection(conn)
+        DatabaseConnection.close_all_connections()
+
+    p95 = percentile(samples, 0.95)
+    print(f"p50 {statistics.median(samples):.2f} ms, p95 {p95:.2f} ms, max {max(samples):.2f} ms")
+    return 0 if p95 <= args.target_p95_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
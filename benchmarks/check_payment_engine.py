@@ -0,0 +1,85 @@
+"""
+Проверка конкурентной безопасности хранилища платежей routers/payment.py.
+
+1. --payments платежей создаются из пула потоков: все id уникальны,
+   индексы по пользователю и задаче полные.
+2. Для каждого платежа одновременно запускаются --duplicates вызовов
+   обработки (всего payments * duplicates корутин): каждый платеж
+   обработан ровно один раз, остальные вызовы получили PaymentStateError,
+   ни один платеж не остался в processing.
+3. Время обработки показывает, что ожидание провайдера не занимает потоки:
+   10k платежей с задержкой провайдера обрабатываются за ~одну задержку.
+
+Запуск:
+    python -m benchmarks.check_payment_engine --payments 10000 --duplicates 2
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from repositories.payment_store import (PaymentStore, PaymentStateError, STATUS_COMPLETED, STATUS_FAILED,
+                                        process_stored_payment)
+
+
+async def process_all(store: PaymentStore, payment_ids, duplicates: int, delay: float):
+    calls = [process_stored_payment(store, payment_id, delay) for payment_id in payment_ids for _ in range(duplicates)]
+    return await asyncio.gather(*calls, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payments", type=int, default=10_000)
+    parser.add_argument("--duplicates", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--delay", type=float, default=0.1)
+    args = parser.parse_args()
+
+    store = PaymentStore()
+    failures = []
+
+    with ThreadPoolExecutor(args.threads) as executor:
+        created = list(executor.map(
+            lambda index: store.create(task_id=index % 100, user_id=index % 37, amount=10.0, payment_method="card"),
+            range(args.payments)
+        ))
+    payment_ids = [payment["payment_id"] for payment in created]
+    if len(set(payment_ids)) != args.payments:
+        failures.append(f"duplicate ids: {args.payments - len(set(payment_ids))}")
+    if sum(len(store.list(user_id=user_id)) for user_id in range(37)) != args.payments:
+        failures.append("user index is incomplete")
+    if sum(len(store.list(task_id=task_id)) for task_id in range(100)) != args.payments:
+        failures.append("task index is incomplete")
+
+    started = time.perf_counter()
+    results = asyncio.run(process_all(store, payment_ids, args.duplicates, args.delay))
+    elapsed = time.perf_counter() - started
+
+    processed = Counter(result["payment_id"] for result in results if isinstance(result, dict))
+    rejected = sum(isinstance(result, PaymentStateError) for result in results)
+    unexpected = [result for result in results if isinstance(result, Exception)
+                  and not isinstance(result, PaymentStateError)]
+    statuses = Counter(payment["status"] for payment in store.list())
+
+    if any(count != 1 for count in processed.values()) or len(processed) != args.payments:
+        failures.append(f"{sum(1 for c in processed.values() if c > 1)} double-processed, "
+                        f"{args.payments - len(processed)} never processed")
+    if rejected != args.payments * (args.duplicates - 1):
+        failures.append(f"expected {args.payments * (args.duplicates - 1)} rejected calls, got {rejected}")
+    if unexpected:
+        failures.append(f"unexpected errors: {unexpected[:3]}")
+    if statuses[STATUS_COMPLETED] + statuses[STATUS_FAILED] != args.payments:
+        failures.append(f"payments left in other states: {dict(statuses)}")
+
+    print(f"{len(results)} process calls in {elapsed:.2f} s: {len(processed)} processed, {rejected} rejected, "
+          f"statuses {dict(statuses)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
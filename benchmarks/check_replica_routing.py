@@ -0,0 +1,58 @@
+"""
+Проверка маршрутизации чтений между основной БД и репликами.
+
+1. Чтения (readonly=True) вне сессии записи должны попадать на реплики,
+   запрос pg_is_in_recovery() на них возвращает true.
+2. Запись в сессии чтения переключает последующие чтения этой сессии на
+   основную БД на DB_STICKY_PRIMARY_SECONDS.
+3. После окна чтения снова идут на реплики.
+
+Запуск (основная БД и реплика из docker-compose.replicas.yml):
+    DB_REPLICA_HOSTS=localhost:5434 python -m benchmarks.check_replica_routing
+"""
+import sys
+import time
+from collections import Counter
+
+from database.config import DB_REPLICA_HOSTS, DB_STICKY_PRIMARY_SECONDS
+from database.connection import DatabaseConnection, get_db_cursor
+from database.routing import start_read_session
+
+
+def read_target() -> str:
+    with get_db_cursor(readonly=True) as cursor:
+        cursor.execute("SELECT pg_is_in_recovery(), inet_server_port()")
+        in_recovery, port = cursor.fetchone()
+    return f"{'replica' if in_recovery else 'primary'}:{port}"
+
+
+def main():
+    if not DB_REPLICA_HOSTS:
+        print("Set DB_REPLICA_HOSTS, e.g. DB_REPLICA_HOSTS=localhost:5434")
+        return 1
+    failures = 0
+    try:
+        start_read_session()
+        targets = Counter(read_target() for _ in range(20))
+        print(f"reads without writes: {dict(targets)}")
+        failures += any(target.startswith("primary") for target in targets)
+
+        with get_db_cursor() as cursor:
+            cursor.execute("SELECT 1")  # любая не-readonly транзакция считается записью
+        target = read_target()
+        print(f"read right after write: {target}")
+        failures += not target.startswith("primary")
+
+        time.sleep(DB_STICKY_PRIMARY_SECONDS + 0.1)
+        target = read_target()
+        print(f"read after {DB_STICKY_PRIMARY_SECONDS}s window: {target}")
+        failures += not target.startswith("replica")
+    finally:
+        DatabaseConnection.close_all_connections()
+
+    print("OK" if not failures else f"{failures} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
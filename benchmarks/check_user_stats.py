@@ -0,0 +1,63 @@
+"""
+Сверка сводки user_task_stats и "User".order_count с расчетом по Task
+и сравнение времени ответа сводки и GROUP BY для самых активных пользователей.
+
+Запуск (нужны примененные миграции, python -m database.migrate):
+    python -m benchmarks.check_user_stats --users 20 --repeat 50
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from database.connection import DatabaseConnection, get_db_cursor
+from repositories.task_repository import get_user_task_stats
+
+
+def timed(fn, *args, repeat: int) -> float:
+    """Медианное время вызова в миллисекундах"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    mismatches = 0
+    try:
+        with get_db_cursor() as cursor:
+            cursor.execute(
+                'SELECT u.id, u.order_count, count(t.id) FROM "User" u '
+                'LEFT JOIN Task t ON t.created_by_user_id = u.id '
+                'GROUP BY u.id ORDER BY count(t.id) DESC LIMIT %s',
+                (args.users,)
+            )
+            users = cursor.fetchall()
+
+        for user_id, order_count, created_count in users:
+            summary = get_user_task_stats(user_id)
+            live = get_user_task_stats(user_id, live=True)
+            ok = summary == live and order_count == created_count
+            mismatches += not ok
+            summary_ms = timed(get_user_task_stats, user_id, repeat=args.repeat)
+            live_ms = timed(get_user_task_stats, user_id, True, repeat=args.repeat)
+            print(f"{'OK  ' if ok else 'FAIL'} user {user_id}: {created_count} created, "
+                  f"order_count {order_count}, summary {summary_ms:.2f} ms, GROUP BY {live_ms:.2f} ms")
+            if not ok:
+                print(f"  summary: {summary}\n  live:    {live}")
+    finally:
+        DatabaseConnection.close_all_connections()
+
+    print(f"{mismatches} mismatch(es)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Проверка планов запросов GET /tasks: каждая комбинация фильтров из
+repositories/task_query.py должна использовать индекс, а не Seq Scan.
+
+Скрипт в одной транзакции добавляет в Task 1M строк, выполняет ANALYZE
+и EXPLAIN для каждой комбинации, после чего откатывает транзакцию.
+Нужны примененные миграции (python -m database.migrate) и хотя бы один
+пользователь в "User".
+
+Запуск:
+    python -m benchmarks.explain_task_filters --rows 1000000
+"""
+import argparse
+import itertools
+import sys
+from datetime import datetime, timedelta
+
+from database.connection import DatabaseConnection
+from repositories.task_query import TaskFilter, build_task_query
+
+SEED_SQL = """
+INSERT INTO Task (title, description, created_by_user_id, accepted_by_user_id,
+                  status, price, deadline, created_at, updated_at)
+SELECT 'Task ' || g,
+       'Seeded task ' || g,
+       users.ids[1 + (g %% array_length(users.ids, 1))],
+       CASE WHEN g %% 3 = 0 THEN users.ids[1 + ((g / 3) %% array_length(users.ids, 1))] END,
+       (ARRAY['open', 'in_progress', 'completed', 'cancelled'])[1 + (g %% 4)],
+       (g %% 100000) / 10.0,
+       now() + (g %% 365) * interval '1 day',
+       now() - (g %% 730) * interval '1 day',
+       now()
+FROM generate_series(1, %s) AS g,
+     (SELECT array_agg(id) AS ids FROM "User") AS users
+"""
+
+NOW = datetime.now()
+FILTER_VALUES = {
+    "status": "in_progress",
+    "created_by_user_id": None,  # подставляется первым пользователем из БД
+    "accepted_by_user_id": None,
+    "min_price": 100.0,
+    "max_price": 150.0,
+    "deadline_from": NOW + timedelta(days=10),
+    "deadline_to": NOW + timedelta(days=12),
+    "created_from": NOW - timedelta(days=20),
+    "created_to": NOW - timedelta(days=18),
+}
+
+# Диапазонные фильтры проверяются парами, иначе комбинаций слишком много
+FILTER_GROUPS = [
+    ("status",),
+    ("created_by_user_id",),
+    ("accepted_by_user_id",),
+    ("min_price", "max_price"),
+    ("deadline_from", "deadline_to"),
+    ("created_from", "created_to"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    conn = DatabaseConnection.get_connection()
+    failures = 0
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT min(id) FROM "User"')
+        user_id = cursor.fetchone()[0]
+        if user_id is None:
+            print("No users found: seed at least one row into \"User\" first")
+            return 1
+        FILTER_VALUES["created_by_user_id"] = user_id
+        FILTER_VALUES["accepted_by_user_id"] = user_id
+
+        print(f"Seeding {args.rows} tasks...")
+        cursor.execute(SEED_SQL, (args.rows,))
+        cursor.execute("ANALYZE Task")
+
+        for size in range(1, len(FILTER_GROUPS) + 1):
+            for groups in itertools.combinations(FILTER_GROUPS, size):
+                fields = [field for group in groups for field in group]
+                task_filter = TaskFilter(**{field: FILTER_VALUES[field] for field in fields})
+                query, params = build_task_query(task_filter, limit=100)
+                cursor.execute("EXPLAIN " + query, params)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                uses_index = "Index" in plan and "Seq Scan" not in plan
+                failures += not uses_index
+                print(f"{'OK  ' if uses_index else 'FAIL'} {', '.join(fields)}")
+                if not uses_index:
+                    print(plan)
+    finally:
+        conn.rollback()
+        DatabaseConnection.return_connection(conn)
+        DatabaseConnection.close_all_connections()
+
+    print(f"{failures} combination(s) without index scan")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
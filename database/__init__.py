@@ -5,8 +5,15 @@ from database.connection import (
     DatabaseConnection,
     get_db_connection,
     get_db_cursor,
+    execute_prepared,
     test_connection
 )
+from database.pool import BoundedConnectionPool, PoolTimeoutError
+from database.routing import start_read_session, mark_write, prefer_primary
+from database.async_connection import (
+    AsyncDatabaseConnection,
+    get_async_connection
+)
 from database.config import (
     DATABASE_URL,
     ASYNC_DATABASE_URL,
@@ -14,20 +21,32 @@ from database.config import (
     DB_PORT,
     DB_NAME,
     DB_USER,
-    DB_PASSWORD
+    DB_PASSWORD,
+    DB_DRIVER,
+    USE_ASYNC_DB
 )
 
 __all__ = [
     "DatabaseConnection",
     "get_db_connection",
     "get_db_cursor",
+    "execute_prepared",
     "test_connection",
+    "BoundedConnectionPool",
+    "PoolTimeoutError",
+    "start_read_session",
+    "mark_write",
+    "prefer_primary",
+    "AsyncDatabaseConnection",
+    "get_async_connection",
     "DATABASE_URL",
     "ASYNC_DATABASE_URL",
     "DB_HOST",
     "DB_PORT",
     "DB_NAME",
     "DB_USER",
-    "DB_PASSWORD"
+    "DB_PASSWORD",
+    "DB_DRIVER",
+    "USE_ASYNC_DB"
 ]
 
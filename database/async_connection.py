@@ -0,0 +1,126 @@
+"""
+Модуль для асинхронной работы с базой данных PostgreSQL через asyncpg
+"""
+import asyncio
+import asyncpg
+from contextlib import asynccontextmanager
+from typing import Optional
+from database.config import (ASYNC_DATABASE_URL, ASYNC_POOL_MIN_SIZE, ASYNC_POOL_MAX_SIZE, DB_POOL_ACQUIRE_TIMEOUT,
+                             DB_NAME, DB_USER, DB_PASSWORD, DB_REPLICA_HOSTS)
+from database.routing import ReplicaSelector, mark_write, prefer_primary
+
+
+class AsyncDatabaseConnection:
+    """Класс для управления асинхронными пулами основной БД и реплик"""
+
+    _pool: Optional[asyncpg.Pool] = None
+    _replica_selector: Optional[ReplicaSelector] = None
+    _init_lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    async def initialize_pool(cls, min_size: int = ASYNC_POOL_MIN_SIZE, max_size: int = ASYNC_POOL_MAX_SIZE):
+        """
+        Инициализация асинхронного пула основной БД и пулов реплик из DB_REPLICA_HOSTS.
+        Недоступная при старте реплика пропускается, как и в DatabaseConnection
+        """
+        try:
+            primary = await asyncpg.create_pool(
+                ASYNC_DATABASE_URL,
+                min_size=min_size,
+                max_size=max_size
+            )
+        except Exception as e:
+            print(f"Error creating async connection pool: {e}")
+            raise
+        replicas = []
+        for host, port in DB_REPLICA_HOSTS:
+            try:
+                replicas.append(await asyncpg.create_pool(
+                    host=host, port=port, database=DB_NAME, user=DB_USER, password=DB_PASSWORD,
+                    min_size=min_size, max_size=max_size
+                ))
+            except Exception as e:
+                print(f"Replica {host}:{port} unavailable, skipping it: {e}")
+        # Пулы публикуются вместе: get_pool проверяет только _pool
+        cls._replica_selector = ReplicaSelector(
+            replicas, busy=lambda replica: replica.get_size() - replica.get_idle_size()
+        )
+        cls._pool = primary
+        print(f"Async database connection pool created successfully ({len(replicas)} replica(s))")
+
+    @classmethod
+    async def get_pool(cls, readonly: bool = False) -> asyncpg.Pool:
+        """
+        Получить пул, создав пулы при первом обращении
+
+        Args:
+            readonly: Вернуть пул реплики, если они настроены и клиент недавно ничего не записывал
+        """
+        if cls._pool is None:
+            if cls._init_lock is None:
+                cls._init_lock = asyncio.Lock()
+            async with cls._init_lock:
+                if cls._pool is None:
+                    await cls.initialize_pool()
+        if readonly and not prefer_primary():
+            replica = cls._replica_selector.choose()
+            if replica is not None:
+                return replica
+        return cls._pool
+
+    @classmethod
+    async def acquire(cls, readonly: bool = False):
+        """
+        Взять соединение из пула. Если реплика недоступна, читаем с основной БД
+
+        Returns:
+            (пул, соединение) - соединение возвращается в этот пул
+        """
+        pool = await cls.get_pool(readonly)
+        try:
+            return pool, await pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT)
+        except (OSError, asyncpg.PostgresConnectionError, asyncpg.CannotConnectNowError) as e:
+            if pool is cls._pool:
+                raise
+            print(f"Replica unavailable, reading from primary: {e}")
+        return cls._pool, await cls._pool.acquire(timeout=DB_POOL_ACQUIRE_TIMEOUT)
+
+    @classmethod
+    async def close_pool(cls):
+        """Закрыть все соединения основной БД и реплик"""
+        if cls._pool:
+            await cls._pool.close()
+            for replica in cls._replica_selector.pools:
+                await replica.close()
+            cls._pool = None
+            cls._replica_selector = None
+            print("All async database connections closed")
+
+
+@asynccontextmanager
+async def get_async_connection(transaction: bool = False, readonly: bool = False):
+    """
+    Асинхронный контекстный менеджер для работы с базой данных.
+    Берет соединение из пула и возвращает его после использования.
+
+    Args:
+        transaction: Если True, выполняет запросы внутри транзакции
+        readonly: Соединение только для чтения: берется с реплики. После записи
+                  (readonly=False) чтения клиента временно идут на основную БД
+
+    Пример использования:
+        async with get_async_connection(readonly=True) as conn:
+            row = await conn.fetchrow('SELECT * FROM Task WHERE id = $1', task_id)
+    """
+    # Как и синхронный пул, ждем свободное соединение не дольше DB_POOL_ACQUIRE_TIMEOUT
+    pool, conn = await AsyncDatabaseConnection.acquire(readonly)
+    try:
+        if transaction:
+            async with conn.transaction():
+                yield conn
+        else:
+            yield conn
+    finally:
+        await pool.release(conn)
+    if not readonly:
+        mark_write()
@@ -2,7 +2,7 @@
 Конфигурация подключения к базе данных PostgreSQL
 """
 import os
-from typing import Optional
+from typing import List, Optional, Tuple
 
 # Параметры подключения к PostgreSQL
 DB_HOST: str = os.getenv("DB_HOST", "localhost")
@@ -17,3 +17,36 @@ DATABASE_URL: str = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{
 # Строка подключения для asyncpg (для асинхронных операций)
 ASYNC_DATABASE_URL: str = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+
+# Синхронный пул (database/pool.py): размеры, ожидание свободного соединения,
+# максимальный возраст соединения и простой, после которого соединение проверяется
+DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_ACQUIRE_TIMEOUT: float = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+DB_POOL_MAX_LIFETIME: float = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_VALIDATE_AFTER: float = float(os.getenv("DB_POOL_VALIDATE_AFTER", "30"))
+
+# Реплики для чтения (database/routing.py): "host:port,host:port", пусто - читать с основной БД.
+# Имя БД, пользователь и пароль у реплик те же, что у основной
+DB_REPLICA_HOSTS: List[Tuple[str, int]] = [
+    (host, int(port or DB_PORT))
+    for host, _, port in (item.strip().partition(":") for item in os.getenv("DB_REPLICA_HOSTS", "").split(","))
+    if host
+]
+# Выбор реплики: round_robin или least_busy (меньше всего занятых соединений)
+DB_REPLICA_STRATEGY: str = os.getenv("DB_REPLICA_STRATEGY", "round_robin").lower()
+# Сколько секунд после записи чтения клиента идут на основную БД
+DB_STICKY_PRIMARY_SECONDS: float = float(os.getenv("DB_STICKY_PRIMARY_SECONDS", "2"))
+
+# Драйвер для роутеров: "asyncpg" (нативный asyncio) или "psycopg2" (синхронный, через threadpool)
+DB_DRIVER: str = os.getenv("DB_DRIVER", "asyncpg").lower()
+USE_ASYNC_DB: bool = DB_DRIVER == "asyncpg"
+
+# Размеры асинхронного пула соединений
+ASYNC_POOL_MIN_SIZE: int = int(os.getenv("ASYNC_POOL_MIN_SIZE", "5"))
+ASYNC_POOL_MAX_SIZE: int = int(os.getenv("ASYNC_POOL_MAX_SIZE", "50"))
+
+# Кэш сущностей (repositories/cache.py): размер, время жизни записей и отрицательных результатов
+CACHE_MAX_SIZE: int = int(os.getenv("CACHE_MAX_SIZE", "10000"))
+CACHE_TTL_SECONDS: float = float(os.getenv("CACHE_TTL_SECONDS", "30"))
+CACHE_NEGATIVE_TTL_SECONDS: float = float(os.getenv("CACHE_NEGATIVE_TTL_SECONDS", "5"))
@@ -1,14 +1,18 @@
 """
 Модуль для работы с подключением к базе данных PostgreSQL
 """
+import threading
 import psycopg2
-from psycopg2 import pool
 from psycopg2.extras import RealDictCursor
 from psycopg2.extensions import register_type, UNICODE
 from psycopg2.extensions import register_adapter, AsIs
 from contextlib import contextmanager
 from typing import Optional
-from database.config import DATABASE_URL, DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD
+from database.config import (DATABASE_URL, DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD,
+                             DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_ACQUIRE_TIMEOUT,
+                             DB_POOL_MAX_LIFETIME, DB_POOL_VALIDATE_AFTER, DB_REPLICA_HOSTS)
+from database.pool import BoundedConnectionPool
+from database.routing import ReplicaSelector, mark_write, prefer_primary
 
 # Регистрируем типы для правильной работы с Unicode
 # Это гарантирует, что все текстовые данные будут правильно декодироваться
@@ -19,49 +23,129 @@ except:
     pass
 
 
+class PreparedStatementConnection(psycopg2.extensions.connection):
+    """Соединение с кэшем имен запросов, подготовленных на сервере (PREPARE)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
 class DatabaseConnection:
-    """Класс для управления подключением к базе данных"""
+    """Класс для управления подключением к основной БД и репликам"""
     
-    _connection_pool: Optional[pool.ThreadedConnectionPool] = None
+    _connection_pool: Optional[BoundedConnectionPool] = None
+    _replica_selector: Optional[ReplicaSelector] = None
+    _init_lock = threading.Lock()
     
     @classmethod
-    def initialize_pool(cls, min_conn: int = 1, max_conn: int = 10):
-        """Инициализация пула соединений"""
+    def _create_pool(cls, name: str, host: str, port: int, min_conn: int, max_conn: int) -> BoundedConnectionPool:
+        return BoundedConnectionPool(
+            min_conn,
+            max_conn,
+            acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+            max_lifetime=DB_POOL_MAX_LIFETIME,
+            validate_after=DB_POOL_VALIDATE_AFTER,
+            configure=cls.configure_connection,
+            name=name,
+            host=host,
+            port=port,
+            database=DB_NAME,
+            user=DB_USER,
+            password=DB_PASSWORD,
+            client_encoding='UTF8',  # Кодировка передается при подключении, без отдельного запроса
+            connection_factory=PreparedStatementConnection
+        )
+
+    @classmethod
+    def initialize_pool(cls, min_conn: int = DB_POOL_MIN_SIZE, max_conn: int = DB_POOL_MAX_SIZE):
+        """
+        Инициализация пула основной БД и пулов реплик из DB_REPLICA_HOSTS.
+        При исчерпании пула запрос соединения ждет в очереди
+        до DB_POOL_ACQUIRE_TIMEOUT секунд (см. database/pool.py).
+        Недоступная при старте реплика пропускается: чтения идут на остальные
+        реплики или основную БД
+        """
         try:
-            cls._connection_pool = pool.ThreadedConnectionPool(
-                min_conn,
-                max_conn,
-                host=DB_HOST,
-                port=DB_PORT,
-                database=DB_NAME,
-                user=DB_USER,
-                password=DB_PASSWORD,
-                client_encoding='UTF8'  # Устанавливаем кодировку UTF-8
-            )
-            print("Database connection pool created successfully")
+            primary = cls._create_pool("primary", DB_HOST, DB_PORT, min_conn, max_conn)
         except Exception as e:
             print(f"Error creating connection pool: {e}")
             raise
+        replicas = []
+        for index, (host, port) in enumerate(DB_REPLICA_HOSTS):
+            try:
+                replicas.append(cls._create_pool(f"replica-{index}", host, port, min_conn, max_conn))
+            except Exception as e:
+                print(f"Replica {host}:{port} unavailable, skipping it: {e}")
+        # Пулы публикуются вместе: get_connection проверяет только _connection_pool
+        cls._replica_selector = ReplicaSelector(replicas, busy=lambda replica: replica.in_use)
+        cls._connection_pool = primary
+        print(f"Database connection pool created successfully ({len(replicas)} replica(s))")
     
+    @staticmethod
+    def configure_connection(conn):
+        """
+        Однократная настройка нового соединения пула.
+        Раньше эти действия выполнялись при каждом get_db_cursor().
+        """
+        if conn.encoding != 'UTF8':
+            conn.set_client_encoding('UTF8')
+        # Включаем автоматическое декодирование Unicode
+        register_type(UNICODE, conn)
+
     @classmethod
-    def get_connection(cls):
-        """Получить соединение из пула"""
+    def get_connection_pool(cls) -> BoundedConnectionPool:
+        """Получить пул основной БД, создав пулы при первом обращении"""
         if cls._connection_pool is None:
-            cls.initialize_pool()
-        return cls._connection_pool.getconn()
+            # Пул открывает min_conn соединений сразу, поэтому создается один раз
+            with cls._init_lock:
+                if cls._connection_pool is None:
+                    cls.initialize_pool()
+        return cls._connection_pool
+
+    @classmethod
+    def get_connection(cls, readonly: bool = False):
+        """
+        Получить соединение из пула. Если свободных нет, ждет в очереди
+        
+        Args:
+            readonly: Соединение только для чтения: берется с реплики, если они
+                      настроены и клиент недавно ничего не записывал
+        
+        Raises:
+            PoolTimeoutError: Если соединение не освободилось за DB_POOL_ACQUIRE_TIMEOUT
+        """
+        primary = cls.get_connection_pool()
+        if readonly and not prefer_primary():
+            replica = cls._replica_selector.choose()
+            if replica is not None:
+                try:
+                    return replica.getconn()
+                except psycopg2.OperationalError as e:
+                    # Реплика недоступна: читаем с основной БД
+                    print(f"Replica '{replica.name}' unavailable, reading from primary: {e}")
+        return primary.getconn()
     
     @classmethod
     def return_connection(cls, conn):
-        """Вернуть соединение в пул"""
-        if cls._connection_pool:
-            cls._connection_pool.putconn(conn)
+        """Вернуть соединение в пул, который его выдал"""
+        if cls._connection_pool is None:
+            return
+        for replica in cls._replica_selector.pools:
+            if replica.owns(conn):
+                replica.putconn(conn)
+                return
+        cls._connection_pool.putconn(conn)
     
     @classmethod
     def close_all_connections(cls):
-        """Закрыть все соединения в пуле"""
+        """Закрыть все соединения основной БД и реплик"""
         if cls._connection_pool:
             cls._connection_pool.closeall()
+            for replica in cls._replica_selector.pools:
+                replica.closeall()
             cls._connection_pool = None
+            cls._replica_selector = None
             print("All database connections closed")
 
 
@@ -80,10 +164,9 @@ def get_db_connection():
     conn = None
     try:
         conn = DatabaseConnection.get_connection()
-        # Устанавливаем кодировку UTF-8 для соединения
-        conn.set_client_encoding('UTF8')
         yield conn
         conn.commit()
+        mark_write()
     except Exception as e:
         if conn:
             conn.rollback()
@@ -95,13 +178,20 @@ def get_db_connection():
 
 
 @contextmanager
-def get_db_cursor(dict_cursor: bool = False):
+def get_db_cursor(dict_cursor: bool = False, name: Optional[str] = None, itersize: int = 2000,
+                  readonly: bool = False):
     """
     Контекстный менеджер для работы с курсором базы данных.
     Автоматически закрывает курсор и соединение.
     
     Args:
         dict_cursor: Если True, возвращает RealDictCursor (результаты как словари)
+        name: Имя серверного курсора. Если задано, строки читаются с сервера
+              порциями по itersize при итерации по курсору
+        itersize: Размер порции для серверного курсора
+        readonly: Курсор только для чтения: соединение берется с реплики.
+                  После успешной записи (readonly=False) чтения клиента
+                  временно идут на основную БД, см. database/routing.py
     
     Пример использования:
         with get_db_cursor(dict_cursor=True) as cursor:
@@ -111,22 +201,22 @@ def get_db_cursor(dict_cursor: bool = False):
     conn = None
     cursor = None
     try:
-        conn = DatabaseConnection.get_connection()
-        # Устанавливаем кодировку UTF-8 для соединения
-        conn.set_client_encoding('UTF8')
-        # Включаем автоматическое декодирование Unicode
-        register_type(UNICODE, conn)
+        # Соединение уже настроено при создании (см. DatabaseConnection.configure_connection)
+        conn = DatabaseConnection.get_connection(readonly)
         if dict_cursor:
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
+            cursor = conn.cursor(name=name, cursor_factory=RealDictCursor)
         else:
-            cursor = conn.cursor()
-        # Дополнительно устанавливаем кодировку через SQL
-        cursor.execute("SET client_encoding = 'UTF8'")
+            cursor = conn.cursor(name=name)
+        if name:
+            cursor.itersize = itersize
         yield cursor
         conn.commit()
+        if not readonly:
+            mark_write()
     except Exception as e:
         if conn:
             conn.rollback()
+            _reset_prepared_statements(conn)
         print(f"Database error: {e}")
         raise
     finally:
@@ -136,6 +226,43 @@ def get_db_cursor(dict_cursor: bool = False):
             DatabaseConnection.return_connection(conn)
 
 
+def execute_prepared(cursor, name: str, query: str, params: tuple = ()):
+    """
+    Выполнить фиксированный запрос через подготовленный на сервере оператор.
+    PREPARE выполняется один раз на соединение, дальше только EXECUTE.
+
+    Args:
+        cursor: Курсор из get_db_cursor
+        name: Уникальное имя оператора
+        query: Текст запроса с параметрами $1, $2, ...
+        params: Значения параметров
+    """
+    prepared = cursor.connection.prepared_statements
+    if name not in prepared:
+        cursor.execute(f"PREPARE {name} AS {query}")
+        prepared.add(name)
+    if params:
+        placeholders = ", ".join(["%s"] * len(params))
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
+
+def _reset_prepared_statements(conn):
+    """Сбросить подготовленные операторы соединения после ошибки"""
+    prepared = getattr(conn, "prepared_statements", None)
+    if not prepared:
+        return
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("DEALLOCATE ALL")
+        conn.commit()
+    except psycopg2.Error:
+        # Незавершенную транзакцию откатит пул при возврате соединения
+        pass
+    prepared.clear()
+
+
 def test_connection():
     """Тестовая функция для проверки подключения к БД"""
     try:
@@ -0,0 +1,45 @@
+"""
+Применение SQL-миграций из каталога database/migrations
+
+Запуск:
+    python -m database.migrate
+"""
+from pathlib import Path
+from typing import List
+from database.connection import get_db_connection
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+
+def apply_migrations() -> List[str]:
+    """
+    Применить еще не примененные миграции в порядке имен файлов.
+    Каждая миграция выполняется в отдельной транзакции.
+
+    Returns:
+        Список имен примененных миграций
+    """
+    applied_now = []
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "name TEXT PRIMARY KEY, applied_at TIMESTAMP NOT NULL DEFAULT now())"
+        )
+        cursor.execute("SELECT name FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+        conn.commit()
+
+        for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+            if path.name in applied:
+                continue
+            cursor.execute(path.read_text(encoding="utf-8"))
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (path.name,))
+            conn.commit()
+            applied_now.append(path.name)
+            print(f"Migration applied: {path.name}")
+    return applied_now
+
+
+if __name__ == "__main__":
+    apply_migrations()
@@ -0,0 +1,11 @@
+-- Составные индексы для фильтров GET /tasks (repositories/task_query.py).
+-- Индексы (<фильтр>, id) отдают строки уже в порядке id, поэтому
+-- ORDER BY id LIMIT n с keyset-курсором выполняется без сортировки.
+CREATE INDEX IF NOT EXISTS idx_task_status_id ON Task (status, id);
+CREATE INDEX IF NOT EXISTS idx_task_created_by_user_id_id ON Task (created_by_user_id, id);
+CREATE INDEX IF NOT EXISTS idx_task_accepted_by_user_id_id ON Task (accepted_by_user_id, id);
+
+-- Диапазонные фильтры и сортировки по цене и датам
+CREATE INDEX IF NOT EXISTS idx_task_price_id ON Task (price, id);
+CREATE INDEX IF NOT EXISTS idx_task_deadline_id ON Task (deadline, id);
+CREATE INDEX IF NOT EXISTS idx_task_created_at_id ON Task (created_at, id);
@@ -0,0 +1,26 @@
+-- Версия строки для ETag (routers/conditional.py): updated_at есть у Task,
+-- у "User" она добавляется. Триггер обновляет колонку при любом UPDATE,
+-- поэтому версия меняется даже при прямых правках в БД.
+ALTER TABLE "User" ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now();
+
+-- У Task колонка была без значения по умолчанию: строки из INSERT и COPY
+-- (repositories/bulk.py) получали NULL
+ALTER TABLE Task ALTER COLUMN updated_at SET DEFAULT now();
+UPDATE Task SET updated_at = coalesce(created_at, now()) WHERE updated_at IS NULL;
+
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS task_touch_updated_at ON Task;
+CREATE TRIGGER task_touch_updated_at
+    BEFORE UPDATE ON Task
+    FOR EACH ROW EXECUTE PROCEDURE touch_updated_at();
+
+DROP TRIGGER IF EXISTS user_touch_updated_at ON "User";
+CREATE TRIGGER user_touch_updated_at
+    BEFORE UPDATE ON "User"
+    FOR EACH ROW EXECUTE PROCEDURE touch_updated_at();
@@ -0,0 +1,13 @@
+-- Полнотекстовый поиск задач (GET /tasks/search, repositories/task_query.py).
+-- Вектор хранится в генерируемой колонке и обновляется вместе со строкой.
+-- Русская и английская конфигурации объединены, чтобы находились словоформы
+-- обоих языков; заголовок весит больше описания.
+ALTER TABLE Task ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_task_search_vector ON Task USING GIN (search_vector);
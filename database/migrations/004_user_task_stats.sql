@@ -0,0 +1,110 @@
+-- Сводка задач пользователя для GET /users/{id}/stats: количество и сумма
+-- цен по статусам отдельно для созданных (creator) и принятых (acceptor)
+-- задач. Таблица и "User".order_count (число созданных задач) обновляются
+-- триггерами на Task инкрементально, без пересчета по всей таблице.
+CREATE TABLE IF NOT EXISTS user_task_stats (
+    user_id INTEGER NOT NULL,
+    role TEXT NOT NULL CHECK (role IN ('creator', 'acceptor')),
+    status TEXT NOT NULL,
+    task_count BIGINT NOT NULL DEFAULT 0,
+    price_sum NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, role, status)
+);
+
+-- Триггеры уровня оператора с таблицами переходов: INSERT/UPDATE/DELETE
+-- (в том числе COPY из repositories/bulk.py) применяют одну агрегированную
+-- дельту на оператор, а не по upsert на каждую строку
+DROP TRIGGER IF EXISTS task_stats_sync ON Task;
+DROP FUNCTION IF EXISTS user_task_stats_apply(INTEGER, TEXT, TEXT, INTEGER, NUMERIC);
+
+CREATE OR REPLACE FUNCTION user_task_stats_apply_rows(p_old Task[], p_new Task[]) RETURNS void AS $$
+    WITH deltas AS (
+        SELECT created_by_user_id AS user_id, 'creator' AS role, status, -1 AS delta, price FROM unnest(p_old)
+        UNION ALL
+        SELECT accepted_by_user_id, 'acceptor', status, -1, price FROM unnest(p_old)
+        UNION ALL
+        SELECT created_by_user_id, 'creator', status, 1, price FROM unnest(p_new)
+        UNION ALL
+        SELECT accepted_by_user_id, 'acceptor', status, 1, price FROM unnest(p_new)
+    ), grouped AS (
+        -- Строки, у которых не менялись автор, исполнитель, статус и цена, взаимно сокращаются
+        SELECT user_id, role, status, sum(delta) AS task_count, sum(delta * coalesce(price, 0)) AS price_sum
+        FROM deltas
+        WHERE user_id IS NOT NULL
+        GROUP BY user_id, role, status
+        HAVING sum(delta) <> 0 OR sum(delta * coalesce(price, 0)) <> 0
+    ), applied AS (
+        INSERT INTO user_task_stats AS s (user_id, role, status, task_count, price_sum)
+        SELECT user_id, role, status, task_count, price_sum FROM grouped
+        ON CONFLICT (user_id, role, status) DO UPDATE
+            SET task_count = s.task_count + EXCLUDED.task_count,
+                price_sum = s.price_sum + EXCLUDED.price_sum
+    )
+    -- order_count меняется только при создании, удалении или смене автора задачи
+    UPDATE "User" u
+    SET order_count = u.order_count + created.task_count
+    FROM (
+        SELECT user_id, sum(task_count) AS task_count
+        FROM grouped WHERE role = 'creator'
+        GROUP BY user_id
+        HAVING sum(task_count) <> 0
+    ) created
+    WHERE u.id = created.user_id;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION task_stats_sync() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM user_task_stats_apply_rows(NULL, (SELECT array_agg(n) FROM new_rows n));
+    ELSIF TG_OP = 'UPDATE' THEN
+        PERFORM user_task_stats_apply_rows((SELECT array_agg(o) FROM old_rows o),
+                                           (SELECT array_agg(n) FROM new_rows n));
+    ELSE
+        PERFORM user_task_stats_apply_rows((SELECT array_agg(o) FROM old_rows o), NULL);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Таблицы переходов допускаются только у триггера на одно событие и без
+-- списка колонок в UPDATE OF, поэтому триггеров три
+DROP TRIGGER IF EXISTS task_stats_insert ON Task;
+CREATE TRIGGER task_stats_insert
+    AFTER INSERT ON Task
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE task_stats_sync();
+
+DROP TRIGGER IF EXISTS task_stats_update ON Task;
+CREATE TRIGGER task_stats_update
+    AFTER UPDATE ON Task
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE task_stats_sync();
+
+DROP TRIGGER IF EXISTS task_stats_delete ON Task;
+CREATE TRIGGER task_stats_delete
+    AFTER DELETE ON Task
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE PROCEDURE task_stats_sync();
+
+-- Начальное заполнение по текущим данным (миграция выполняется в одной транзакции)
+LOCK TABLE Task IN SHARE ROW EXCLUSIVE MODE;
+
+DELETE FROM user_task_stats;
+INSERT INTO user_task_stats (user_id, role, status, task_count, price_sum)
+SELECT created_by_user_id, 'creator', status, count(*), coalesce(sum(price), 0)
+FROM Task WHERE created_by_user_id IS NOT NULL
+GROUP BY created_by_user_id, status
+UNION ALL
+SELECT accepted_by_user_id, 'acceptor', status, count(*), coalesce(sum(price), 0)
+FROM Task WHERE accepted_by_user_id IS NOT NULL
+GROUP BY accepted_by_user_id, status;
+
+UPDATE "User" u
+SET order_count = coalesce(created.task_count, 0)
+FROM "User" target
+LEFT JOIN (
+    SELECT user_id, sum(task_count) AS task_count
+    FROM user_task_stats WHERE role = 'creator'
+    GROUP BY user_id
+) created ON created.user_id = target.id
+WHERE u.id = target.id AND u.order_count IS DISTINCT FROM coalesce(created.task_count, 0);
@@ -0,0 +1,301 @@
+"""
+Пул соединений psycopg2 с ограниченным ожиданием свободного соединения.
+
+В отличие от psycopg2.pool.ThreadedConnectionPool, который сразу бросает
+PoolError при исчерпании пула, запрос соединения встает в очередь (FIFO)
+и ждет до acquire_timeout секунд. Освобожденное соединение передается
+первому ожидающему напрямую, поэтому новые запросы не обгоняют очередь.
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+import psycopg2
+from psycopg2 import pool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+from prometheus_client import Counter, Gauge, Histogram
+
+pool_size = Gauge('db_pool_size', 'Open connections in the pool', ['pool'])
+pool_in_use = Gauge('db_pool_in_use', 'Connections checked out of the pool', ['pool'])
+pool_waiting = Gauge('db_pool_waiting', 'Threads waiting for a connection', ['pool'])
+pool_acquire_seconds = Histogram(
+    'db_pool_acquire_seconds', 'Time spent waiting for a pool connection', ['pool'],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+pool_acquire_timeouts_total = Counter('db_pool_acquire_timeouts_total', 'Pool acquire timeouts', ['pool'])
+pool_recycled_total = Counter('db_pool_recycled_total', 'Connections closed by the pool', ['pool', 'reason'])
+
+
+class PoolTimeoutError(pool.PoolError):
+    """Свободное соединение не появилось за acquire_timeout секунд"""
+
+
+class _Waiter:
+    """Место в очереди ожидания: получает соединение или право открыть новое"""
+    __slots__ = ('event', 'conn', 'may_connect')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.conn = None
+        self.may_connect = False
+
+
+class BoundedConnectionPool:
+    """
+    Потокобезопасный пул соединений с очередью ожидания и таймаутом.
+
+    - min_conn соединений открываются сразу при создании пула;
+    - соединение, простоявшее без дела дольше validate_after секунд,
+      проверяется запросом SELECT 1 перед выдачей;
+    - соединения старше max_lifetime секунд закрываются и открываются заново;
+    - размер пула, занятые соединения, очередь, время ожидания и таймауты
+      экспортируются в Prometheus с меткой pool.
+    """
+
+    def __init__(self, min_conn: int, max_conn: int, acquire_timeout: float = 5.0,
+                 max_lifetime: float = 1800.0, validate_after: float = 30.0,
+                 configure: Optional[Callable] = None, name: str = "primary", **connect_kwargs):
+        if min_conn < 0 or max_conn < 1 or min_conn > max_conn:
+            raise ValueError("expected 0 <= min_conn <= max_conn and max_conn >= 1")
+        self.min_conn = min_conn
+        self.max_conn = max_conn
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+        self.name = name
+        self._configure = configure
+        self._connect_kwargs = connect_kwargs
+
+        self._lock = threading.Lock()
+        self._idle = deque()  # (conn, returned_at), последнее возвращенное справа
+        self._created_at = {}  # id(conn) -> время открытия
+        self._in_use = set()  # id(conn)
+        self._waiters = deque()
+        self._size = 0  # открытые соединения и соединения в процессе открытия
+        self.closed = False
+
+        self._size_gauge = pool_size.labels(pool=name)
+        self._in_use_gauge = pool_in_use.labels(pool=name)
+        self._waiting_gauge = pool_waiting.labels(pool=name)
+        self._acquire_seconds = pool_acquire_seconds.labels(pool=name)
+        self._timeouts = pool_acquire_timeouts_total.labels(pool=name)
+
+        for _ in range(min_conn):
+            conn = self._open()
+            with self._lock:
+                self._size += 1
+                self._idle.append((conn, time.monotonic()))
+        self._update_gauges()
+
+    @property
+    def in_use(self) -> int:
+        """Количество выданных соединений"""
+        return len(self._in_use)
+
+    def owns(self, conn) -> bool:
+        """Выдано ли соединение этим пулом"""
+        return id(conn) in self._in_use
+
+    def getconn(self, timeout: Optional[float] = None):
+        """
+        Получить соединение, при необходимости дождавшись освобождения
+
+        Args:
+            timeout: Максимальное ожидание в секундах (по умолчанию acquire_timeout)
+
+        Returns:
+            Соединение psycopg2
+
+        Raises:
+            PoolTimeoutError: Если соединение не освободилось за отведенное время
+            PoolError: Если пул закрыт
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        conn = None
+        returned_at = started
+        waiter = None
+        with self._lock:
+            if self.closed:
+                raise pool.PoolError("connection pool is closed")
+            if self._idle and not self._waiters:
+                conn, returned_at = self._idle.pop()
+                self._in_use.add(id(conn))
+            elif self._size < self.max_conn:
+                self._size += 1
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+        self._update_gauges()
+
+        if waiter is not None:
+            if not waiter.event.wait(timeout):
+                with self._lock:
+                    granted = waiter.event.is_set()
+                    if not granted:
+                        self._waiters.remove(waiter)
+                if not granted:
+                    self._timeouts.inc()
+                    self._acquire_seconds.observe(time.monotonic() - started)
+                    self._update_gauges()
+                    raise PoolTimeoutError(
+                        f"no free connection in pool '{self.name}' after {timeout:.1f}s "
+                        f"(max_conn={self.max_conn})"
+                    )
+            if self.closed:
+                if waiter.conn is not None:
+                    self._in_use.discard(id(waiter.conn))
+                    self._discard(waiter.conn, "pool_closed")
+                raise pool.PoolError("connection pool is closed")
+            conn = waiter.conn
+
+        try:
+            conn = self._checkout(conn, returned_at, deadline)
+        except Exception:
+            self._release_slot()
+            raise
+        self._acquire_seconds.observe(time.monotonic() - started)
+        self._update_gauges()
+        return conn
+
+    def putconn(self, conn, close: bool = False):
+        """
+        Вернуть соединение в пул. Незавершенная транзакция откатывается,
+        разорванные и устаревшие соединения закрываются
+
+        Args:
+            conn: Соединение, полученное через getconn
+            close: Закрыть соединение вместо возврата в пул
+        """
+        with self._lock:
+            if id(conn) not in self._in_use:
+                raise pool.PoolError("trying to put unkeyed connection")
+            self._in_use.discard(id(conn))
+
+        reason = None
+        if close:
+            reason = "requested"
+        elif self.closed:
+            reason = "pool_closed"
+        elif conn.closed:
+            reason = "broken"
+        elif self._expired(conn):
+            reason = "max_lifetime"
+        else:
+            status = conn.info.transaction_status
+            if status == TRANSACTION_STATUS_UNKNOWN:
+                reason = "broken"
+            elif status != TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    reason = "broken"
+
+        if reason is not None:
+            self._discard(conn, reason)
+            self._release_slot()
+        else:
+            self._hand_over(conn)
+        self._update_gauges()
+
+    def closeall(self):
+        """Закрыть простаивающие соединения; выданные закроются при возврате"""
+        with self._lock:
+            self.closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            waiters = list(self._waiters)
+            self._waiters.clear()
+        for conn, _ in idle:
+            self._discard(conn, "pool_closed")
+        with self._lock:
+            self._size -= len(idle)
+        for waiter in waiters:
+            waiter.event.set()
+        self._update_gauges()
+
+    def _open(self):
+        """Открыть и настроить новое физическое соединение"""
+        conn = psycopg2.connect(**self._connect_kwargs)
+        if self._configure is not None:
+            self._configure(conn)
+        self._created_at[id(conn)] = time.monotonic()
+        return conn
+
+    def _checkout(self, conn, returned_at: float, deadline: float):
+        """
+        Подготовить соединение к выдаче: открыть новое (если выдано право
+        на открытие), закрыть устаревшее или проверить давно простаивающее
+        """
+        if conn is not None:
+            reason = self._checkout_problem(conn, returned_at)
+            if reason is None:
+                return conn
+            with self._lock:
+                self._in_use.discard(id(conn))
+            self._discard(conn, reason)
+        if time.monotonic() > deadline:
+            raise PoolTimeoutError(f"no free connection in pool '{self.name}' before deadline")
+        conn = self._open()
+        with self._lock:
+            self._in_use.add(id(conn))
+        return conn
+
+    def _checkout_problem(self, conn, returned_at: float) -> Optional[str]:
+        """Причина, по которой соединение нельзя выдавать, или None"""
+        if conn.closed:
+            return "broken"
+        if self._expired(conn):
+            return "max_lifetime"
+        if returned_at + self.validate_after < time.monotonic():
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                return "failed_validation"
+        return None
+
+    def _expired(self, conn) -> bool:
+        created_at = self._created_at.get(id(conn), 0)
+        return time.monotonic() - created_at > self.max_lifetime
+
+    def _hand_over(self, conn):
+        """Отдать соединение первому ожидающему или вернуть в простаивающие"""
+        now = time.monotonic()
+        with self._lock:
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.conn = conn
+                self._in_use.add(id(conn))
+                waiter.event.set()
+            else:
+                self._idle.append((conn, now))
+
+    def _release_slot(self):
+        """Освободить место закрытого соединения: передать право открыть новое ожидающему"""
+        with self._lock:
+            if self._waiters and not self.closed:
+                waiter = self._waiters.popleft()
+                waiter.may_connect = True
+                waiter.event.set()
+            else:
+                self._size -= 1
+
+    def _discard(self, conn, reason: Optional[str]):
+        if conn is None:
+            return
+        self._created_at.pop(id(conn), None)
+        if reason is not None:
+            pool_recycled_total.labels(pool=self.name, reason=reason).inc()
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def _update_gauges(self):
+        self._size_gauge.set(self._size)
+        self._in_use_gauge.set(len(self._in_use))
+        self._waiting_gauge.set(len(self._waiters))
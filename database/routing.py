@@ -0,0 +1,94 @@
+"""
+Маршрутизация запросов между основной БД и репликами.
+
+Читающие функции репозиториев берут соединение с реплики, запись идет
+на основную БД. После записи чтения клиента в течение
+DB_STICKY_PRIMARY_SECONDS тоже идут на основную БД, чтобы он увидел
+собственные изменения, даже если реплика еще отстает.
+"""
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Callable, Generic, List, Optional, TypeVar
+from database.config import DB_REPLICA_STRATEGY, DB_STICKY_PRIMARY_SECONDS
+
+REPLICA_STRATEGY_ROUND_ROBIN = "round_robin"
+REPLICA_STRATEGY_LEAST_BUSY = "least_busy"
+
+PoolT = TypeVar("PoolT")
+
+
+class ReadSession:
+    """
+    Состояние чтения клиента: до какого момента (time.time()) читать с основной БД.
+    Объект изменяемый, поэтому запись, сделанная в threadpool, видна обработчику запроса.
+    """
+    __slots__ = ("primary_until", "initial_primary_until")
+
+    def __init__(self, primary_until: float = 0.0):
+        self.primary_until = primary_until
+        self.initial_primary_until = primary_until
+
+    @property
+    def wrote(self) -> bool:
+        """Была ли в этой сессии запись, продлившая окно"""
+        return self.primary_until > self.initial_primary_until
+
+
+_read_session: ContextVar[Optional[ReadSession]] = ContextVar("read_session", default=None)
+
+
+def start_read_session(primary_until: float = 0.0) -> ReadSession:
+    """
+    Начать сессию чтения для текущего запроса
+
+    Args:
+        primary_until: Окно чтения с основной БД, перенесенное из предыдущих запросов клиента
+
+    Returns:
+        Сессия, привязанная к текущему контексту
+    """
+    session = ReadSession(primary_until)
+    _read_session.set(session)
+    return session
+
+
+def mark_write():
+    """Отметить запись: чтения сессии идут на основную БД в течение окна"""
+    session = _read_session.get()
+    if session is not None:
+        session.primary_until = max(session.primary_until, time.time() + DB_STICKY_PRIMARY_SECONDS)
+
+
+def prefer_primary() -> bool:
+    """Должно ли чтение в текущем контексте идти на основную БД"""
+    session = _read_session.get()
+    return session is not None and session.primary_until > time.time()
+
+
+class ReplicaSelector(Generic[PoolT]):
+    """
+    Выбор пула реплики для очередного чтения
+
+    Args:
+        pools: Пулы реплик
+        busy: Функция, возвращающая число занятых соединений пула (для least_busy)
+        strategy: round_robin или least_busy
+    """
+
+    def __init__(self, pools: List[PoolT], busy: Callable[[PoolT], int],
+                 strategy: str = DB_REPLICA_STRATEGY):
+        if strategy not in (REPLICA_STRATEGY_ROUND_ROBIN, REPLICA_STRATEGY_LEAST_BUSY):
+            raise ValueError(f"Unknown replica strategy '{strategy}'")
+        self.pools = pools
+        self.strategy = strategy
+        self._busy = busy
+        self._counter = itertools.count()
+
+    def choose(self) -> Optional[PoolT]:
+        """Пул реплики или None, если реплик нет"""
+        if not self.pools:
+            return None
+        if self.strategy == REPLICA_STRATEGY_LEAST_BUSY:
+            return min(self.pools, key=self._busy)
+        return self.pools[next(self._counter) % len(self.pools)]
@@ -6,8 +6,10 @@ from repositories.task_repository import (
     get_task_by_id,
     get_tasks_by_user_id,
     get_tasks_by_status,
-    get_tasks_by_accepted_user_id
+    get_tasks_by_accepted_user_id,
+    find_tasks
 )
+from repositories.task_query import TaskFilter
 from repositories.user_repository import (
     get_all_users,
     get_user_by_id,
@@ -21,6 +23,8 @@ __all__ = [
     "get_tasks_by_user_id",
     "get_tasks_by_status",
     "get_tasks_by_accepted_user_id",
+    "find_tasks",
+    "TaskFilter",
     # User repository
     "get_all_users",
     "get_user_by_id",
@@ -0,0 +1,237 @@
+"""
+Асинхронный репозиторий для работы с задачами в базе данных (asyncpg)
+"""
+from typing import AsyncIterator, List, Optional
+from database.async_connection import get_async_connection
+from DTOs.Task import Task
+from repositories.cache import task_cache
+from repositories.mappers import TASK_SELECT, task_from_row, task_dict_from_row, user_stats_from_rows
+from repositories.task_query import (TaskFilter, PARAMSTYLE_NUMERIC, USER_STATS_SUMMARY_QUERY,
+                                     USER_STATS_LIVE_QUERY, build_task_query, build_search_query)
+
+
+async def get_all_tasks() -> List[Task]:
+    """
+    Получить все задачи из базы данных
+
+    Returns:
+        Список объектов Task
+    """
+    async with get_async_connection(readonly=True) as conn:
+        rows = await conn.fetch(f'SELECT {TASK_SELECT} FROM Task ORDER BY id')
+        return [task_from_row(row) for row in rows]
+
+
+async def get_task_by_id(task_id: int) -> Optional[Task]:
+    """
+    Получить задачу по ID. Результат (в том числе отсутствие задачи)
+    кэшируется, см. repositories/cache.py
+
+    Args:
+        task_id: ID задачи
+
+    Returns:
+        Объект Task или None, если задача не найдена
+    """
+    return await task_cache.aget_or_load(task_id, _load_task_by_id)
+
+
+async def _load_task_by_id(task_id: int) -> Optional[Task]:
+    """Загрузить задачу по ID из БД, минуя кэш"""
+    async with get_async_connection(readonly=True) as conn:
+        row = await conn.fetchrow(f'SELECT {TASK_SELECT} FROM Task WHERE id = $1', task_id)
+        return task_from_row(row) if row is not None else None
+
+
+async def reload_task_by_id(task_id: int) -> Optional[Task]:
+    """
+    Загрузить задачу из БД в обход кэша и обновить запись в кэше.
+    Используется, когда версия в БД новее закэшированной
+
+    Args:
+        task_id: ID задачи
+
+    Returns:
+        Объект Task или None, если задача не найдена
+    """
+    generation = task_cache.generation(task_id)
+    task = await _load_task_by_id(task_id)
+    task_cache.set(task_id, task, generation)
+    return task
+
+
+async def get_task_version(task_id: int) -> Optional[str]:
+    """
+    Получить версию задачи (updated_at), не загружая строку целиком
+
+    Args:
+        task_id: ID задачи
+
+    Returns:
+        Версия задачи или None, если задача не найдена
+    """
+    async with get_async_connection(readonly=True) as conn:
+        row = await conn.fetchrow('SELECT updated_at FROM Task WHERE id = $1', task_id)
+        return str(row[0]) if row is not None else None
+
+
+async def get_tasks_page_version(task_filter: Optional[TaskFilter] = None, order_by: str = "id",
+                                 limit: Optional[int] = None, after_id: Optional[int] = None) -> tuple:
+    """
+    Получить версию страницы find_task_dicts: количество строк, сумму id
+    и max(updated_at). Запрос читает только id и updated_at, DTO не создаются
+
+    Args:
+        task_filter: Фильтры задач
+        order_by: Поле сортировки, "-" для убывания
+        limit: Размер страницы
+        after_id: Keyset-курсор
+
+    Returns:
+        Кортеж (count, sum(id), max(updated_at))
+
+    Raises:
+        ValueError: Если сортировка не поддерживается
+    """
+    page, params = build_task_query(task_filter, order_by, limit, after_id,
+                                    columns="id, updated_at", paramstyle=PARAMSTYLE_NUMERIC)
+    async with get_async_connection(readonly=True) as conn:
+        return tuple(await conn.fetchrow(f"SELECT count(*), sum(id), max(updated_at) FROM ({page}) page", *params))
+
+
+async def _find_rows(task_filter: Optional[TaskFilter], order_by: str,
+                     limit: Optional[int], after_id: Optional[int]) -> list:
+    """Выполнить запрос построителя и вернуть строки"""
+    query, params = build_task_query(task_filter, order_by, limit, after_id,
+                                     columns=TASK_SELECT, paramstyle=PARAMSTYLE_NUMERIC)
+    async with get_async_connection(readonly=True) as conn:
+        return await conn.fetch(query, *params)
+
+
+async def find_tasks(task_filter: Optional[TaskFilter] = None, order_by: str = "id",
+                     limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Task]:
+    """
+    Получить задачи по произвольной комбинации фильтров
+
+    Args:
+        task_filter: Фильтры (статус, создатель, исполнитель, диапазоны цены, дедлайна и даты создания)
+        order_by: Поле сортировки, "-" для убывания (id, price, deadline, created_at, updated_at)
+        limit: Максимальное количество задач (None - без ограничения)
+        after_id: Keyset-курсор, только при сортировке по id
+
+    Returns:
+        Список объектов Task
+
+    Raises:
+        ValueError: Если сортировка не поддерживается
+    """
+    return [task_from_row(row) for row in await _find_rows(task_filter, order_by, limit, after_id)]
+
+
+async def find_task_dicts(task_filter: Optional[TaskFilter] = None, order_by: str = "id",
+                          limit: Optional[int] = None, after_id: Optional[int] = None) -> List[dict]:
+    """
+    То же, что find_tasks, но сразу возвращает словари для JSON-ответа,
+    минуя создание объектов Task. Используется списковыми эндпоинтами.
+
+    Returns:
+        Список словарей в формате Task.to_dict()
+    """
+    return [task_dict_from_row(row) for row in await _find_rows(task_filter, order_by, limit, after_id)]
+
+
+async def search_task_dicts(text: str, task_filter: Optional[TaskFilter] = None,
+                            limit: int = 20, offset: int = 0) -> List[dict]:
+    """
+    Полнотекстовый поиск задач по названию и описанию, по убыванию релевантности
+
+    Args:
+        text: Строка поиска
+        task_filter: Дополнительные фильтры задач
+        limit: Размер страницы
+        offset: Смещение страницы
+
+    Returns:
+        Список словарей в формате Task.to_dict()
+    """
+    query, params = build_search_query(text, task_filter, limit, offset,
+                                       columns=TASK_SELECT, paramstyle=PARAMSTYLE_NUMERIC)
+    async with get_async_connection(readonly=True) as conn:
+        return [task_dict_from_row(row) for row in await conn.fetch(query, *params)]
+
+
+async def get_tasks_by_user_id(user_id: int) -> List[Task]:
+    """
+    Получить все задачи, созданные пользователем
+
+    Args:
+        user_id: ID пользователя
+
+    Returns:
+        Список объектов Task
+    """
+    return await find_tasks(TaskFilter(created_by_user_id=user_id))
+
+
+async def get_tasks_by_status(status: str) -> List[Task]:
+    """
+    Получить все задачи по статусу
+
+    Args:
+        status: Статус задачи (open, in_progress, completed, cancelled)
+
+    Returns:
+        Список объектов Task
+    """
+    return await find_tasks(TaskFilter(status=status))
+
+
+async def get_tasks_by_accepted_user_id(user_id: int) -> List[Task]:
+    """
+    Получить все задачи, принятые пользователем
+
+    Args:
+        user_id: ID пользователя
+
+    Returns:
+        Список объектов Task
+    """
+    return await find_tasks(TaskFilter(accepted_by_user_id=user_id))
+
+
+async def get_user_task_stats(user_id: int, live: bool = False) -> dict:
+    """
+    Сводка задач пользователя: количество по статусам среди созданных
+    и принятых задач и сумма оплаченных (выполненных) созданных задач
+
+    Args:
+        user_id: ID пользователя
+        live: Посчитать одним GROUP BY по Task вместо чтения таблицы
+              user_task_stats, которую поддерживает триггер (миграция 004)
+
+    Returns:
+        Словарь со сводкой, см. mappers.user_stats_from_rows
+    """
+    async with get_async_connection(readonly=True) as conn:
+        rows = await conn.fetch(USER_STATS_LIVE_QUERY if live else USER_STATS_SUMMARY_QUERY, user_id)
+        return user_stats_from_rows(user_id, rows)
+
+
+async def stream_tasks(task_filter: Optional[TaskFilter] = None, order_by: str = "id",
+                       batch_size: int = 2000) -> AsyncIterator[dict]:
+    """
+    Построчно выдать задачи через серверный курсор.
+    В памяти одновременно находится не больше batch_size строк.
+
+    Args:
+        task_filter: Фильтры задач
+        order_by: Поле сортировки, "-" для убывания
+        batch_size: Количество строк, получаемых с сервера за раз
+
+    Yields:
+        Словари в формате Task.to_dict()
+    """
+    query, params = build_task_query(task_filter, order_by, columns=TASK_SELECT, paramstyle=PARAMSTYLE_NUMERIC)
+    async with get_async_connection(transaction=True, readonly=True) as conn:
+        async for row in conn.cursor(query, *params, prefetch=batch_size):
+            yield task_dict_from_row(row)
@@ -0,0 +1,177 @@
+"""
+Асинхронный репозиторий для работы с пользователями в базе данных (asyncpg)
+"""
+from typing import AsyncIterator, List, Optional
+from database.async_connection import get_async_connection
+from DTOs.User import User
+from repositories.cache import MISSING, user_cache, user_email_cache
+from repositories.mappers import USER_SELECT, USER_PUBLIC_SELECT, user_from_row, user_dict_from_row
+
+
+async def get_all_users() -> List[User]:
+    """
+    Получить всех пользователей из базы данных
+
+    Returns:
+        Список объектов User
+    """
+    async with get_async_connection(readonly=True) as conn:
+        rows = await conn.fetch(f'SELECT {USER_SELECT} FROM "User" ORDER BY id')
+        return [user_from_row(row) for row in rows]
+
+
+async def get_user_by_id(user_id: int) -> Optional[User]:
+    """
+    Получить пользователя по ID. Результат (в том числе отсутствие
+    пользователя) кэшируется, см. repositories/cache.py
+
+    Args:
+        user_id: ID пользователя
+
+    Returns:
+        Объект User или None, если пользователь не найден
+    """
+    return await user_cache.aget_or_load(user_id, _load_user_by_id)
+
+
+async def _load_user_by_id(user_id: int) -> Optional[User]:
+    """Загрузить пользователя по ID из БД, минуя кэш"""
+    async with get_async_connection(readonly=True) as conn:
+        row = await conn.fetchrow(f'SELECT {USER_SELECT} FROM "User" WHERE id = $1', user_id)
+        return user_from_row(row) if row is not None else None
+
+
+async def reload_user_by_id(user_id: int) -> Optional[User]:
+    """
+    Загрузить пользователя из БД в обход кэша и обновить запись в кэше.
+    Используется, когда версия в БД новее закэшированной
+
+    Args:
+        user_id: ID пользователя
+
+    Returns:
+        Объект User или None, если пользователь не найден
+    """
+    generation = user_cache.generation(user_id)
+    user = await _load_user_by_id(user_id)
+    user_cache.set(user_id, user, generation)
+    return user
+
+
+async def get_user_version(user_id: int) -> Optional[str]:
+    """
+    Получить версию пользователя (updated_at), не загружая строку целиком
+
+    Args:
+        user_id: ID пользователя
+
+    Returns:
+        Версия пользователя или None, если пользователь не найден
+    """
+    async with get_async_connection(readonly=True) as conn:
+        row = await conn.fetchrow('SELECT updated_at FROM "User" WHERE id = $1', user_id)
+        return str(row[0]) if row is not None else None
+
+
+async def update_user_rating(user_id: int, new_rating: float) -> bool:
+    """
+    Обновить рейтинг пользователя
+
+    Args:
+        user_id: ID пользователя
+        new_rating: Новый рейтинг
+
+    Returns:
+        True если обновление успешно, False если пользователь не найден
+    """
+    async with get_async_connection() as conn:
+        status = await conn.execute('UPDATE "User" SET rating = $1 WHERE id = $2', new_rating, user_id)
+    user_cache.invalidate(user_id)
+    # asyncpg возвращает тег команды вида "UPDATE <n>"
+    return int(status.split()[-1]) > 0
+
+
+async def get_user_by_email(email: str) -> Optional[User]:
+    """
+    Получить пользователя по email. Кэшируется соответствие email -> id,
+    сам пользователь берется из кэша по id
+
+    Args:
+        email: Email пользователя
+
+    Returns:
+        Объект User или None, если пользователь не найден
+    """
+    user_id = user_email_cache.get(email)
+    if user_id is None:
+        return None
+    if user_id is not MISSING:
+        return await get_user_by_id(user_id)
+
+    generation = user_email_cache.generation(email)
+    user = await _load_user_by_email(email)
+    # В user_cache не кладем: поколение записи по id до загрузки неизвестно
+    user_email_cache.set(email, user.id if user is not None else None, generation)
+    return user
+
+
+async def _load_user_by_email(email: str) -> Optional[User]:
+    """Загрузить пользователя по email из БД, минуя кэш"""
+    async with get_async_connection(readonly=True) as conn:
+        row = await conn.fetchrow(f'SELECT {USER_SELECT} FROM "User" WHERE email = $1', email)
+        return user_from_row(row) if row is not None else None
+
+
+async def get_user_dicts_page(after_id: int = 0, limit: int = 100) -> List[dict]:
+    """
+    Получить страницу пользователей (keyset-пагинация по id) сразу
+    в виде словарей для JSON-ответа, минуя создание объектов User
+
+    Args:
+        after_id: Вернуть пользователей с id строго больше этого значения
+        limit: Максимальное количество пользователей
+
+    Returns:
+        Список словарей в формате User.to_dict(), упорядоченный по id
+    """
+    async with get_async_connection(readonly=True) as conn:
+        rows = await conn.fetch(
+            f'SELECT {USER_PUBLIC_SELECT} FROM "User" WHERE id > $1 ORDER BY id LIMIT $2', after_id, limit
+        )
+        return [user_dict_from_row(row) for row in rows]
+
+
+async def get_users_page_version(after_id: int = 0, limit: int = 100) -> tuple:
+    """
+    Получить версию страницы get_user_dicts_page: количество строк, сумму id
+    и max(updated_at). Запрос читает только id и updated_at, DTO не создаются
+
+    Args:
+        after_id: Keyset-курсор
+        limit: Размер страницы
+
+    Returns:
+        Кортеж (count, sum(id), max(updated_at))
+    """
+    async with get_async_connection(readonly=True) as conn:
+        return tuple(await conn.fetchrow(
+            'SELECT count(*), sum(id), max(updated_at) FROM '
+            '(SELECT id, updated_at FROM "User" WHERE id > $1 ORDER BY id LIMIT $2) page',
+            after_id, limit
+        ))
+
+
+async def stream_users(batch_size: int = 2000) -> AsyncIterator[dict]:
+    """
+    Построчно выдать всех пользователей через серверный курсор.
+    В памяти одновременно находится не больше batch_size строк.
+
+    Args:
+        batch_size: Количество строк, получаемых с сервера за раз
+
+    Yields:
+        Словари в формате User.to_dict(), упорядоченные по id
+    """
+    async with get_async_connection(transaction=True, readonly=True) as conn:
+        async for row in conn.cursor(f'SELECT {USER_PUBLIC_SELECT} FROM "User" ORDER BY id', prefetch=batch_size):
+            yield user_dict_from_row(row)
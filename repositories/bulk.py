@@ -0,0 +1,394 @@
+"""
+Массовый импорт и экспорт задач и пользователей через COPY.
+
+Импорт читает CSV или NDJSON построчно, проверяет записи теми же правилами,
+что и DTO, и загружает их пачками через COPY FROM STDIN. Некорректные
+строки не прерывают загрузку, а пишутся в файл отказов (NDJSON).
+Экспорт отдает таблицу через COPY TO STDOUT (CSV) или серверный курсор
+(NDJSON). В памяти в любой момент находится не больше одной пачки.
+
+Запуск:
+    python -m repositories.bulk import tasks tasks.csv --rejects tasks.rejects.ndjson
+    python -m repositories.bulk export users users.ndjson
+"""
+import argparse
+import csv
+import io
+import queue
+import sys
+import threading
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+import orjson
+import psycopg2
+
+from database.connection import get_db_cursor
+from DTOs.Task import Task
+from DTOs.User import User
+from repositories.mappers import TASK_SELECT, USER_PUBLIC_SELECT
+from repositories.task_repository import stream_tasks
+from repositories.user_repository import get_existing_user_ids, stream_users
+
+BULK_FORMATS = ("csv", "ndjson")
+BULK_ENTITIES = ("tasks", "users")
+
+# Колонки, заполняемые импортом. id, created_at/updated_at и order_count
+# выставляет БД (order_count поддерживают триггеры из миграции 004)
+TASK_IMPORT_COLUMNS = ('title', 'description', 'created_by_user_id', 'accepted_by_user_id',
+                       'status', 'price', 'deadline')
+USER_IMPORT_COLUMNS = ('first_name', 'last_name', 'middle_name', 'email', 'phone', 'balance',
+                       'registration_date', 'last_login', 'is_active', 'password', 'rating')
+
+EXPORT_QUERIES = {
+    "tasks": f"SELECT {TASK_SELECT} FROM Task ORDER BY id",
+    "users": f'SELECT {USER_PUBLIC_SELECT} FROM "User" ORDER BY id',
+}
+
+
+class ImportResult:
+    """Итог импорта: количество загруженных и отклоненных строк"""
+    __slots__ = ('imported', 'rejected')
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+
+    def to_dict(self):
+        return {"imported": self.imported, "rejected": self.rejected}
+
+
+def _text(record: dict, field: str, required: bool = False) -> Optional[str]:
+    value = record.get(field)
+    if value is None or value == "":
+        if required:
+            raise ValueError(f"'{field}' is required")
+        return None
+    return str(value)
+
+
+def _int(record: dict, field: str, required: bool = False) -> Optional[int]:
+    value = _text(record, field, required)
+    return int(value) if value is not None else None
+
+
+def _float(record: dict, field: str, default: Optional[float] = None) -> Optional[float]:
+    value = _text(record, field)
+    return float(value) if value is not None else default
+
+
+def _timestamp(record: dict, field: str) -> Optional[str]:
+    value = _text(record, field)
+    return datetime.fromisoformat(value).isoformat() if value is not None else None
+
+
+def _bool(record: dict, field: str, default: bool) -> bool:
+    value = record.get(field)
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    if str(value).lower() in ("true", "t", "1", "yes"):
+        return True
+    if str(value).lower() in ("false", "f", "0", "no"):
+        return False
+    raise ValueError(f"'{field}' must be a boolean, got '{value}'")
+
+
+def task_import_row(record: dict) -> tuple:
+    """
+    Проверить запись задачи и вернуть строку в порядке TASK_IMPORT_COLUMNS
+
+    Raises:
+        ValueError: Если запись некорректна
+    """
+    title = _text(record, 'title', required=True)
+    description = _text(record, 'description')
+    created_by_user_id = _int(record, 'created_by_user_id', required=True)
+    accepted_by_user_id = _int(record, 'accepted_by_user_id')
+    status = _text(record, 'status') or 'open'
+    price = _float(record, 'price')
+    deadline = _timestamp(record, 'deadline')
+    # Те же проверки, что при создании DTO (допустимый статус)
+    Task(None, title, created_by_user_id, description, accepted_by_user_id, status, price, deadline)
+    return title, description, created_by_user_id, accepted_by_user_id, status, price, deadline
+
+
+def user_import_row(record: dict) -> tuple:
+    """
+    Проверить запись пользователя и вернуть строку в порядке USER_IMPORT_COLUMNS
+
+    Raises:
+        ValueError: Если запись некорректна
+    """
+    first_name = _text(record, 'first_name', required=True)
+    last_name = _text(record, 'last_name', required=True)
+    middle_name = _text(record, 'middle_name')
+    email = _text(record, 'email', required=True)
+    if "@" not in email:
+        raise ValueError(f"'email' is not an email address: '{email}'")
+    phone = _text(record, 'phone')
+    balance = _float(record, 'balance', 0.0)
+    registration_date = _timestamp(record, 'registration_date') or datetime.now().isoformat()
+    last_login = _timestamp(record, 'last_login')
+    is_active = _bool(record, 'is_active', True)
+    password = _text(record, 'password') or ''
+    rating = _float(record, 'rating', 0.0)
+    User(None, first_name, last_name, middle_name, email, phone, 0, balance,
+         registration_date, last_login, is_active, password, rating)
+    return (first_name, last_name, middle_name, email, phone, balance,
+            registration_date, last_login, is_active, password, rating)
+
+
+def _tasks_with_existing_users(batch: List[Tuple[int, dict, tuple]]) -> Tuple[list, list]:
+    """Разделить пачку задач на строки с существующими пользователями и отказы"""
+    user_ids = {row[2] for _, _, row in batch} | {row[3] for _, _, row in batch if row[3] is not None}
+    existing = get_existing_user_ids(user_ids)
+    valid, rejected = [], []
+    for item in batch:
+        row = item[2]
+        missing = [user_id for user_id in (row[2], row[3]) if user_id is not None and user_id not in existing]
+        if missing:
+            rejected.append((item, f"user(s) {missing} not found"))
+        else:
+            valid.append(item)
+    return valid, rejected
+
+
+def iter_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    Построчно разобрать CSV (с заголовком) или NDJSON
+
+    Yields:
+        Пары (номер строки, словарь записи или ValueError для неразборчивой строки)
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield line_number, ValueError(f"invalid JSON: {e}")
+            continue
+        if isinstance(record, dict):
+            yield line_number, record
+        else:
+            yield line_number, ValueError("expected a JSON object")
+
+
+def _copy_rows(table: str, columns: Tuple[str, ...], rows: List[tuple]):
+    """Загрузить строки одной командой COPY в отдельной транзакции"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+    buffer.seek(0)
+    with get_db_cursor() as cursor:
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def _reject(rejects: Optional[TextIO], line_number: int, record, error: str):
+    if rejects is not None:
+        # У лишних колонок CSV ключ None, поэтому разрешаем нестроковые ключи
+        rejects.write(orjson.dumps({"line": line_number, "error": error, "record": record},
+                                   option=orjson.OPT_NON_STR_KEYS).decode() + "\n")
+
+
+def _import(table: str, columns: Tuple[str, ...], to_row: Callable[[dict], tuple],
+            lines: Iterable[str], fmt: str, rejects: Optional[TextIO], batch_size: int,
+            check_batch: Optional[Callable] = None) -> ImportResult:
+    result = ImportResult()
+
+    def flush(batch):
+        if check_batch is not None:
+            batch, rejected = check_batch(batch)
+            for (line_number, record, _), error in rejected:
+                _reject(rejects, line_number, record, error)
+            result.rejected += len(rejected)
+        if batch:
+            copy_or_split(batch)
+
+    def copy_or_split(batch):
+        try:
+            _copy_rows(table, columns, [row for _, _, row in batch])
+            result.imported += len(batch)
+        except psycopg2.Error as e:
+            if len(batch) == 1:
+                line_number, record, _ = batch[0]
+                _reject(rejects, line_number, record, str(e).strip())
+                result.rejected += 1
+                return
+            # Пачка отклонена целиком (например, дубликат email): делим пополам и
+            # повторяем, пока ошибочные строки не останутся по одной. k плохих
+            # строк стоят O(k log n) команд COPY, а не n
+            middle = len(batch) // 2
+            copy_or_split(batch[:middle])
+            copy_or_split(batch[middle:])
+
+    batch = []
+    for line_number, record in iter_records(lines, fmt):
+        if isinstance(record, ValueError):
+            _reject(rejects, line_number, None, str(record))
+            result.rejected += 1
+            continue
+        try:
+            batch.append((line_number, record, to_row(record)))
+        except (TypeError, ValueError) as e:
+            _reject(rejects, line_number, record, str(e))
+            result.rejected += 1
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return result
+
+
+def import_tasks(lines: Iterable[str], fmt: str = "csv", rejects: Optional[TextIO] = None,
+                 batch_size: int = 10000) -> ImportResult:
+    """
+    Импортировать задачи из CSV/NDJSON через COPY
+
+    Args:
+        lines: Строки входного файла (для CSV - с заголовком, файл открыт с newline="")
+        fmt: Формат: csv или ndjson
+        rejects: Файл для отклоненных строк (NDJSON: номер строки, ошибка, запись)
+        batch_size: Количество строк в одной команде COPY
+
+    Returns:
+        Количество загруженных и отклоненных строк
+    """
+    return _import("Task", TASK_IMPORT_COLUMNS, task_import_row, lines, fmt, rejects, batch_size,
+                   check_batch=_tasks_with_existing_users)
+
+
+def import_users(lines: Iterable[str], fmt: str = "csv", rejects: Optional[TextIO] = None,
+                 batch_size: int = 10000) -> ImportResult:
+    """
+    Импортировать пользователей из CSV/NDJSON через COPY
+
+    Args:
+        lines: Строки входного файла (для CSV - с заголовком, файл открыт с newline="")
+        fmt: Формат: csv или ndjson
+        rejects: Файл для отклоненных строк (NDJSON: номер строки, ошибка, запись)
+        batch_size: Количество строк в одной команде COPY
+
+    Returns:
+        Количество загруженных и отклоненных строк
+    """
+    return _import('"User"', USER_IMPORT_COLUMNS, user_import_row, lines, fmt, rejects, batch_size)
+
+
+class _QueueWriter:
+    """Файлоподобный приемник COPY TO STDOUT, передающий данные через ограниченную очередь"""
+
+    def __init__(self, chunks: queue.Queue):
+        self.chunks = chunks
+        self.cancelled = False
+
+    def write(self, data):
+        if self.cancelled:
+            raise IOError("export cancelled by the reader")
+        self.chunks.put(data.encode("utf-8") if isinstance(data, str) else bytes(data))
+
+
+_EXPORT_DONE = object()
+
+
+def iter_export(entity: str, fmt: str = "csv", max_chunks: int = 64) -> Iterator[bytes]:
+    """
+    Выгрузить таблицу по частям
+
+    CSV формируется сервером (COPY TO STDOUT) в фоновом потоке; очередь
+    из max_chunks частей ограничивает память, пока читатель отстает.
+    NDJSON строится по строкам серверного курсора.
+
+    Args:
+        entity: tasks или users
+        fmt: csv (с заголовком) или ndjson
+
+    Yields:
+        Части выгрузки в UTF-8
+    """
+    if fmt == "ndjson":
+        rows = stream_tasks() if entity == "tasks" else stream_users()
+        lines = []
+        for row in rows:
+            lines.append(orjson.dumps(row))
+            if len(lines) >= 1000:
+                yield b"\n".join(lines) + b"\n"
+                lines = []
+        if lines:
+            yield b"\n".join(lines) + b"\n"
+        return
+
+    chunks = queue.Queue(maxsize=max_chunks)
+    writer = _QueueWriter(chunks)
+
+    def copy():
+        try:
+            with get_db_cursor(readonly=True) as cursor:
+                cursor.copy_expert(f"COPY ({EXPORT_QUERIES[entity]}) TO STDOUT WITH (FORMAT csv, HEADER)", writer)
+            chunks.put(_EXPORT_DONE)
+        except Exception as e:
+            chunks.put(e)
+
+    thread = threading.Thread(target=copy, name=f"export-{entity}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is _EXPORT_DONE:
+                return
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+    finally:
+        # Читатель мог остановиться раньше: освобождаем поток COPY
+        writer.cancelled = True
+        while thread.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import/export of tasks and users via COPY")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command in ("import", "export"):
+        sub = subparsers.add_parser(command)
+        sub.add_argument("entity", choices=BULK_ENTITIES)
+        sub.add_argument("path")
+        sub.add_argument("--format", choices=BULK_FORMATS,
+                         help="csv или ndjson (по умолчанию по расширению файла)")
+        if command == "import":
+            sub.add_argument("--rejects", help="Файл отказов (по умолчанию <path>.rejects.ndjson)")
+            sub.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args(argv)
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+
+    if args.command == "export":
+        with open(args.path, "wb") as out:
+            for chunk in iter_export(args.entity, fmt):
+                out.write(chunk)
+        print(f"Exported {args.entity} to {args.path}")
+        return 0
+
+    importer = import_tasks if args.entity == "tasks" else import_users
+    rejects_path = args.rejects or f"{args.path}.rejects.ndjson"
+    with open(args.path, encoding="utf-8", newline="") as lines, \
+            open(rejects_path, "w", encoding="utf-8") as rejects:
+        result = importer(lines, fmt, rejects, args.batch_size)
+    print(f"Imported {result.imported} {args.entity}, rejected {result.rejected} (see {rejects_path})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Внутрипроцессный read-through кэш сущностей (LRU + TTL)
+"""
+import threading
+import time
+from collections import OrderedDict
+from prometheus_client import Counter, Gauge
+from database.config import CACHE_MAX_SIZE, CACHE_TTL_SECONDS, CACHE_NEGATIVE_TTL_SECONDS
+
+# Признак отсутствия записи в кэше (None - закэшированный отрицательный результат)
+MISSING = object()
+
+cache_hits_total = Counter('entity_cache_hits_total', 'Entity cache hits', ['cache'])
+cache_misses_total = Counter('entity_cache_misses_total', 'Entity cache misses', ['cache'])
+cache_evictions_total = Counter('entity_cache_evictions_total', 'Entity cache evictions', ['cache', 'reason'])
+cache_size = Gauge('entity_cache_size', 'Entity cache entries', ['cache'])
+
+
+class EntityCache:
+    """
+    Потокобезопасный LRU-кэш с ограниченным числом записей и временем жизни.
+    Отрицательные результаты (None) кэшируются с отдельным, более коротким TTL.
+
+    Каждая запись имеет поколение, invalidate() его увеличивает. Загрузка
+    запоминает поколение до чтения из БД, и если за время чтения запись
+    инвалидировали, загруженное (возможно, устаревшее) значение не сохраняется.
+    """
+
+    def __init__(self, name: str, max_size: int = CACHE_MAX_SIZE, ttl: float = CACHE_TTL_SECONDS,
+                 negative_ttl: float = CACHE_NEGATIVE_TTL_SECONDS):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._generations = {}  # key -> число инвалидаций
+        self._epoch = 0  # увеличивается при clear() и сбросе _generations
+        self._lock = threading.Lock()
+        self._hits = cache_hits_total.labels(cache=name)
+        self._misses = cache_misses_total.labels(cache=name)
+        self._size = cache_size.labels(cache=name)
+
+    def get(self, key):
+        """
+        Получить значение из кэша
+
+        Returns:
+            Значение (может быть None для отрицательного результата) или MISSING
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits.inc()
+                    return value
+                del self._entries[key]
+                cache_evictions_total.labels(cache=self.name, reason='expired').inc()
+                self._size.set(len(self._entries))
+        self._misses.inc()
+        return MISSING
+
+    def generation(self, key) -> tuple:
+        """Поколение записи; передается в set(), чтобы не сохранить значение, устаревшее за время загрузки"""
+        with self._lock:
+            return self._epoch, self._generations.get(key, 0)
+
+    def set(self, key, value, generation: tuple = None):
+        """
+        Сохранить значение, вытеснив самые давно использованные записи при переполнении
+
+        Args:
+            key: Ключ
+            value: Значение
+            generation: Поколение, полученное до загрузки значения; если с тех пор
+                запись инвалидировали, значение не сохраняется
+        """
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock:
+            if generation is not None and generation != (self._epoch, self._generations.get(key, 0)):
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                cache_evictions_total.labels(cache=self.name, reason='size').inc()
+            self._size.set(len(self._entries))
+
+    def invalidate(self, key):
+        """Удалить запись после изменения сущности"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            if len(self._generations) > self.max_size:
+                # Ограничиваем память: сброс счетчиков со сменой эпохи отменяет все идущие загрузки
+                self._generations.clear()
+                self._epoch += 1
+            if self._entries.pop(key, None) is not None:
+                cache_evictions_total.labels(cache=self.name, reason='invalidated').inc()
+                self._size.set(len(self._entries))
+
+    def clear(self):
+        """Очистить кэш полностью"""
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+            self._epoch += 1
+            self._size.set(0)
+
+    def get_or_load(self, key, loader):
+        """
+        Read-through: вернуть значение из кэша или загрузить и сохранить его
+
+        Args:
+            key: Ключ
+            loader: Функция загрузки из БД, вызывается с key
+        """
+        value = self.get(key)
+        if value is MISSING:
+            generation = self.generation(key)
+            value = loader(key)
+            self.set(key, value, generation)
+        return value
+
+    async def aget_or_load(self, key, loader):
+        """То же, что get_or_load, для асинхронной функции загрузки"""
+        value = self.get(key)
+        if value is MISSING:
+            generation = self.generation(key)
+            value = await loader(key)
+            self.set(key, value, generation)
+        return value
+
+
+# Кэши сущностей, общие для синхронного и асинхронного репозиториев
+user_cache = EntityCache('user')
+user_email_cache = EntityCache('user_email')  # email -> id пользователя
+task_cache = EntityCache('task')
@@ -0,0 +1,43 @@
+"""
+Выбор реализации репозитория (asyncpg или psycopg2) в зависимости от конфигурации
+"""
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from database.config import USE_ASYNC_DB
+
+
+async def call_repository(sync_fn, async_fn, *args, **kwargs):
+    """
+    Вызвать функцию репозитория из асинхронного обработчика.
+
+    При DB_DRIVER=asyncpg вызывается нативная асинхронная реализация,
+    иначе синхронная выполняется в threadpool, как раньше.
+
+    Args:
+        sync_fn: Синхронная функция репозитория (psycopg2)
+        async_fn: Асинхронная функция репозитория (asyncpg)
+
+    Returns:
+        Результат вызванной функции
+    """
+    if USE_ASYNC_DB:
+        return await async_fn(*args, **kwargs)
+    return await run_in_threadpool(sync_fn, *args, **kwargs)
+
+
+def stream_repository(sync_fn, async_fn, *args, **kwargs):
+    """
+    Получить асинхронный итератор по генератору репозитория.
+
+    Синхронный генератор (psycopg2) итерируется в threadpool,
+    чтобы не блокировать event loop во время чтения с сервера.
+
+    Args:
+        sync_fn: Синхронный генератор репозитория (psycopg2)
+        async_fn: Асинхронный генератор репозитория (asyncpg)
+
+    Returns:
+        Асинхронный итератор по результатам
+    """
+    if USE_ASYNC_DB:
+        return async_fn(*args, **kwargs)
+    return iterate_in_threadpool(sync_fn(*args, **kwargs))
@@ -0,0 +1,125 @@
+"""
+Преобразование строк БД в DTO и JSON-совместимые словари.
+
+Запросы выбирают колонки в фиксированном порядке (TASK_SELECT, USER_SELECT),
+поэтому строка - обычный кортеж (psycopg2) или asyncpg.Record, и один
+маппер на таблицу обслуживает все функции обоих репозиториев.
+"""
+from DTOs.Task import Task, VALID_STATUSES
+from DTOs.User import User
+
+TASK_COLUMNS = ('id', 'title', 'description', 'created_by_user_id', 'accepted_by_user_id',
+                'status', 'price', 'deadline', 'created_at', 'updated_at')
+TASK_SELECT = ", ".join(TASK_COLUMNS)
+
+USER_COLUMNS = ('id', 'first_name', 'last_name', 'middle_name', 'email', 'phone', 'order_count',
+                'balance', 'registration_date', 'last_login', 'is_active', 'password', 'rating', 'updated_at')
+USER_SELECT = ", ".join(USER_COLUMNS)
+
+# Для ответов API пароль не выбирается из БД вовсе
+USER_PUBLIC_COLUMNS = tuple(column for column in USER_COLUMNS if column != 'password')
+USER_PUBLIC_SELECT = ", ".join(USER_PUBLIC_COLUMNS)
+
+
+def task_from_row(row) -> Task:
+    """Строка с колонками TASK_COLUMNS -> Task"""
+    (id, title, description, created_by_user_id, accepted_by_user_id,
+     status, price, deadline, created_at, updated_at) = row
+    return Task(
+        id,
+        title,
+        created_by_user_id,
+        description or None,
+        accepted_by_user_id or None,
+        status,
+        float(price) if price else None,
+        str(deadline) if deadline else None,
+        str(created_at) if created_at else None,
+        str(updated_at) if updated_at else None
+    )
+
+
+def task_dict_from_row(row) -> dict:
+    """Строка с колонками TASK_COLUMNS -> словарь как Task.to_dict(), без промежуточного DTO"""
+    (id, title, description, created_by_user_id, accepted_by_user_id,
+     status, price, deadline, created_at, updated_at) = row
+    return {
+        "id": id,
+        "title": title,
+        "description": description or None,
+        "created_by_user_id": created_by_user_id,
+        "accepted_by_user_id": accepted_by_user_id or None,
+        "status": status,
+        "price": float(price) if price else None,
+        "deadline": str(deadline) if deadline else None,
+        "created_at": str(created_at) if created_at else None,
+        "updated_at": str(updated_at) if updated_at else None
+    }
+
+
+def user_from_row(row) -> User:
+    """Строка с колонками USER_COLUMNS -> User"""
+    (id, first_name, last_name, middle_name, email, phone, order_count,
+     balance, registration_date, last_login, is_active, password, rating, updated_at) = row
+    return User(
+        id,
+        first_name,
+        last_name,
+        middle_name or None,
+        email,
+        phone or None,
+        order_count,
+        float(balance),
+        str(registration_date),
+        str(last_login) if last_login else None,
+        is_active,
+        password or '',
+        float(rating or 0.0),
+        str(updated_at) if updated_at else None
+    )
+
+
+def user_dict_from_row(row) -> dict:
+    """Строка с колонками USER_PUBLIC_COLUMNS -> словарь как User.to_dict(), без промежуточного DTO"""
+    (id, first_name, last_name, middle_name, email, phone, order_count,
+     balance, registration_date, last_login, is_active, rating, updated_at) = row
+    return {
+        "id": id,
+        "first_name": first_name,
+        "last_name": last_name,
+        "middle_name": middle_name or None,
+        "email": email,
+        "phone": phone or None,
+        "order_count": order_count,
+        "balance": float(balance),
+        "registration_date": str(registration_date),
+        "last_login": str(last_login) if last_login else None,
+        "is_active": is_active,
+        "rating": float(rating or 0.0),
+        "updated_at": str(updated_at) if updated_at else None
+    }
+
+
+def user_stats_from_rows(user_id: int, rows) -> dict:
+    """
+    Строки (role, status, task_count, price_sum) -> сводка задач пользователя.
+    Статусы без задач заполняются нулями
+    """
+    created = dict.fromkeys(VALID_STATUSES, 0)
+    accepted = dict.fromkeys(VALID_STATUSES, 0)
+    total_spent = 0.0
+    for role, status, task_count, price_sum in rows:
+        if role == 'creator':
+            created[status] = int(task_count)
+            if status == 'completed':
+                total_spent = float(price_sum or 0)
+        else:
+            accepted[status] = int(task_count)
+    created["total"] = sum(created.values())
+    accepted["total"] = sum(accepted.values())
+    return {
+        "user_id": user_id,
+        "created": created,
+        "accepted": accepted,
+        "total_spent": total_spent
+    }
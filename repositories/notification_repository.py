@@ -1,8 +1,9 @@
 """
 Репозиторий для работы с уведомлениями
 """
+from typing import List, Optional, Tuple
 from DTOs.Notification import Notification
-from repositories.user_repository import get_user_by_id
+from repositories.user_repository import get_user_by_id, get_existing_user_ids
 
 
 def send_notification(recipient_id: int, message: str, notification_type: str) -> Notification:
@@ -31,3 +32,27 @@ def send_notification(recipient_id: int, message: str, notification_type: str) -
 
     print(f"Sending notification to user {recipient_id}: {message}")  # Заглушка
     return notification
+
+
+def send_notifications_bulk(items: List[Tuple[int, str, str]]) -> List[Optional[Notification]]:
+    """
+    Отправить пачку уведомлений. Все получатели проверяются одним запросом к БД.
+
+    Args:
+        items: Список (recipient_id, message, notification_type)
+
+    Returns:
+        Список той же длины: Notification или None, если получатель не найден
+    """
+    existing_ids = get_existing_user_ids(recipient_id for recipient_id, _, _ in items)
+
+    notifications = []
+    for recipient_id, message, notification_type in items:
+        if recipient_id not in existing_ids:
+            notifications.append(None)
+            continue
+        notifications.append(Notification(recipient_id, message, notification_type))
+
+    sent = sum(notification is not None for notification in notifications)
+    print(f"Sending {sent} of {len(items)} notifications in bulk")  # Заглушка, см. TODO в send_notification
+    return notifications
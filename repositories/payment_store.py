@@ -0,0 +1,182 @@
+"""
+Внутрипроцессное хранилище платежей для routers/payment.py.
+
+Обработчики выполняются конкурентно (async-обработчики в event loop,
+sync - в threadpool), поэтому все изменения идут через блокировки:
+- выдача id и обновление индексов - под общей блокировкой хранилища;
+- переходы pending -> processing -> completed/failed - под блокировкой
+  конкретного платежа, проверка статуса и его смена атомарны.
+Блокировки не удерживаются во время ожидания провайдера, а наружу
+отдаются копии записей, поэтому читатели не видят частично измененных данных.
+"""
+import asyncio
+import random
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+VALID_PAYMENT_METHODS = ('card', 'bank_transfer', 'electronic_wallet', 'crypto')
+
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+
+
+class PaymentNotFoundError(KeyError):
+    """Платеж с таким id не существует"""
+
+
+class PaymentStateError(ValueError):
+    """Переход недопустим в текущем статусе платежа"""
+
+    def __init__(self, payment_id: int, status: str):
+        super().__init__(f"Payment is already {status}. Cannot process again.")
+        self.payment_id = payment_id
+        self.status = status
+
+
+class PaymentStore:
+    """Потокобезопасное хранилище платежей с индексами по user_id и task_id"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._payments: Dict[int, dict] = {}
+        self._locks: Dict[int, threading.Lock] = {}
+        self._by_user: Dict[int, List[int]] = defaultdict(list)
+        self._by_task: Dict[int, List[int]] = defaultdict(list)
+
+    def create(self, task_id: int, user_id: int, amount: float, payment_method: str) -> dict:
+        """
+        Создать платеж в статусе pending
+
+        Returns:
+            Копия созданной записи
+        """
+        created_at = datetime.now().isoformat()
+        with self._lock:
+            payment_id = self._next_id
+            self._next_id += 1
+            payment = {
+                "payment_id": payment_id,
+                "task_id": task_id,
+                "user_id": user_id,
+                "amount": amount,
+                "payment_method": payment_method,
+                "status": STATUS_PENDING,
+                "created_at": created_at,
+                "completed_at": None,
+                "transaction_id": None
+            }
+            self._payments[payment_id] = payment
+            self._locks[payment_id] = threading.Lock()
+            self._by_user[user_id].append(payment_id)
+            self._by_task[task_id].append(payment_id)
+            return dict(payment)
+
+    def get(self, payment_id: int) -> dict:
+        """
+        Получить копию платежа
+
+        Raises:
+            PaymentNotFoundError: Если платежа нет
+        """
+        payment, lock = self._entry(payment_id)
+        with lock:
+            return dict(payment)
+
+    def list(self, user_id: Optional[int] = None, task_id: Optional[int] = None) -> List[dict]:
+        """
+        Получить платежи, при необходимости только пользователя и/или задачи.
+        Фильтры используют индексы, без просмотра всех платежей
+        """
+        with self._lock:
+            if user_id is not None and task_id is not None:
+                task_ids = set(self._by_task.get(task_id, ()))
+                ids = [pid for pid in self._by_user.get(user_id, ()) if pid in task_ids]
+            elif user_id is not None:
+                ids = list(self._by_user.get(user_id, ()))
+            elif task_id is not None:
+                ids = list(self._by_task.get(task_id, ()))
+            else:
+                ids = list(self._payments)
+            entries = [(self._payments[pid], self._locks[pid]) for pid in ids]
+        result = []
+        for payment, lock in entries:
+            with lock:
+                result.append(dict(payment))
+        return result
+
+    def begin_processing(self, payment_id: int) -> dict:
+        """
+        Атомарно перевести платеж pending -> processing.
+        Из двух одновременных вызовов успешен ровно один
+
+        Raises:
+            PaymentNotFoundError: Если платежа нет
+            PaymentStateError: Если платеж не в статусе pending
+        """
+        payment, lock = self._entry(payment_id)
+        with lock:
+            if payment["status"] != STATUS_PENDING:
+                raise PaymentStateError(payment_id, payment["status"])
+            payment["status"] = STATUS_PROCESSING
+            return dict(payment)
+
+    def finish(self, payment_id: int, successful: bool) -> dict:
+        """
+        Завершить обработку: processing -> completed или failed
+
+        Raises:
+            PaymentStateError: Если платеж не в статусе processing
+        """
+        payment, lock = self._entry(payment_id)
+        with lock:
+            if payment["status"] != STATUS_PROCESSING:
+                raise PaymentStateError(payment_id, payment["status"])
+            if successful:
+                payment["status"] = STATUS_COMPLETED
+                payment["transaction_id"] = f"TXN-{uuid.uuid4().hex[:12].upper()}"
+            else:
+                payment["status"] = STATUS_FAILED
+            payment["completed_at"] = datetime.now().isoformat()
+            return dict(payment)
+
+    def _entry(self, payment_id: int):
+        with self._lock:
+            payment = self._payments.get(payment_id)
+            if payment is None:
+                raise PaymentNotFoundError(payment_id)
+            return payment, self._locks[payment_id]
+
+
+async def process_stored_payment(store: PaymentStore, payment_id: int, provider_delay: float = 0.1,
+                                 success_rate: float = 0.9) -> dict:
+    """
+    Обработать платеж у (имитируемого) провайдера, не занимая поток на время ожидания
+
+    Args:
+        store: Хранилище платежей
+        payment_id: ID платежа
+        provider_delay: Время ответа провайдера в секундах
+        success_rate: Доля успешных оплат
+
+    Returns:
+        Копия платежа в статусе completed или failed
+
+    Raises:
+        PaymentNotFoundError: Если платежа нет
+        PaymentStateError: Если платеж уже обрабатывается или обработан
+    """
+    store.begin_processing(payment_id)
+    try:
+        await asyncio.sleep(provider_delay)
+        successful = random.random() < success_rate
+    except BaseException:
+        # Отмена запроса не должна оставить платеж навсегда в processing
+        store.finish(payment_id, successful=False)
+        raise
+    return store.finish(payment_id, successful)
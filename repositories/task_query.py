@@ -0,0 +1,196 @@
+"""
+Построитель параметризованных запросов для выборки задач с фильтрами
+"""
+import hashlib
+from typing import List, Optional, Tuple
+
+# Поля, по которым разрешена сортировка. Префикс "-" означает убывание.
+TASK_ORDER_FIELDS = ("id", "price", "deadline", "created_at", "updated_at")
+
+# Стили параметров: psycopg2 (%s) и asyncpg/PREPARE ($1, $2, ...)
+PARAMSTYLE_PYFORMAT = "pyformat"
+PARAMSTYLE_NUMERIC = "numeric"
+
+# Сводка задач пользователя (GET /users/{id}/stats): поддерживаемая триггером
+# таблица и эквивалентный ей расчет одним GROUP BY по Task
+USER_STATS_SUMMARY_QUERY = (
+    'SELECT role, status, task_count, price_sum FROM user_task_stats '
+    'WHERE user_id = $1 AND task_count > 0'
+)
+USER_STATS_LIVE_QUERY = (
+    "SELECT role, status, count(*), coalesce(sum(price), 0) FROM ("
+    "SELECT 'creator' AS role, status, price FROM Task WHERE created_by_user_id = $1 "
+    "UNION ALL "
+    "SELECT 'acceptor', status, price FROM Task WHERE accepted_by_user_id = $1"
+    ") t GROUP BY role, status"
+)
+
+
+class TaskFilter:
+    """Набор фильтров для выборки задач. Незаданные (None) фильтры не применяются."""
+
+    def __init__(self, status: Optional[str] = None, created_by_user_id: Optional[int] = None,
+                 accepted_by_user_id: Optional[int] = None, min_price: Optional[float] = None,
+                 max_price: Optional[float] = None, deadline_from=None, deadline_to=None,
+                 created_from=None, created_to=None):
+        self.status = status
+        self.created_by_user_id = created_by_user_id
+        self.accepted_by_user_id = accepted_by_user_id
+        self.min_price = min_price
+        self.max_price = max_price
+        self.deadline_from = deadline_from
+        self.deadline_to = deadline_to
+        self.created_from = created_from
+        self.created_to = created_to
+
+    def conditions(self) -> List[Tuple[str, object]]:
+        """
+        Список условий WHERE в виде пар (шаблон с {} вместо параметра, значение)
+        в фиксированном порядке, чтобы одинаковые комбинации давали одинаковый SQL
+        """
+        candidates = [
+            ("status = {}", self.status),
+            ("created_by_user_id = {}", self.created_by_user_id),
+            ("accepted_by_user_id = {}", self.accepted_by_user_id),
+            ("price >= {}", self.min_price),
+            ("price <= {}", self.max_price),
+            ("deadline >= {}", self.deadline_from),
+            ("deadline <= {}", self.deadline_to),
+            ("created_at >= {}", self.created_from),
+            ("created_at <= {}", self.created_to),
+        ]
+        return [(template, value) for template, value in candidates if value is not None]
+
+
+def _placeholder(paramstyle: str, index: int) -> str:
+    return f"${index}" if paramstyle == PARAMSTYLE_NUMERIC else "%s"
+
+
+def parse_order_by(order_by: str) -> Tuple[str, bool]:
+    """
+    Разобрать параметр сортировки
+
+    Args:
+        order_by: Имя поля, с префиксом "-" для убывания (например, "-created_at")
+
+    Returns:
+        Пара (поле, по убыванию)
+
+    Raises:
+        ValueError: Если поле сортировки не поддерживается
+    """
+    descending = order_by.startswith("-")
+    field = order_by.lstrip("-")
+    if field not in TASK_ORDER_FIELDS:
+        raise ValueError(f"order_by must be one of {list(TASK_ORDER_FIELDS)}, got '{order_by}'")
+    return field, descending
+
+
+def build_where(task_filter: Optional[TaskFilter], paramstyle: str = PARAMSTYLE_PYFORMAT,
+                after_id: Optional[int] = None, descending: bool = False) -> Tuple[str, list]:
+    """
+    Построить условие WHERE для фильтра
+
+    Args:
+        task_filter: Фильтры задач
+        paramstyle: Стиль параметров (pyformat или numeric)
+        after_id: Keyset-курсор по id
+        descending: Направление курсора (id < after_id при убывании)
+
+    Returns:
+        Пара (текст " WHERE ..." или пустая строка, список параметров)
+    """
+    conditions = task_filter.conditions() if task_filter else []
+    if after_id is not None:
+        conditions.append(("id < {}" if descending else "id > {}", after_id))
+    if not conditions:
+        return "", []
+    parts = []
+    params = []
+    for index, (template, value) in enumerate(conditions, start=1):
+        parts.append(template.format(_placeholder(paramstyle, index)))
+        params.append(value)
+    return " WHERE " + " AND ".join(parts), params
+
+
+def build_task_query(task_filter: Optional[TaskFilter] = None, order_by: str = "id",
+                     limit: Optional[int] = None, after_id: Optional[int] = None,
+                     columns: str = "*", paramstyle: str = PARAMSTYLE_PYFORMAT) -> Tuple[str, list]:
+    """
+    Построить запрос выборки задач с любым набором фильтров
+
+    Args:
+        task_filter: Фильтры задач
+        order_by: Поле сортировки, "-" для убывания. Порядок всегда дополняется id
+        limit: Ограничение количества строк (None - без ограничения)
+        after_id: Keyset-курсор, допустим только при сортировке по id
+        columns: Список колонок для SELECT
+        paramstyle: Стиль параметров (pyformat или numeric)
+
+    Returns:
+        Пара (текст запроса, список параметров)
+
+    Raises:
+        ValueError: Если сортировка не поддерживается или курсор несовместим с ней
+    """
+    field, descending = parse_order_by(order_by)
+    if after_id is not None and field != "id":
+        raise ValueError("after_id can only be combined with ordering by id")
+
+    where, params = build_where(task_filter, paramstyle, after_id, descending)
+    direction = " DESC" if descending else ""
+    order = f"id{direction}" if field == "id" else f"{field}{direction}, id{direction}"
+    query = f"SELECT {columns} FROM Task{where} ORDER BY {order}"
+    if limit is not None:
+        params.append(limit)
+        query += f" LIMIT {_placeholder(paramstyle, len(params))}"
+    return query, params
+
+
+def build_search_query(text: str, task_filter: Optional[TaskFilter] = None,
+                       limit: int = 20, offset: int = 0, columns: str = "Task.*",
+                       paramstyle: str = PARAMSTYLE_PYFORMAT) -> Tuple[str, list]:
+    """
+    Построить запрос полнотекстового поиска по названию и описанию задач.
+    Строка поиска разбирается websearch_to_tsquery в русской и английской
+    конфигурациях, совпадения ищутся по GIN-индексу на search_vector
+    (миграция 003) и упорядочиваются по релевантности
+
+    Args:
+        text: Строка поиска в синтаксисе веб-поиска ("фраза", -исключение, or)
+        task_filter: Дополнительные фильтры задач
+        limit: Размер страницы
+        offset: Смещение страницы
+        columns: Список колонок для SELECT
+        paramstyle: Стиль параметров (pyformat или numeric)
+
+    Returns:
+        Пара (текст запроса, список параметров)
+    """
+    where, filter_params = build_where(task_filter, paramstyle)
+    count = len(filter_params)
+    text_param, limit_param, offset_param = (
+        _placeholder(paramstyle, index) for index in range(count + 1, count + 4)
+    )
+    if paramstyle == PARAMSTYLE_PYFORMAT:
+        # %s подставляются по порядку в тексте, а строка поиска стоит раньше фильтров
+        params = [text, *filter_params, limit, offset]
+    else:
+        params = [*filter_params, text, limit, offset]
+    match = "search_vector @@ q.query"
+    where = f"{where} AND {match}" if where else f" WHERE {match}"
+    # Запрос tsquery строится один раз в подзапросе и используется и для поиска, и для ранжирования
+    query = (f"SELECT {columns} FROM Task, "
+             f"(SELECT websearch_to_tsquery('russian', s.text) || websearch_to_tsquery('english', s.text) AS query "
+             f"FROM (SELECT CAST({text_param} AS text) AS text) s) q"
+             f"{where} ORDER BY ts_rank(search_vector, q.query) DESC, id DESC "
+             f"LIMIT {limit_param} OFFSET {offset_param}")
+    return query, params
+
+
+def statement_name(prefix: str, query: str) -> str:
+    """
+    Стабильное имя подготовленного оператора для запроса.
+    Каждая комбинация фильтров подготавливается на соединении один раз.
+    """
+    return f"{prefix}_{hashlib.md5(query.encode('utf-8')).hexdigest()[:16]}"
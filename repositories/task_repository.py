@@ -1,72 +1,69 @@
 """
 Репозиторий для работы с задачами в базе данных
 """
-from typing import List, Optional
-from database.connection import get_db_cursor
+from typing import Iterator, List, Optional
+from database.connection import get_db_cursor, execute_prepared
 from DTOs.Task import Task
+from repositories.cache import task_cache
+from repositories.mappers import TASK_SELECT, task_from_row, task_dict_from_row, user_stats_from_rows
+from repositories.task_query import (TaskFilter, PARAMSTYLE_NUMERIC, USER_STATS_SUMMARY_QUERY,
+                                     USER_STATS_LIVE_QUERY, build_task_query, build_search_query,
+                                     statement_name)
 
 
-def _decode_string(value):
+
+def get_all_tasks() -> List[Task]:
+    """
+    Получить все задачи из базы данных
+    
+    Returns:
+        Список объектов Task
+    """
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, 'task_all', f'SELECT {TASK_SELECT} FROM Task ORDER BY id')
+        return [task_from_row(row) for row in cursor.fetchall()]
+
+
+def get_task_by_id(task_id: int) -> Optional[Task]:
     """
-    Декодирует строковое значение из БД в UTF-8
-    После пересоздания БД с правильной кодировкой и регистрации UNICODE типов
-    данные должны приходить уже в правильной кодировке
+    Получить задачу по ID. Результат (в том числе отсутствие задачи)
+    кэшируется, см. repositories/cache.py
     
     Args:
-        value: Значение из БД (может быть str, bytes или None)
+        task_id: ID задачи
         
     Returns:
-        Строка в UTF-8 или исходное значение
+        Объект Task или None, если задача не найдена
     """
-    if value is None:
-        return None
-    
-    # Если это bytes, декодируем через UTF-8
-    if isinstance(value, bytes):
-        try:
-            return value.decode('utf-8')
-        except UnicodeDecodeError:
-            return value.decode('utf-8', errors='replace')
-    
-    # Если это уже строка, возвращаем как есть
-    # После регистрации UNICODE типов и правильной настройки БД
-    # данные должны приходить уже в правильной кодировке
-    return value
+    return task_cache.get_or_load(task_id, _load_task_by_id)
 
 
-def get_all_tasks() -> List[Task]:
+def get_cached_task(task_id: int):
     """
-    Получить все задачи из базы данных
+    Прочитать задачу только из кэша, без обращения к БД.
+    Кэш общий для синхронного и асинхронного репозиториев
     
+    Args:
+        task_id: ID задачи
+        
     Returns:
-        Список объектов Task
+        Объект Task, None (закэшировано отсутствие) или MISSING, если записи нет
     """
-    with get_db_cursor(dict_cursor=True) as cursor:
-        cursor.execute('SELECT * FROM Task ORDER BY id')
-        tasks_data = cursor.fetchall()
-        
-        tasks = []
-        for task_data in tasks_data:
-            task = Task(
-                id=task_data['id'],
-                title=_decode_string(task_data['title']),
-                created_by_user_id=task_data['created_by_user_id'],
-                description=_decode_string(task_data['description']) if task_data['description'] else None,
-                accepted_by_user_id=task_data['accepted_by_user_id'] if task_data['accepted_by_user_id'] else None,
-                status=_decode_string(task_data['status']),
-                price=float(task_data['price']) if task_data['price'] else None,
-                deadline=str(task_data['deadline']) if task_data['deadline'] else None,
-                created_at=str(task_data['created_at']) if task_data['created_at'] else None,
-                updated_at=str(task_data['updated_at']) if task_data['updated_at'] else None
-            )
-            tasks.append(task)
-        
-        return tasks
+    return task_cache.get(task_id)
 
 
-def get_task_by_id(task_id: int) -> Optional[Task]:
+def _load_task_by_id(task_id: int) -> Optional[Task]:
+    """Загрузить задачу по ID из БД, минуя кэш"""
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, 'task_by_id', f'SELECT {TASK_SELECT} FROM Task WHERE id = $1', (task_id,))
+        row = cursor.fetchone()
+        return task_from_row(row) if row is not None else None
+
+
+def reload_task_by_id(task_id: int) -> Optional[Task]:
     """
-    Получить задачу по ID
+    Загрузить задачу из БД в обход кэша и обновить запись в кэше.
+    Используется, когда версия в БД новее закэшированной
     
     Args:
         task_id: ID задачи
@@ -74,27 +71,115 @@ def get_task_by_id(task_id: int) -> Optional[Task]:
     Returns:
         Объект Task или None, если задача не найдена
     """
-    with get_db_cursor(dict_cursor=True) as cursor:
-        cursor.execute('SELECT * FROM Task WHERE id = %s', (task_id,))
-        task_data = cursor.fetchone()
+    generation = task_cache.generation(task_id)
+    task = _load_task_by_id(task_id)
+    task_cache.set(task_id, task, generation)
+    return task
+
+
+def get_task_version(task_id: int) -> Optional[str]:
+    """
+    Получить версию задачи (updated_at), не загружая строку целиком
+    
+    Args:
+        task_id: ID задачи
         
-        if task_data is None:
-            return None
+    Returns:
+        Версия задачи или None, если задача не найдена
+    """
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, 'task_version', 'SELECT updated_at FROM Task WHERE id = $1', (task_id,))
+        row = cursor.fetchone()
+        return str(row[0]) if row is not None else None
+
+
+def get_tasks_page_version(task_filter: Optional[TaskFilter] = None, order_by: str = "id",
+                           limit: Optional[int] = None, after_id: Optional[int] = None) -> tuple:
+    """
+    Получить версию страницы find_task_dicts: количество строк, сумму id
+    и max(updated_at). Запрос читает только id и updated_at, DTO не создаются
+    
+    Args:
+        task_filter: Фильтры задач
+        order_by: Поле сортировки, "-" для убывания
+        limit: Размер страницы
+        after_id: Keyset-курсор
         
-        task = Task(
-            id=task_data['id'],
-            title=_decode_string(task_data['title']),
-            created_by_user_id=task_data['created_by_user_id'],
-            description=_decode_string(task_data['description']) if task_data['description'] else None,
-            accepted_by_user_id=task_data['accepted_by_user_id'] if task_data['accepted_by_user_id'] else None,
-            status=_decode_string(task_data['status']),
-            price=float(task_data['price']) if task_data['price'] else None,
-            deadline=str(task_data['deadline']) if task_data['deadline'] else None,
-            created_at=str(task_data['created_at']) if task_data['created_at'] else None,
-            updated_at=str(task_data['updated_at']) if task_data['updated_at'] else None
-        )
+    Returns:
+        Кортеж (count, sum(id), max(updated_at))
         
-        return task
+    Raises:
+        ValueError: Если сортировка не поддерживается
+    """
+    page, params = build_task_query(task_filter, order_by, limit, after_id,
+                                    columns="id, updated_at", paramstyle=PARAMSTYLE_NUMERIC)
+    query = f"SELECT count(*), sum(id), max(updated_at) FROM ({page}) page"
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, statement_name('task_page_version', query), query, tuple(params))
+        return tuple(cursor.fetchone())
+
+
+def _find_rows(task_filter: Optional[TaskFilter], order_by: str,
+               limit: Optional[int], after_id: Optional[int]) -> list:
+    """Выполнить запрос построителя и вернуть строки-кортежи"""
+    query, params = build_task_query(task_filter, order_by, limit, after_id,
+                                     columns=TASK_SELECT, paramstyle=PARAMSTYLE_NUMERIC)
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, statement_name('task_find', query), query, tuple(params))
+        return cursor.fetchall()
+
+
+def find_tasks(task_filter: Optional[TaskFilter] = None, order_by: str = "id",
+               limit: Optional[int] = None, after_id: Optional[int] = None) -> List[Task]:
+    """
+    Получить задачи по произвольной комбинации фильтров
+    
+    Args:
+        task_filter: Фильтры (статус, создатель, исполнитель, диапазоны цены, дедлайна и даты создания)
+        order_by: Поле сортировки, "-" для убывания (id, price, deadline, created_at, updated_at)
+        limit: Максимальное количество задач (None - без ограничения)
+        after_id: Keyset-курсор, только при сортировке по id
+        
+    Returns:
+        Список объектов Task
+        
+    Raises:
+        ValueError: Если сортировка не поддерживается
+    """
+    return [task_from_row(row) for row in _find_rows(task_filter, order_by, limit, after_id)]
+
+
+def find_task_dicts(task_filter: Optional[TaskFilter] = None, order_by: str = "id",
+                    limit: Optional[int] = None, after_id: Optional[int] = None) -> List[dict]:
+    """
+    То же, что find_tasks, но сразу возвращает словари для JSON-ответа,
+    минуя создание объектов Task. Используется списковыми эндпоинтами.
+    
+    Returns:
+        Список словарей в формате Task.to_dict()
+    """
+    return [task_dict_from_row(row) for row in _find_rows(task_filter, order_by, limit, after_id)]
+
+
+def search_task_dicts(text: str, task_filter: Optional[TaskFilter] = None,
+                      limit: int = 20, offset: int = 0) -> List[dict]:
+    """
+    Полнотекстовый поиск задач по названию и описанию, по убыванию релевантности
+    
+    Args:
+        text: Строка поиска
+        task_filter: Дополнительные фильтры задач
+        limit: Размер страницы
+        offset: Смещение страницы
+        
+    Returns:
+        Список словарей в формате Task.to_dict()
+    """
+    query, params = build_search_query(text, task_filter, limit, offset,
+                                       columns=TASK_SELECT, paramstyle=PARAMSTYLE_NUMERIC)
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, statement_name('task_search', query), query, tuple(params))
+        return [task_dict_from_row(row) for row in cursor.fetchall()]
 
 
 def get_tasks_by_user_id(user_id: int) -> List[Task]:
@@ -107,27 +192,7 @@ def get_tasks_by_user_id(user_id: int) -> List[Task]:
     Returns:
         Список объектов Task
     """
-    with get_db_cursor(dict_cursor=True) as cursor:
-        cursor.execute('SELECT * FROM Task WHERE created_by_user_id = %s ORDER BY id', (user_id,))
-        tasks_data = cursor.fetchall()
-        
-        tasks = []
-        for task_data in tasks_data:
-            task = Task(
-                id=task_data['id'],
-                title=_decode_string(task_data['title']),
-                created_by_user_id=task_data['created_by_user_id'],
-                description=_decode_string(task_data['description']) if task_data['description'] else None,
-                accepted_by_user_id=task_data['accepted_by_user_id'] if task_data['accepted_by_user_id'] else None,
-                status=_decode_string(task_data['status']),
-                price=float(task_data['price']) if task_data['price'] else None,
-                deadline=str(task_data['deadline']) if task_data['deadline'] else None,
-                created_at=str(task_data['created_at']) if task_data['created_at'] else None,
-                updated_at=str(task_data['updated_at']) if task_data['updated_at'] else None
-            )
-            tasks.append(task)
-        
-        return tasks
+    return find_tasks(TaskFilter(created_by_user_id=user_id))
 
 
 def get_tasks_by_status(status: str) -> List[Task]:
@@ -140,27 +205,7 @@ def get_tasks_by_status(status: str) -> List[Task]:
     Returns:
         Список объектов Task
     """
-    with get_db_cursor(dict_cursor=True) as cursor:
-        cursor.execute('SELECT * FROM Task WHERE status = %s ORDER BY id', (status,))
-        tasks_data = cursor.fetchall()
-        
-        tasks = []
-        for task_data in tasks_data:
-            task = Task(
-                id=task_data['id'],
-                title=_decode_string(task_data['title']),
-                created_by_user_id=task_data['created_by_user_id'],
-                description=_decode_string(task_data['description']) if task_data['description'] else None,
-                accepted_by_user_id=task_data['accepted_by_user_id'] if task_data['accepted_by_user_id'] else None,
-                status=_decode_string(task_data['status']),
-                price=float(task_data['price']) if task_data['price'] else None,
-                deadline=str(task_data['deadline']) if task_data['deadline'] else None,
-                created_at=str(task_data['created_at']) if task_data['created_at'] else None,
-                updated_at=str(task_data['updated_at']) if task_data['updated_at'] else None
-            )
-            tasks.append(task)
-        
-        return tasks
+    return find_tasks(TaskFilter(status=status))
 
 
 def get_tasks_by_accepted_user_id(user_id: int) -> List[Task]:
@@ -173,26 +218,46 @@ def get_tasks_by_accepted_user_id(user_id: int) -> List[Task]:
     Returns:
         Список объектов Task
     """
-    with get_db_cursor(dict_cursor=True) as cursor:
-        cursor.execute('SELECT * FROM Task WHERE accepted_by_user_id = %s ORDER BY id', (user_id,))
-        tasks_data = cursor.fetchall()
-        
-        tasks = []
-        for task_data in tasks_data:
-            task = Task(
-                id=task_data['id'],
-                title=_decode_string(task_data['title']),
-                created_by_user_id=task_data['created_by_user_id'],
-                description=_decode_string(task_data['description']) if task_data['description'] else None,
-                accepted_by_user_id=task_data['accepted_by_user_id'] if task_data['accepted_by_user_id'] else None,
-                status=_decode_string(task_data['status']),
-                price=float(task_data['price']) if task_data['price'] else None,
-                deadline=str(task_data['deadline']) if task_data['deadline'] else None,
-                created_at=str(task_data['created_at']) if task_data['created_at'] else None,
-                updated_at=str(task_data['updated_at']) if task_data['updated_at'] else None
-            )
-            tasks.append(task)
+    return find_tasks(TaskFilter(accepted_by_user_id=user_id))
+
+
+def get_user_task_stats(user_id: int, live: bool = False) -> dict:
+    """
+    Сводка задач пользователя: количество по статусам среди созданных
+    и принятых задач и сумма оплаченных (выполненных) созданных задач
+    
+    Args:
+        user_id: ID пользователя
+        live: Посчитать одним GROUP BY по Task вместо чтения таблицы
+              user_task_stats, которую поддерживает триггер (миграция 004)
         
-        return tasks
+    Returns:
+        Словарь со сводкой, см. mappers.user_stats_from_rows
+    """
+    with get_db_cursor(readonly=True) as cursor:
+        if live:
+            execute_prepared(cursor, 'task_user_stats_live', USER_STATS_LIVE_QUERY, (user_id,))
+        else:
+            execute_prepared(cursor, 'task_user_stats', USER_STATS_SUMMARY_QUERY, (user_id,))
+        return user_stats_from_rows(user_id, cursor.fetchall())
 
 
+def stream_tasks(task_filter: Optional[TaskFilter] = None, order_by: str = "id",
+                 batch_size: int = 2000) -> Iterator[dict]:
+    """
+    Построчно выдать задачи через серверный курсор.
+    В памяти одновременно находится не больше batch_size строк.
+    
+    Args:
+        task_filter: Фильтры задач
+        order_by: Поле сортировки, "-" для убывания
+        batch_size: Количество строк, получаемых с сервера за раз
+        
+    Yields:
+        Словари в формате Task.to_dict()
+    """
+    query, params = build_task_query(task_filter, order_by, columns=TASK_SELECT)
+    with get_db_cursor(name='tasks_export', itersize=batch_size, readonly=True) as cursor:
+        cursor.execute(query, params)
+        for row in cursor:
+            yield task_dict_from_row(row)
@@ -1,75 +1,65 @@
 """
 Репозиторий для работы с пользователями в базе данных
 """
-from typing import List, Optional
-from database.connection import get_db_cursor
+from typing import Iterable, Iterator, List, Optional, Set
+from database.connection import get_db_cursor, execute_prepared
 from DTOs.User import User
+from repositories.cache import MISSING, user_cache, user_email_cache
+from repositories.mappers import USER_SELECT, USER_PUBLIC_SELECT, user_from_row, user_dict_from_row
 
 
-def _decode_string(value):
+def get_all_users() -> List[User]:
+    """
+    Получить всех пользователей из базы данных
+    
+    Returns:
+        Список объектов User
+    """
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, 'user_all', f'SELECT {USER_SELECT} FROM "User" ORDER BY id')
+        return [user_from_row(row) for row in cursor.fetchall()]
+
+
+def get_user_by_id(user_id: int) -> Optional[User]:
     """
-    Декодирует строковое значение из БД в UTF-8
-    После пересоздания БД с правильной кодировкой и регистрации UNICODE типов
-    данные должны приходить уже в правильной кодировке
+    Получить пользователя по ID. Результат (в том числе отсутствие
+    пользователя) кэшируется, см. repositories/cache.py
     
     Args:
-        value: Значение из БД (может быть str, bytes или None)
+        user_id: ID пользователя
         
     Returns:
-        Строка в UTF-8 или исходное значение
+        Объект User или None, если пользователь не найден
     """
-    if value is None:
-        return None
-    
-    # Если это bytes, декодируем через UTF-8
-    if isinstance(value, bytes):
-        try:
-            return value.decode('utf-8')
-        except UnicodeDecodeError:
-            return value.decode('utf-8', errors='replace')
-    
-    # Если это уже строка, возвращаем как есть
-    # После регистрации UNICODE типов и правильной настройки БД
-    # данные должны приходить уже в правильной кодировке
-    return value
+    return user_cache.get_or_load(user_id, _load_user_by_id)
 
 
-def get_all_users() -> List[User]:
+def get_cached_user(user_id: int):
     """
-    Получить всех пользователей из базы данных
+    Прочитать пользователя только из кэша, без обращения к БД.
+    Кэш общий для синхронного и асинхронного репозиториев
     
+    Args:
+        user_id: ID пользователя
+        
     Returns:
-        Список объектов User
+        Объект User, None (закэшировано отсутствие) или MISSING, если записи нет
     """
-    with get_db_cursor(dict_cursor=True) as cursor:
-        cursor.execute('SELECT * FROM "User" ORDER BY id')
-        users_data = cursor.fetchall()
-        
-        users = []
-        for user_data in users_data:
-            user = User(
-                id=user_data['id'],
-                first_name=_decode_string(user_data['first_name']),
-                last_name=_decode_string(user_data['last_name']),
-                middle_name=_decode_string(user_data['middle_name']) if user_data['middle_name'] else None,
-                email=_decode_string(user_data['email']),
-                phone=_decode_string(user_data['phone']) if user_data['phone'] else None,
-                order_count=user_data['order_count'],
-                balance=float(user_data['balance']),
-                registration_date=str(user_data['registration_date']),
-                last_login=str(user_data['last_login']) if user_data['last_login'] else None,
-                is_active=user_data['is_active'],
-                password=_decode_string(user_data.get('password', '')),
-                rating=float(user_data.get('rating', 0.0))
-            )
-            users.append(user)
-        
-        return users
+    return user_cache.get(user_id)
 
 
-def get_user_by_id(user_id: int) -> Optional[User]:
+def _load_user_by_id(user_id: int) -> Optional[User]:
+    """Загрузить пользователя по ID из БД, минуя кэш"""
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, 'user_by_id', f'SELECT {USER_SELECT} FROM "User" WHERE id = $1', (user_id,))
+        row = cursor.fetchone()
+        return user_from_row(row) if row is not None else None
+
+
+def reload_user_by_id(user_id: int) -> Optional[User]:
     """
-    Получить пользователя по ID
+    Загрузить пользователя из БД в обход кэша и обновить запись в кэше.
+    Используется, когда версия в БД новее закэшированной
     
     Args:
         user_id: ID пользователя
@@ -77,30 +67,26 @@ def get_user_by_id(user_id: int) -> Optional[User]:
     Returns:
         Объект User или None, если пользователь не найден
     """
-    with get_db_cursor(dict_cursor=True) as cursor:
-        cursor.execute('SELECT * FROM "User" WHERE id = %s', (user_id,))
-        user_data = cursor.fetchone()
-        
-        if user_data is None:
-            return None
+    generation = user_cache.generation(user_id)
+    user = _load_user_by_id(user_id)
+    user_cache.set(user_id, user, generation)
+    return user
+
+
+def get_user_version(user_id: int) -> Optional[str]:
+    """
+    Получить версию пользователя (updated_at), не загружая строку целиком
+    
+    Args:
+        user_id: ID пользователя
         
-        user = User(
-            id=user_data['id'],
-            first_name=_decode_string(user_data['first_name']),
-            last_name=_decode_string(user_data['last_name']),
-            middle_name=_decode_string(user_data['middle_name']) if user_data['middle_name'] else None,
-            email=_decode_string(user_data['email']),
-            phone=_decode_string(user_data['phone']) if user_data['phone'] else None,
-            order_count=user_data['order_count'],
-            balance=float(user_data['balance']),
-            registration_date=str(user_data['registration_date']),
-            last_login=str(user_data['last_login']) if user_data['last_login'] else None,
-            is_active=user_data['is_active'],
-            password=_decode_string(user_data.get('password', '')),
-            rating=float(user_data.get('rating', 0.0))
-        )
-
-        return user
+    Returns:
+        Версия пользователя или None, если пользователь не найден
+    """
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, 'user_version', 'SELECT updated_at FROM "User" WHERE id = $1', (user_id,))
+        row = cursor.fetchone()
+        return str(row[0]) if row is not None else None
 
 
 def update_user_rating(user_id: int, new_rating: float) -> bool:
@@ -115,13 +101,49 @@ def update_user_rating(user_id: int, new_rating: float) -> bool:
         True если обновление успешно, False если пользователь не найден
     """
     with get_db_cursor() as cursor:
-        cursor.execute('UPDATE "User" SET rating = %s WHERE id = %s', (new_rating, user_id))
-        return cursor.rowcount > 0
+        execute_prepared(cursor, 'user_update_rating',
+                         'UPDATE "User" SET rating = $1 WHERE id = $2', (new_rating, user_id))
+        updated = cursor.rowcount > 0
+    user_cache.invalidate(user_id)
+    return updated
+
+
+def get_existing_user_ids(user_ids: Iterable[int]) -> Set[int]:
+    """
+    Проверить существование сразу нескольких пользователей одним запросом.
+    Пользователи, уже лежащие в кэше, в БД не запрашиваются.
+    
+    Args:
+        user_ids: ID пользователей
+        
+    Returns:
+        Множество ID, для которых пользователь существует
+    """
+    existing = set()
+    unknown = []
+    for user_id in set(user_ids):
+        cached = user_cache.get(user_id)
+        if cached is MISSING:
+            unknown.append(user_id)
+        elif cached is not None:
+            existing.add(user_id)
+    if not unknown:
+        return existing
+
+    generations = {user_id: user_cache.generation(user_id) for user_id in unknown}
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, 'user_ids_exist', 'SELECT id FROM "User" WHERE id = ANY($1)', (unknown,))
+        found = {row[0] for row in cursor.fetchall()}
+    for user_id in unknown:
+        if user_id not in found:
+            user_cache.set(user_id, None, generations[user_id])
+    return existing | found
 
 
 def get_user_by_email(email: str) -> Optional[User]:
     """
-    Получить пользователя по email
+    Получить пользователя по email. Кэшируется соответствие email -> id,
+    сам пользователь берется из кэша по id
     
     Args:
         email: Email пользователя
@@ -129,27 +151,78 @@ def get_user_by_email(email: str) -> Optional[User]:
     Returns:
         Объект User или None, если пользователь не найден
     """
-    with get_db_cursor(dict_cursor=True) as cursor:
-        cursor.execute('SELECT * FROM "User" WHERE email = %s', (email,))
-        user_data = cursor.fetchone()
+    user_id = user_email_cache.get(email)
+    if user_id is None:
+        return None
+    if user_id is not MISSING:
+        return get_user_by_id(user_id)
+
+    generation = user_email_cache.generation(email)
+    user = _load_user_by_email(email)
+    # В user_cache не кладем: поколение записи по id до загрузки неизвестно
+    user_email_cache.set(email, user.id if user is not None else None, generation)
+    return user
+
+
+def _load_user_by_email(email: str) -> Optional[User]:
+    """Загрузить пользователя по email из БД, минуя кэш"""
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, 'user_by_email', f'SELECT {USER_SELECT} FROM "User" WHERE email = $1', (email,))
+        row = cursor.fetchone()
+        return user_from_row(row) if row is not None else None
+
+
+def get_user_dicts_page(after_id: int = 0, limit: int = 100) -> List[dict]:
+    """
+    Получить страницу пользователей (keyset-пагинация по id) сразу
+    в виде словарей для JSON-ответа, минуя создание объектов User
+    
+    Args:
+        after_id: Вернуть пользователей с id строго больше этого значения
+        limit: Максимальное количество пользователей
+        
+    Returns:
+        Список словарей в формате User.to_dict(), упорядоченный по id
+    """
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, 'user_page',
+                         f'SELECT {USER_PUBLIC_SELECT} FROM "User" WHERE id > $1 ORDER BY id LIMIT $2',
+                         (after_id, limit))
+        return [user_dict_from_row(row) for row in cursor.fetchall()]
+
+
+def get_users_page_version(after_id: int = 0, limit: int = 100) -> tuple:
+    """
+    Получить версию страницы get_user_dicts_page: количество строк, сумму id
+    и max(updated_at). Запрос читает только id и updated_at, DTO не создаются
+    
+    Args:
+        after_id: Keyset-курсор
+        limit: Размер страницы
         
-        if user_data is None:
-            return None
+    Returns:
+        Кортеж (count, sum(id), max(updated_at))
+    """
+    with get_db_cursor(readonly=True) as cursor:
+        execute_prepared(cursor, 'user_page_version',
+                         'SELECT count(*), sum(id), max(updated_at) FROM '
+                         '(SELECT id, updated_at FROM "User" WHERE id > $1 ORDER BY id LIMIT $2) page',
+                         (after_id, limit))
+        return tuple(cursor.fetchone())
+
+
+def stream_users(batch_size: int = 2000) -> Iterator[dict]:
+    """
+    Построчно выдать всех пользователей через серверный курсор.
+    В памяти одновременно находится не больше batch_size строк.
+    
+    Args:
+        batch_size: Количество строк, получаемых с сервера за раз
         
-        user = User(
-            id=user_data['id'],
-            first_name=_decode_string(user_data['first_name']),
-            last_name=_decode_string(user_data['last_name']),
-            middle_name=_decode_string(user_data['middle_name']) if user_data['middle_name'] else None,
-            email=_decode_string(user_data['email']),
-            phone=_decode_string(user_data['phone']) if user_data['phone'] else None,
-            order_count=user_data['order_count'],
-            balance=float(user_data['balance']),
-            registration_date=str(user_data['registration_date']),
-            last_login=str(user_data['last_login']) if user_data['last_login'] else None,
-            is_active=user_data['is_active'],
-            password=_decode_string(user_data.get('password', '')),
-            rating=float(user_data.get('rating', 0.0))
-        )
-
-        return user
+    Yields:
+        Словари в формате User.to_dict(), упорядоченные по id
+    """
+    with get_db_cursor(name='users_export', itersize=batch_size, readonly=True) as cursor:
+        cursor.execute(f'SELECT {USER_PUBLIC_SELECT} FROM "User" ORDER BY id')
+        for row in cursor:
+            yield user_dict_from_row(row)
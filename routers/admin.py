@@ -0,0 +1,156 @@
+"""
+Административные роутеры: массовый импорт и экспорт данных
+"""
+import io
+import os
+import tempfile
+import uuid
+from contextlib import suppress
+from fastapi import APIRouter, HTTPException, Path, Query, Request
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from repositories import bulk
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+# Каталог для файлов отклоненных строк импорта
+REJECTS_DIR = os.getenv("BULK_REJECTS_DIR", tempfile.gettempdir())
+
+BULK_FORMAT_PATTERN = "^(csv|ndjson)$"
+REJECTS_ID_PATTERN = "^[0-9a-f]{32}$"
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson; charset=utf-8",
+}
+
+
+def _rejects_path(rejects_id: str) -> str:
+    return os.path.join(REJECTS_DIR, f"rejects-{rejects_id}.ndjson")
+
+
+def _run_import(importer, body, fmt: str, batch_size: int) -> dict:
+    """
+    Выполнить импорт из сохраненного тела запроса, записывая отказы в файл.
+    Файл остается на диске, только если есть отказы и импорт завершился
+    """
+    lines = io.TextIOWrapper(body, encoding="utf-8", newline="")
+    rejects_id = uuid.uuid4().hex
+    rejects_path = _rejects_path(rejects_id)
+    keep_rejects = False
+    try:
+        with open(rejects_path, "w", encoding="utf-8") as rejects:
+            result = importer(lines, fmt, rejects, batch_size)
+        keep_rejects = result.rejected > 0
+    finally:
+        lines.close()
+        if not keep_rejects:
+            with suppress(FileNotFoundError):
+                os.unlink(rejects_path)
+    response = result.to_dict()
+    if keep_rejects:
+        response["rejects_id"] = rejects_id
+    return response
+
+
+async def _import_endpoint(request: Request, importer, fmt: str, batch_size: int) -> dict:
+    # Тело сохраняется во временный файл на диске, а не в память;
+    # запись на диск идет в threadpool, чтобы не блокировать event loop
+    body = tempfile.TemporaryFile()
+    try:
+        async for chunk in request.stream():
+            await run_in_threadpool(body.write, chunk)
+        await run_in_threadpool(body.seek, 0)
+        return await run_in_threadpool(_run_import, importer, body, fmt, batch_size)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing data: {str(e)}")
+    finally:
+        body.close()
+
+
+@router.post("/tasks/import")
+async def import_tasks_endpoint(
+    request: Request,
+    fmt: str = Query("csv", alias="format", pattern=BULK_FORMAT_PATTERN),
+    batch_size: int = Query(10000, ge=1, le=100000)
+):
+    """
+    Импортировать задачи из тела запроса (CSV с заголовком или NDJSON)
+    
+    Query параметры:
+        format: csv или ndjson
+        batch_size: Количество строк в одной команде COPY
+    
+    Returns:
+        Количество загруженных и отклоненных строк; при отказах - rejects_id
+        для GET /admin/imports/rejects/{rejects_id}
+    """
+    return await _import_endpoint(request, bulk.import_tasks, fmt, batch_size)
+
+
+@router.post("/users/import")
+async def import_users_endpoint(
+    request: Request,
+    fmt: str = Query("csv", alias="format", pattern=BULK_FORMAT_PATTERN),
+    batch_size: int = Query(10000, ge=1, le=100000)
+):
+    """
+    Импортировать пользователей из тела запроса (CSV с заголовком или NDJSON)
+    
+    Query параметры:
+        format: csv или ndjson
+        batch_size: Количество строк в одной команде COPY
+    
+    Returns:
+        Количество загруженных и отклоненных строк; при отказах - rejects_id
+        для GET /admin/imports/rejects/{rejects_id}
+    """
+    return await _import_endpoint(request, bulk.import_users, fmt, batch_size)
+
+
+@router.get("/imports/rejects/{rejects_id}")
+async def get_import_rejects_endpoint(rejects_id: str = Path(..., pattern=REJECTS_ID_PATTERN)):
+    """
+    Скачать отклоненные строки импорта. Файл удаляется после отправки
+    
+    Args:
+        rejects_id: Идентификатор из ответа импорта
+        
+    Returns:
+        NDJSON: номер строки, ошибка и исходная запись
+        
+    Raises:
+        HTTPException: Если файла нет или он уже скачан
+    """
+    rejects_path = _rejects_path(rejects_id)
+    if not os.path.isfile(rejects_path):
+        raise HTTPException(status_code=404, detail=f"Rejects '{rejects_id}' not found")
+    return FileResponse(
+        rejects_path,
+        media_type=EXPORT_MEDIA_TYPES["ndjson"],
+        filename=f"rejects-{rejects_id}.ndjson",
+        background=BackgroundTask(os.unlink, rejects_path)
+    )
+
+
+@router.get("/{entity}/export")
+async def export_endpoint(entity: str, fmt: str = Query("csv", alias="format", pattern=BULK_FORMAT_PATTERN)):
+    """
+    Выгрузить всю таблицу потоком
+    
+    Args:
+        entity: tasks или users
+        
+    Query параметры:
+        format: csv (COPY TO STDOUT) или ndjson
+    
+    Returns:
+        Потоковый ответ с выгрузкой
+    """
+    if entity not in bulk.BULK_ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown entity '{entity}'")
+    return StreamingResponse(
+        iterate_in_threadpool(bulk.iter_export(entity, fmt)),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{fmt}"'}
+    )
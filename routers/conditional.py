@@ -0,0 +1,100 @@
+"""
+Условные GET-запросы: слабые ETag и ответ 304 Not Modified
+"""
+import hashlib
+from typing import Awaitable, Callable, Optional, Sequence
+from fastapi import Response
+
+from repositories.cache import MISSING
+
+
+def make_etag(*parts) -> str:
+    """
+    Слабый ETag по версии ресурса (updated_at, количество строк и т.п.)
+
+    Args:
+        parts: Значения, определяющие версию ответа
+
+    Returns:
+        Значение заголовка ETag вида W/"..."
+    """
+    version = "|".join(str(part) for part in parts)
+    return f'W/"{hashlib.md5(version.encode("utf-8")).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Проверить заголовок If-None-Match (слабое сравнение, RFC 7232)
+
+    Args:
+        if_none_match: Значение заголовка If-None-Match или None
+        etag: Текущий ETag ресурса
+
+    Returns:
+        True, если у клиента актуальная версия
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """Ответ 304 без тела"""
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def rows_version(rows: Sequence[dict]) -> tuple:
+    """
+    Версия уже выбранной страницы в том же виде, что и *_page_version
+    в репозиториях: (count, sum(id), max(updated_at))
+
+    Args:
+        rows: Словари строк с ключами id и updated_at
+
+    Returns:
+        Кортеж, дающий тот же ETag, что и версия страницы из БД
+    """
+    if not rows:
+        return 0, None, None
+    # max() в SQL пропускает NULL, здесь так же
+    return len(rows), sum(row["id"] for row in rows), max(
+        (row["updated_at"] for row in rows if row["updated_at"] is not None), default=None)
+
+
+async def cached_or_reload(cached, if_none_match: Optional[str],
+                           load_version: Callable[[], Awaitable[Optional[str]]],
+                           reload: Callable[[], Awaitable]):
+    """
+    Объект для условного GET: из кэша, если можно, иначе из БД.
+
+    Без If-None-Match закэшированная копия отдается как есть (в пределах TTL
+    кэша). Если клиент прислал ETag, копия могла устареть из-за изменений в
+    другом процессе, поэтому сверяем ее updated_at с версией в БД и перечитываем
+    строку только при расхождении
+
+    Args:
+        cached: Результат get_cached_* (объект, None или MISSING)
+        if_none_match: Значение заголовка If-None-Match или None
+        load_version: Запрос версии (updated_at) в БД
+        reload: Загрузка строки из БД в обход кэша
+
+    Returns:
+        Объект с updated_at или None, если его нет
+    """
+    if cached is MISSING:
+        return await reload()
+    if cached is None or not if_none_match:
+        return cached
+    version = await load_version()
+    if version is not None and version == cached.updated_at:
+        return cached
+    return await reload()
@@ -0,0 +1,56 @@
+"""
+ASGI middleware приложения
+"""
+import math
+import time
+from http.cookies import SimpleCookie
+from database.routing import start_read_session
+
+PRIMARY_UNTIL_COOKIE = "db_primary_until"
+
+
+def _primary_until_from_cookie(scope) -> float:
+    """Окно чтения с основной БД из cookie запроса (0, если cookie нет или оно испорчено)"""
+    for name, value in scope.get("headers", ()):
+        if name == b"cookie":
+            cookie = SimpleCookie()
+            cookie.load(value.decode("latin-1"))
+            morsel = cookie.get(PRIMARY_UNTIL_COOKIE)
+            if morsel is not None:
+                try:
+                    return float(morsel.value)
+                except ValueError:
+                    return 0.0
+    return 0.0
+
+
+class ReadSessionMiddleware:
+    """
+    Привязывает к запросу сессию чтения (database/routing.py).
+
+    Если во время запроса была запись, клиент получает cookie с моментом,
+    до которого его чтения направляются на основную БД, и следующие запросы
+    видят собственные изменения независимо от отставания реплик.
+    Реализован как чистый ASGI middleware: без BaseHTTPMiddleware
+    и буферизации ответа.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        session = start_read_session(_primary_until_from_cookie(scope))
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and session.wrote:
+                max_age = max(1, math.ceil(session.primary_until - time.time()))
+                cookie = (f"{PRIMARY_UNTIL_COOKIE}={session.primary_until:.3f}; "
+                          f"Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax")
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode("latin-1"))]}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -2,9 +2,10 @@
 Роутеры для работы с уведомлениями
 """
 from fastapi import APIRouter, HTTPException
-from repositories.notification_repository import send_notification
+from pydantic import BaseModel, Field
+from repositories.notification_repository import send_notification, send_notifications_bulk
 from repositories.user_repository import update_user_rating
-from typing import Dict
+from typing import Dict, List, Optional
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
@@ -142,3 +143,81 @@ def send_rating_changed_notification(recipient_id: int, new_rating: float):
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending notification: {str(e)}")
+
+
+# Шаблоны сообщений для пакетной отправки. rating_changed не поддерживается:
+# он требует обновления рейтинга в БД для каждого получателя
+BULK_MESSAGE_TEMPLATES = {
+    "new_message": "У вас новое сообщение от {sender_name}",
+    "new_response": "У вас новый отклик от {responder_name}",
+    "response_rejected": "Ваш отклик был отклонен",
+    "response_accepted": "Ваш отклик был принят",
+    "task_completed": "Работа '{task_title}' выполнена",
+}
+
+MAX_BULK_NOTIFICATIONS = 1000
+
+
+class BulkNotificationItem(BaseModel):
+    """Элемент пакетной отправки уведомлений"""
+    recipient_id: int
+    type: str
+    params: Dict[str, str] = Field(default_factory=dict)
+
+
+class BulkNotificationResult(BaseModel):
+    """Результат отправки одного элемента пакета"""
+    index: int
+    status: str  # sent, error
+    notification: Optional[Dict] = None
+    error: Optional[str] = None
+
+
+@router.post("/send-bulk", response_model=List[BulkNotificationResult])
+def send_bulk_notifications(items: List[BulkNotificationItem]):
+    """
+    Отправить пачку уведомлений разным получателям.
+    Все получатели проверяются одним запросом к БД; ошибка в одном элементе
+    не мешает отправке остальных.
+
+    Args:
+        items: Список (recipient_id, type, params). params - значения для шаблона
+               сообщения: sender_name, responder_name или task_title
+
+    Returns:
+        Результат для каждого элемента в исходном порядке
+    """
+    if len(items) > MAX_BULK_NOTIFICATIONS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_NOTIFICATIONS} notifications per request")
+
+    results = [None] * len(items)
+    to_send = []
+    positions = []
+    for index, item in enumerate(items):
+        template = BULK_MESSAGE_TEMPLATES.get(item.type)
+        if template is None:
+            results[index] = BulkNotificationResult(
+                index=index, status="error", error=f"Unsupported notification type '{item.type}'"
+            )
+            continue
+        try:
+            message = template.format(**item.params)
+        except KeyError as e:
+            results[index] = BulkNotificationResult(index=index, status="error", error=f"Missing param {e}")
+            continue
+        to_send.append((item.recipient_id, message, item.type))
+        positions.append(index)
+
+    try:
+        notifications = send_notifications_bulk(to_send) if to_send else []
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error sending notifications: {str(e)}")
+
+    for index, (recipient_id, _, _), notification in zip(positions, to_send, notifications):
+        if notification is None:
+            results[index] = BulkNotificationResult(
+                index=index, status="error", error=f"User with id {recipient_id} not found"
+            )
+        else:
+            results[index] = BulkNotificationResult(index=index, status="sent", notification=notification.to_dict())
+    return results
@@ -4,7 +4,9 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import datetime
+from repositories.payment_store import (PaymentStore, PaymentNotFoundError, PaymentStateError,
+                                        VALID_PAYMENT_METHODS, STATUS_COMPLETED,
+                                        process_stored_payment)
 
 router = APIRouter(prefix="/payment", tags=["payment"])
 
@@ -46,9 +48,11 @@ class ProcessPaymentResponse(BaseModel):
     completed_at: Optional[str] = None
 
 
-# Временное хранилище платежей (в реальном приложении это должно быть в БД)
-_payments_storage = {}
-_payment_counter = 0
+# Хранилище платежей процесса (в реальном приложении это должно быть в БД)
+payment_store = PaymentStore()
+
+# Время ответа имитируемого платежного провайдера, секунды
+PROVIDER_DELAY_SECONDS = 0.1
 
 
 @router.post("/select-method", response_model=PaymentMethodResponse)
@@ -62,14 +66,11 @@ def select_payment_method(request: PaymentMethodRequest):
     Returns:
         Информация о созданном платеже
     """
-    global _payment_counter
-    
     # Валидация способа оплаты
-    valid_methods = ['card', 'bank_transfer', 'electronic_wallet', 'crypto']
-    if request.payment_method not in valid_methods:
+    if request.payment_method not in VALID_PAYMENT_METHODS:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid payment method. Must be one of: {', '.join(valid_methods)}"
+            detail=f"Invalid payment method. Must be one of: {', '.join(VALID_PAYMENT_METHODS)}"
         )
     
     # Валидация суммы
@@ -79,40 +80,26 @@ def select_payment_method(request: PaymentMethodRequest):
             detail="Amount must be greater than 0"
         )
     
-    # Создаем платеж
-    _payment_counter += 1
-    payment_id = _payment_counter
-    
-    payment_data = {
-        "payment_id": payment_id,
-        "task_id": request.task_id,
-        "user_id": request.user_id,
-        "amount": request.amount,
-        "payment_method": request.payment_method,
-        "status": "pending",
-        "created_at": datetime.now().isoformat(),
-        "completed_at": None,
-        "transaction_id": None
-    }
-    
-    _payments_storage[payment_id] = payment_data
+    # Создаем платеж (id выдается атомарно)
+    payment = payment_store.create(request.task_id, request.user_id, request.amount, request.payment_method)
     
     return PaymentMethodResponse(
-        payment_id=payment_id,
+        payment_id=payment["payment_id"],
         task_id=request.task_id,
         user_id=request.user_id,
         amount=request.amount,
         payment_method=request.payment_method,
-        status="pending",
+        status=payment["status"],
         message=f"Payment method '{request.payment_method}' selected. Ready to process.",
-        created_at=payment_data["created_at"]
+        created_at=payment["created_at"]
     )
 
 
 @router.post("/process", response_model=ProcessPaymentResponse)
-def process_payment(request: ProcessPaymentRequest):
+async def process_payment(request: ProcessPaymentRequest):
     """
-    Произвести оплату
+    Произвести оплату. Ожидание провайдера не занимает поток,
+    повторная или одновременная обработка того же платежа отклоняется
     
     Args:
         request: Данные о платеже (payment_id, payment_details)
@@ -120,51 +107,27 @@ def process_payment(request: ProcessPaymentRequest):
     Returns:
         Результат выполнения оплаты
     """
-    # Проверяем, существует ли платеж
-    if request.payment_id not in _payments_storage:
+    try:
+        payment = await process_stored_payment(payment_store, request.payment_id, PROVIDER_DELAY_SECONDS)
+    except PaymentNotFoundError:
         raise HTTPException(
             status_code=404,
             detail=f"Payment with id {request.payment_id} not found"
         )
+    except PaymentStateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    payment = _payments_storage[request.payment_id]
-    
-    # Проверяем статус платежа
-    if payment["status"] != "pending":
-        raise HTTPException(
-            status_code=400,
-            detail=f"Payment is already {payment['status']}. Cannot process again."
-        )
-    
-    # Имитация обработки платежа
-    import random
-    import time
-    
-    # Устанавливаем статус "processing"
-    payment["status"] = "processing"
-    
-    # Имитация задержки обработки
-    time.sleep(0.1)
-    
-    # Имитация успешной/неуспешной оплаты (90% успех)
-    is_successful = random.random() > 0.1
-    
-    if is_successful:
-        payment["status"] = "completed"
-        payment["transaction_id"] = f"TXN-{random.randint(100000, 999999)}"
-        payment["completed_at"] = datetime.now().isoformat()
+    if payment["status"] == STATUS_COMPLETED:
         message = f"Payment processed successfully. Transaction ID: {payment['transaction_id']}"
     else:
-        payment["status"] = "failed"
-        payment["completed_at"] = datetime.now().isoformat()
         message = "Payment processing failed. Please try again or contact support."
     
     return ProcessPaymentResponse(
         payment_id=request.payment_id,
         status=payment["status"],
-        transaction_id=payment.get("transaction_id"),
+        transaction_id=payment["transaction_id"],
         message=message,
-        completed_at=payment.get("completed_at")
+        completed_at=payment["completed_at"]
     )
 
 
@@ -179,22 +142,25 @@ def get_payment(payment_id: int):
     Returns:
         Информация о платеже
     """
-    if payment_id not in _payments_storage:
+    try:
+        return payment_store.get(payment_id)
+    except PaymentNotFoundError:
         raise HTTPException(
             status_code=404,
             detail=f"Payment with id {payment_id} not found"
         )
-    
-    return _payments_storage[payment_id]
 
 
 @router.get("/", response_model=List[dict])
-def get_all_payments():
+def get_all_payments(user_id: Optional[int] = None, task_id: Optional[int] = None):
     """
-    Получить список всех платежей
+    Получить список платежей
+    
+    Query параметры:
+        user_id: Только платежи пользователя
+        task_id: Только платежи по задаче
     
     Returns:
-        Список всех платежей
+        Список платежей
     """
-    return list(_payments_storage.values())
-
+    return payment_store.list(user_id=user_id, task_id=task_id)
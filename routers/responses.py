@@ -0,0 +1,12 @@
+"""
+Быстрый класс JSON-ответа приложения
+"""
+from fastapi.responses import ORJSONResponse
+
+
+class UTF8ORJSONResponse(ORJSONResponse):
+    """
+    JSON-ответ, сериализуемый через orjson, с кодировкой прямо в media type.
+    Заменяет middleware, который переписывал заголовок content-type у каждого ответа.
+    """
+    media_type = "application/json; charset=utf-8"
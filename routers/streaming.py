@@ -0,0 +1,53 @@
+"""
+Потоковая отдача больших списков без загрузки всей таблицы в память
+"""
+import orjson
+from typing import AsyncIterator, List
+from fastapi.responses import StreamingResponse
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "json": "application/json; charset=utf-8",
+}
+
+# Параметры запроса для выбора формата потоковой выдачи
+STREAM_FORMAT_PATTERN = "^(ndjson|json)$"
+
+
+def _render_chunk(lines: List[bytes], stream_format: str, continued: bool) -> bytes:
+    """Склеить сериализованные строки в один фрагмент ответа"""
+    if stream_format == "ndjson":
+        return b"\n".join(lines) + b"\n"
+    return (b"," if continued else b"") + b",".join(lines)
+
+
+def stream_rows_response(items: AsyncIterator, stream_format: str = "ndjson",
+                         chunk_rows: int = 500) -> StreamingResponse:
+    """
+    Построить потоковый ответ из асинхронного итератора строк.
+
+    Args:
+        items: Асинхронный итератор JSON-совместимых словарей
+        stream_format: "ndjson" (объект на строку) или "json" (массив, отдаваемый частями)
+        chunk_rows: Количество объектов в одном фрагменте ответа
+
+    Returns:
+        StreamingResponse с chunked-телом
+    """
+    async def body():
+        if stream_format == "json":
+            yield b"["
+        lines = []
+        continued = False
+        async for item in items:
+            lines.append(orjson.dumps(item))
+            if len(lines) >= chunk_rows:
+                yield _render_chunk(lines, stream_format, continued)
+                lines = []
+                continued = True
+        if lines:
+            yield _render_chunk(lines, stream_format, continued)
+        if stream_format == "json":
+            yield b"]"
+
+    return StreamingResponse(body(), media_type=STREAM_MEDIA_TYPES[stream_format])
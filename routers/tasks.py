@@ -1,68 +1,164 @@
 """
 Роутеры для работы с задачами
 """
-from fastapi import APIRouter, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Header, HTTPException, Query
 from typing import List, Optional
-from repositories.task_repository import (
-    get_all_tasks,
-    get_task_by_id,
-    get_tasks_by_user_id,
-    get_tasks_by_status,
-    get_tasks_by_accepted_user_id
-)
+from repositories import task_repository, async_task_repository
+from repositories.task_query import TaskFilter, parse_order_by
+from repositories.dispatch import call_repository, stream_repository
+from routers.conditional import cached_or_reload, etag_matches, make_etag, not_modified, rows_version
+from routers.responses import UTF8ORJSONResponse
+from routers.streaming import STREAM_FORMAT_PATTERN, stream_rows_response
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
 
 @router.get("/", response_model=List[dict])
-def get_tasks_endpoint(status: Optional[str] = None, user_id: Optional[int] = None, accepted_by: Optional[int] = None):
+async def get_tasks_endpoint(
+    status: Optional[str] = None,
+    user_id: Optional[int] = None,
+    accepted_by: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    deadline_from: Optional[datetime] = None,
+    deadline_to: Optional[datetime] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    order_by: str = "id",
+    after_id: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    stream: bool = False,
+    stream_format: str = Query("ndjson", alias="format", pattern=STREAM_FORMAT_PATTERN),
+    if_none_match: Optional[str] = Header(None)
+):
     """
-    Получить список всех задач
+    Получить список задач. Все переданные фильтры применяются одновременно.
     
     Query параметры:
         status: Фильтр по статусу (open, in_progress, completed, cancelled)
         user_id: Фильтр по ID создателя задачи
         accepted_by: Фильтр по ID пользователя, принявшего задачу
+        min_price, max_price: Диапазон цены
+        deadline_from, deadline_to: Окно дедлайна
+        created_from, created_to: Диапазон даты создания
+        order_by: Поле сортировки (id, price, deadline, created_at, updated_at), "-" для убывания
+        after_id: Курсор: продолжить после задачи с этим id (только при сортировке по id)
+        limit: Размер страницы (по умолчанию 100, максимум 1000)
+        stream: Выгрузить все подходящие задачи потоком через серверный курсор
+        format: Формат потока: ndjson или json
     
     Returns:
-        Список задач
+        Список задач. Если есть следующая страница, ее курсор передается
+        в заголовке X-Next-After-Id. Страница отдается со слабым ETag;
+        при совпадении с If-None-Match возвращается 304 без тела
     """
+    task_filter = TaskFilter(
+        status=status,
+        created_by_user_id=user_id,
+        accepted_by_user_id=accepted_by,
+        min_price=min_price,
+        max_price=max_price,
+        deadline_from=deadline_from,
+        deadline_to=deadline_to,
+        created_from=created_from,
+        created_to=created_to
+    )
     try:
-        if status:
-            tasks = get_tasks_by_status(status)
-        elif user_id:
-            tasks = get_tasks_by_user_id(user_id)
-        elif accepted_by:
-            tasks = get_tasks_by_accepted_user_id(accepted_by)
-        else:
-            tasks = get_all_tasks()
+        if stream:
+            parse_order_by(order_by)
+            return stream_rows_response(
+                stream_repository(task_repository.stream_tasks, async_task_repository.stream_tasks,
+                                  task_filter, order_by),
+                stream_format
+            )
+
+        if if_none_match:
+            # Легкая проверка версии вместо выборки страницы целиком
+            version = await call_repository(task_repository.get_tasks_page_version,
+                                            async_task_repository.get_tasks_page_version,
+                                            task_filter, order_by, limit, after_id)
+            etag = make_etag("tasks", task_filter.conditions(), order_by, limit, after_id, *version)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        tasks = await call_repository(task_repository.find_task_dicts, async_task_repository.find_task_dicts,
+                                      task_filter, order_by, limit, after_id)
+        headers = {"ETag": make_etag("tasks", task_filter.conditions(), order_by, limit, after_id,
+                                     *rows_version(tasks))}
+        if len(tasks) == limit and order_by.lstrip("-") == "id":
+            headers["X-Next-After-Id"] = str(tasks[-1]["id"])
         
-        return [task.to_dict() for task in tasks]
+        # Словари уже готовы к сериализации: отдаем их напрямую, без повторной валидации
+        return UTF8ORJSONResponse(tasks, headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching tasks: {str(e)}")
 
 
+@router.get("/search", response_model=List[dict])
+async def search_tasks_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000)
+):
+    """
+    Полнотекстовый поиск задач по названию и описанию (русский и английский)
+    
+    Query параметры:
+        q: Строка поиска: слова, "точная фраза", -исключение, or
+        status: Фильтр по статусу
+        limit: Размер страницы (по умолчанию 20, максимум 100)
+        offset: Смещение страницы
+    
+    Returns:
+        Задачи по убыванию релевантности. Если есть следующая страница,
+        ее смещение передается в заголовке X-Next-Offset
+    """
+    try:
+        tasks = await call_repository(task_repository.search_task_dicts, async_task_repository.search_task_dicts,
+                                      q, TaskFilter(status=status), limit, offset)
+        headers = {}
+        if len(tasks) == limit:
+            headers["X-Next-Offset"] = str(offset + limit)
+        return UTF8ORJSONResponse(tasks, headers=headers)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching tasks: {str(e)}")
+
+
 @router.get("/{task_id}", response_model=dict)
-def get_task_by_id_endpoint(task_id: int):
+async def get_task_by_id_endpoint(task_id: int, if_none_match: Optional[str] = Header(None)):
     """
     Получить задачу по ID
     
     Args:
         task_id: ID задачи
+        if_none_match: ETag, полученный клиентом ранее
         
     Returns:
-        Информация о задаче
+        Информация о задаче со слабым ETag по updated_at,
+        либо 304 без тела, если задача не менялась
         
     Raises:
         HTTPException: Если задача не найдена
     """
     try:
-        task = get_task_by_id(task_id)
+        task = await cached_or_reload(
+            task_repository.get_cached_task(task_id), if_none_match,
+            lambda: call_repository(task_repository.get_task_version,
+                                    async_task_repository.get_task_version, task_id),
+            lambda: call_repository(task_repository.reload_task_by_id,
+                                    async_task_repository.reload_task_by_id, task_id)
+        )
         if task is None:
             raise HTTPException(status_code=404, detail=f"Task with id {task_id} not found")
-        return task.to_dict()
+        etag = make_etag("task", task_id, task.updated_at)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return UTF8ORJSONResponse(task.to_dict(), headers={"ETag": etag})
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching task: {str(e)}")
-
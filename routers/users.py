@@ -1,49 +1,125 @@
 """
 Роутеры для работы с пользователями
 """
-from fastapi import APIRouter, HTTPException
-from typing import List
-from repositories.user_repository import get_all_users, get_user_by_id
+from fastapi import APIRouter, Header, HTTPException, Query
+from typing import List, Optional
+from repositories import user_repository, async_user_repository, task_repository, async_task_repository
+from repositories.dispatch import call_repository, stream_repository
+from routers.conditional import cached_or_reload, etag_matches, make_etag, not_modified, rows_version
+from routers.responses import UTF8ORJSONResponse
+from routers.streaming import STREAM_FORMAT_PATTERN, stream_rows_response
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.get("/", response_model=List[dict])
-def get_all_users_endpoint():
+async def get_all_users_endpoint(
+    after_id: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    stream: bool = False,
+    stream_format: str = Query("ndjson", alias="format", pattern=STREAM_FORMAT_PATTERN),
+    if_none_match: Optional[str] = Header(None)
+):
     """
     Получить список всех пользователей
     
+    Query параметры:
+        after_id: Курсор: вернуть пользователей с id больше указанного
+        limit: Размер страницы (по умолчанию 100, максимум 1000)
+        stream: Выгрузить всех пользователей потоком через серверный курсор
+        format: Формат потока: ndjson или json
+    
     Returns:
-        Список всех пользователей
+        Список пользователей. Если есть следующая страница, ее курсор
+        передается в заголовке X-Next-After-Id. Страница отдается со слабым
+        ETag; при совпадении с If-None-Match возвращается 304 без тела
     """
     try:
-        users = get_all_users()
-        return [user.to_dict() for user in users]
+        if stream:
+            return stream_rows_response(
+                stream_repository(user_repository.stream_users, async_user_repository.stream_users),
+                stream_format
+            )
+
+        if if_none_match:
+            # Легкая проверка версии вместо выборки страницы целиком
+            version = await call_repository(user_repository.get_users_page_version,
+                                            async_user_repository.get_users_page_version, after_id, limit)
+            etag = make_etag("users", after_id, limit, *version)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+        users = await call_repository(user_repository.get_user_dicts_page,
+                                      async_user_repository.get_user_dicts_page, after_id, limit)
+        headers = {"ETag": make_etag("users", after_id, limit, *rows_version(users))}
+        if len(users) == limit:
+            headers["X-Next-After-Id"] = str(users[-1]["id"])
+        # Словари уже готовы к сериализации: отдаем их напрямую, без повторной валидации
+        return UTF8ORJSONResponse(users, headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching users: {str(e)}")
 
 
 @router.get("/{user_id}", response_model=dict)
-def get_user_by_id_endpoint(user_id: int):
+async def get_user_by_id_endpoint(user_id: int, if_none_match: Optional[str] = Header(None)):
     """
     Получить пользователя по ID
     
     Args:
         user_id: ID пользователя
+        if_none_match: ETag, полученный клиентом ранее
         
     Returns:
-        Информация о пользователе
+        Информация о пользователе со слабым ETag по updated_at,
+        либо 304 без тела, если пользователь не менялся
         
     Raises:
         HTTPException: Если пользователь не найден
     """
     try:
-        user = get_user_by_id(user_id)
+        user = await cached_or_reload(
+            user_repository.get_cached_user(user_id), if_none_match,
+            lambda: call_repository(user_repository.get_user_version,
+                                    async_user_repository.get_user_version, user_id),
+            lambda: call_repository(user_repository.reload_user_by_id,
+                                    async_user_repository.reload_user_by_id, user_id)
+        )
         if user is None:
             raise HTTPException(status_code=404, detail=f"User with id {user_id} not found")
-        return user.to_dict()
+        etag = make_etag("user", user_id, user.updated_at)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        return UTF8ORJSONResponse(user.to_dict(), headers={"ETag": etag})
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching user: {str(e)}")
 
+
+@router.get("/{user_id}/stats", response_model=dict)
+async def get_user_stats_endpoint(user_id: int, live: bool = False):
+    """
+    Сводка задач пользователя для страницы профиля
+    
+    Args:
+        user_id: ID пользователя
+        live: Посчитать по таблице задач, а не по поддерживаемой триггером сводке
+        
+    Returns:
+        Количество задач по статусам среди созданных (created) и принятых
+        (accepted) пользователем и сумма выполненных созданных задач (total_spent)
+        
+    Raises:
+        HTTPException: Если пользователь не найден
+    """
+    try:
+        user = await call_repository(user_repository.get_user_by_id,
+                                     async_user_repository.get_user_by_id, user_id)
+        if user is None:
+            raise HTTPException(status_code=404, detail=f"User with id {user_id} not found")
+        return await call_repository(task_repository.get_user_task_stats,
+                                     async_task_repository.get_user_task_stats, user_id, live)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching user stats: {str(e)}")
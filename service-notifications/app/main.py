@@ -1,12 +1,15 @@
 import asyncio
 import time
 from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from prometheus_client import Counter, Histogram, Gauge, CONTENT_TYPE_LATEST, generate_latest
 
 from app import rabbitmq
 from app.endpoints.notification_router import notification_router
 from app.endpoints.resilience_demo import resilience_router
+from app.endpoints.dead_letter_router import dead_letter_router
 from app.logging_config import configure_logging, get_logger
+from app.services.notification_service import NotificationDeliveryError
 
 # Инициализация логирования
 logger = configure_logging()
@@ -110,9 +113,16 @@ def startup():
 
 
 @app.on_event('shutdown')
-def shutdown():
+async def shutdown():
     log = get_logger().bind(service="notification-service")
     log.info("service_shutdown")
+    await rabbitmq.stop()
+
+
+@app.exception_handler(NotificationDeliveryError)
+async def notification_delivery_error_handler(request: Request, exc: NotificationDeliveryError):
+    """Сбой email сервиса - временная ошибка, запрос можно повторить"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
 
 
 @app.get("/health")
@@ -123,6 +133,7 @@ async def health_check():
 
 app.include_router(notification_router, prefix='/api')
 app.include_router(resilience_router, prefix='/api')
+app.include_router(dead_letter_router, prefix='/api')
 
 # Эндпоинт для экспорта метрик
 @app.get("/metrics", include_in_schema=False)
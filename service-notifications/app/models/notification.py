@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, ConfigDict
 
 class Notification(BaseModel):
@@ -6,3 +8,40 @@ class Notification(BaseModel):
     recipient_id: int
     message: str
     type: str  # например, 'new_message', 'new_response', 'response_rejected', 'response_accepted', 'task_completed', 'rating_changed'
+
+
+# Тела сообщений очереди notification_requests, поле type выбирает обработчик
+class NewMessageRequest(BaseModel):
+    recipient_id: int
+    sender_name: str
+
+
+class NewResponseRequest(BaseModel):
+    recipient_id: int
+    responder_name: str
+
+
+class RecipientRequest(BaseModel):
+    """response_rejected, response_accepted"""
+    recipient_id: int
+
+
+class TaskCompletedRequest(BaseModel):
+    recipient_id: int
+    task_title: str
+
+
+class RatingChangedRequest(BaseModel):
+    recipient_id: int
+    new_rating: float
+
+
+class PaymentEvent(BaseModel):
+    """Событие payment.completed / payment.failed из outbox сервиса платежей"""
+    payment_id: int
+    task_id: int
+    customer_user_id: int
+    assigned_user_id: int
+    amount: float
+    status: str
+    transaction_id: Optional[str] = None
@@ -1,36 +1,144 @@
-import json
-import traceback
+import asyncio
 from asyncio import AbstractEventLoop
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
 from aio_pika.abc import AbstractRobustConnection
-from aio_pika import connect_robust, IncomingMessage
+from aio_pika import connect_robust
+from prometheus_client import Counter
 
-from app.settings import settings
+from app.messaging import MessageConsumer, start_consumers
+from app.models.notification import (NewMessageRequest, NewResponseRequest, PaymentEvent, RatingChangedRequest,
+                                     RecipientRequest, TaskCompletedRequest)
 from app.services.notification_service import NotificationService
+from app.settings import settings
+
+# События платежей публикует outbox сервиса платежей в обменник payment_events
+PAYMENT_EVENTS_EXCHANGE = 'payment_events'
+
+duplicates_skipped_total = Counter('payment_event_duplicates_skipped_total',
+                                   'Payment notifications skipped as already sent')
+
+
+def make_consumer(queue_name: str, **kwargs) -> MessageConsumer:
+    return MessageConsumer(
+        queue_name,
+        prefetch_count=settings.consumer_prefetch_count,
+        concurrency=settings.consumer_concurrency,
+        max_retries=settings.consumer_max_retries,
+        retry_base_delay=settings.consumer_retry_base_delay,
+        retry_max_delay=settings.consumer_retry_max_delay,
+        ack_batch_size=settings.consumer_ack_batch_size,
+        ack_interval=settings.consumer_ack_interval,
+        **kwargs
+    )
+
+
+notification_requests = make_consumer('notification_requests')
+payment_events = make_consumer('payment_events', bindings=[(PAYMENT_EVENTS_EXCHANGE, 'payment.*')])
+
+service = NotificationService()
+
 
+class SentNotifications:
+    """
+    Последние отправленные уведомления о платежах (LRU в памяти процесса).
 
-async def process_notification_request(msg: IncomingMessage):
+    Outbox доставляет события at-least-once, а повтор после ошибки
+    одного получателя приходит целиком. Уведомление отмечается до отправки
+    (параллельный повтор его пропустит) и снимается с отметки при ошибке
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._keys: OrderedDict = OrderedDict()
+
+    def claim(self, key: Hashable) -> bool:
+        """Отметить уведомление; False - оно уже отправлено или отправляется"""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.max_size:
+            self._keys.popitem(last=False)
+        return True
+
+    def release(self, key: Hashable):
+        self._keys.pop(key, None)
+
+
+sent_notifications = SentNotifications(settings.payment_events_dedup_size)
+
+
+async def notify_once(event: PaymentEvent, recipient_id: int,
+                      send: Callable[[int, float, int], Awaitable]):
+    """
+    Отправить уведомление о событии платежа получателю не больше одного раза.
+    У платежа одно событие на итоговый статус, поэтому (payment_id, status)
+    определяет событие outbox так же, как message_id
+    """
+    key = (event.payment_id, event.status, recipient_id)
+    if not sent_notifications.claim(key):
+        duplicates_skipped_total.inc()
+        return
     try:
-        data = json.loads(msg.body.decode())
-        service = NotificationService()
-        # Example: depending on data, call appropriate method
-        # For now, assume data has 'type' and params
-        if data['type'] == 'new_message':
-            notification = service.send_new_message_notification(data['recipient_id'], data['sender_name'])
-        # etc for other types
-        print(f"Processed notification: {data}")
-        await msg.ack()
-    except Exception as e:
-        traceback.print_exc()
-        await msg.ack()
+        await send(recipient_id, event.amount, event.task_id)
+    except BaseException:
+        sent_notifications.release(key)
+        raise
 
 
-async def consume(loop: AbstractEventLoop) -> AbstractRobustConnection:
-    connection = await connect_robust(settings.amqp_url, loop=loop)
-    channel = await connection.channel()
+@notification_requests.route('new_message', NewMessageRequest)
+async def new_message(request: NewMessageRequest):
+    await service.send_new_message_notification(request.recipient_id, request.sender_name)
 
-    queue = await channel.declare_queue('notification_requests', durable=True)
 
-    await queue.consume(process_notification_request)
-    print('Started RabbitMQ consuming for notifications...')
+@notification_requests.route('new_response', NewResponseRequest)
+async def new_response(request: NewResponseRequest):
+    await service.send_new_response_notification(request.recipient_id, request.responder_name)
 
+
+@notification_requests.route('response_rejected', RecipientRequest)
+async def response_rejected(request: RecipientRequest):
+    await service.send_response_rejected_notification(request.recipient_id)
+
+
+@notification_requests.route('response_accepted', RecipientRequest)
+async def response_accepted(request: RecipientRequest):
+    await service.send_response_accepted_notification(request.recipient_id)
+
+
+@notification_requests.route('task_completed', TaskCompletedRequest)
+async def task_completed(request: TaskCompletedRequest):
+    await service.send_task_completed_notification(request.recipient_id, request.task_title)
+
+
+@notification_requests.route('rating_changed', RatingChangedRequest)
+async def rating_changed(request: RatingChangedRequest):
+    await service.send_rating_changed_notification(request.recipient_id, request.new_rating)
+
+
+@payment_events.route('payment.completed', PaymentEvent)
+async def payment_completed(event: PaymentEvent):
+    await asyncio.gather(
+        notify_once(event, event.customer_user_id, service.send_payment_completed_notification),
+        notify_once(event, event.assigned_user_id, service.send_payment_completed_notification),
+    )
+
+
+@payment_events.route('payment.failed', PaymentEvent)
+async def payment_failed(event: PaymentEvent):
+    await notify_once(event, event.customer_user_id, service.send_payment_failed_notification)
+
+
+# Потребители по имени очереди (для app.endpoints.dead_letter_router)
+consumers = {consumer.queue_name: consumer for consumer in [notification_requests, payment_events]}
+
+
+async def consume(loop: AbstractEventLoop) -> AbstractRobustConnection:
+    connection = await connect_robust(settings.amqp_url, loop=loop)
+    await start_consumers(connection, list(consumers.values()))
     return connection
+
+
+async def stop():
+    await asyncio.gather(*(consumer.stop() for consumer in consumers.values()))
@@ -6,6 +6,13 @@ from app.logging_config import get_logger
 logger = get_logger(__name__)
 
 
+class NotificationDeliveryError(Exception):
+    """
+    Email сервис не доставил уведомление (сбой провайдера, открытый Circuit Breaker).
+    Сообщение из очереди в этом случае повторяется с задержкой (app.messaging)
+    """
+
+
 class NotificationService:
     """
     Сервис для обработки уведомлений
@@ -36,6 +43,15 @@ class NotificationService:
         message = f"Ваш рейтинг обновлен: {new_rating}"
         return await self._send_notification(recipient_id, message, "rating_changed")
 
+    async def send_payment_completed_notification(self, recipient_id: int, amount: float,
+                                                  task_id: int) -> Notification:
+        message = f"Оплата {amount} по задаче #{task_id} прошла успешно"
+        return await self._send_notification(recipient_id, message, "payment_completed")
+
+    async def send_payment_failed_notification(self, recipient_id: int, amount: float, task_id: int) -> Notification:
+        message = f"Оплата {amount} по задаче #{task_id} не прошла, средства возвращены"
+        return await self._send_notification(recipient_id, message, "payment_failed")
+
     async def _send_notification(self, recipient_id: int, message: str, notification_type: str) -> Notification:
         """
         Отправка уведомления через внешний email сервис
@@ -75,5 +91,8 @@ class NotificationService:
                 notification_type=notification_type,
                 error=email_result.get("error")
             )
+            raise NotificationDeliveryError(
+                f"Notification {notification_type} to {recipient_id} not sent: {email_result.get('error')}"
+            )
 
         return notification
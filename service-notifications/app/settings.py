@@ -4,6 +4,18 @@ class Settings(BaseSettings):
     amqp_url: str  # Для RabbitMQ
     postgres_url: str  # Для будущего БД
 
+    # Потребление очередей RabbitMQ (app.messaging)
+    consumer_prefetch_count: int = 200
+    consumer_concurrency: int = 100
+    consumer_max_retries: int = 5
+    consumer_retry_base_delay: float = 1.0  # секунды до первого повтора, дальше пауза удваивается
+    consumer_retry_max_delay: float = 300.0
+    consumer_ack_batch_size: int = 50
+    consumer_ack_interval: float = 0.05  # секунды; неполная пачка ack отправляется не реже
+
+    # Сколько последних (событие платежа, получатель) помнить для отброса повторов
+    payment_events_dedup_size: int = 100000
+
     model_config = SettingsConfigDict(env_file='.env')
 
 settings = Settings()
@@ -0,0 +1,21 @@
+"""
+Асинхронный движок SQLAlchemy (asyncpg) для DB_DRIVER=asyncpg.
+Настройки пула те же, что у синхронного engine в app/database.py
+"""
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.settings import settings
+
+async_engine = create_async_engine(
+    make_url(settings.postgres_url).set(drivername="postgresql+asyncpg"),
+    echo=settings.db_echo,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=True,
+    pool_recycle=settings.db_pool_recycle,
+)
+
+# expire_on_commit=False: после commit атрибуты не перечитываются неявным (синхронным) запросом
+AsyncSessionLocal = sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,56 @@
+"""
+Асинхронная единица работы на время запроса (DB_DRIVER=asyncpg):
+одна AsyncSession и одна транзакция на все репозитории платежного потока
+"""
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.async_database import AsyncSessionLocal
+from app.idempotency import pending_key
+from app.repositories.async_balance_repo import AsyncBalanceRepo
+from app.repositories.async_idempotency_repo import AsyncIdempotencyRepo
+from app.repositories.async_outbox_repo import AsyncOutboxRepo
+from app.repositories.async_payment_repo import AsyncPaymentRepo
+from app.repositories.async_task_repo import AsyncTaskRepo
+
+
+class AsyncUnitOfWork:
+    session: AsyncSession
+    payments: AsyncPaymentRepo
+    tasks: AsyncTaskRepo
+    balances: AsyncBalanceRepo
+    outbox: AsyncOutboxRepo
+    idempotency: AsyncIdempotencyRepo
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.payments = AsyncPaymentRepo(session)
+        self.tasks = AsyncTaskRepo(session)
+        self.balances = AsyncBalanceRepo(session)
+        self.outbox = AsyncOutboxRepo(session)
+        self.idempotency = AsyncIdempotencyRepo(session)
+
+    async def commit(self, result=None):
+        """Зафиксировать транзакцию и ответ по ключу идемпотентности, см. UnitOfWork.commit"""
+        pending = pending_key(result)
+        if pending is not None:
+            await self.idempotency.complete(*pending.complete_args(result))
+        await self.session.commit()
+        if pending is not None:
+            pending.committed()
+
+    async def rollback(self):
+        await self.session.rollback()
+
+
+async def get_async_unit_of_work() -> AsyncIterator[AsyncUnitOfWork]:
+    """Зависимость FastAPI: AsyncSession на запрос, всегда закрывается (см. get_unit_of_work)"""
+    session = AsyncSessionLocal()
+    try:
+        yield AsyncUnitOfWork(session)
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
@@ -1,11 +1,22 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
-from app.schemas.payment import Base
+from app.schemas.payment import Base, Payment
 from app.schemas.task import Base as BaseTask
+from app.schemas.balance import Base as BaseBalance
+from app.schemas.idempotency import Base as BaseIdempotency
+from app.schemas.outbox import Base as BaseOutbox
+from app.repositories.balance_repo import BalanceRepo, INITIAL_BALANCES
 
 from app.settings import settings
 
-engine = create_engine(settings.postgres_url, echo=True)
+engine = create_engine(
+    settings.postgres_url,
+    echo=settings.db_echo,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=True,  # разорванные соединения заменяются до выдачи сессии
+    pool_recycle=settings.db_pool_recycle,
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -21,4 +32,20 @@ def get_db() -> Session:
 # Функция создания таблиц в startup
 def create_tables():
     Base.metadata.create_all(bind=engine)
+    # create_all не добавляет индексы в уже существующую таблицу
+    for index in Payment.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    # Колонки тоже: processing_started_at добавлена после первых развертываний
+    with engine.begin() as conn:
+        conn.execute(text('ALTER TABLE payments ADD COLUMN IF NOT EXISTS processing_started_at TIMESTAMP'))
     BaseTask.metadata.create_all(bind=engine)
+    BaseBalance.metadata.create_all(bind=engine)
+    BaseIdempotency.metadata.create_all(bind=engine)
+    BaseOutbox.metadata.create_all(bind=engine)
+
+
+# Начальные балансы тестовых пользователей; существующие не перезаписываются
+def seed_balances():
+    with SessionLocal() as session:
+        BalanceRepo(session).seed(INITIAL_BALANCES)
+        session.commit()
@@ -0,0 +1,177 @@
+"""
+Асинхронные обработчики платежного API (DB_DRIVER=asyncpg).
+Пути и ответы те же, что в payment_router, но обработчики выполняются
+в event loop и не держат поток threadpool во время запросов к БД
+"""
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from typing import List, Optional
+
+from app.async_unit_of_work import AsyncUnitOfWork, get_async_unit_of_work
+from app.endpoints.payment_router import NEXT_CURSOR_HEADER, accepted_response, build_test_users, payment_response
+from app.idempotency import IDEMPOTENCY_HEADER, idempotency_store, respond_with
+from app.models.payment import Payment, PaymentAccepted, PaymentMethod
+from app.payment_workers import QUEUED_PROCESSING, QueueFullError, payment_workers
+from app.models.task import Task
+from app.models.user import User
+from app.repositories.payment_query import PaymentFilter
+from app.services.async_payment_service import AsyncPaymentService
+
+
+async_payment_router = APIRouter(prefix='/payment', tags=['Payment'])
+
+
+@async_payment_router.post("/select-method", response_model=Payment, summary="Выбрать способ оплаты для задачи")
+async def select_payment_method(
+    task_id: int,
+    assigned_user_id: int,
+    payment_method: PaymentMethod,
+    service: AsyncPaymentService = Depends(),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    """
+    Выбирает метод оплаты для задачи. Сумма берется из цены задачи, проверяется баланс заказчика.
+
+    - **task_id**: ID задачи, которую нужно оплатить
+    - **assigned_user_id**: ID исполнителя, которому переведут деньги
+    - **payment_method**: Способ оплаты (card, bank_transfer, electronic_wallet, crypto)
+    - **Idempotency-Key**: Повтор запроса с тем же ключом вернет уже созданный платеж
+    """
+    async def execute():
+        respond_with(payment_response)
+        try:
+            return payment_response(await service.select_payment_method(task_id, assigned_user_id, payment_method))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    params = {"task_id": task_id, "assigned_user_id": assigned_user_id, "payment_method": payment_method}
+    return await idempotency_store.run('select-method', idempotency_key, params, execute)
+
+
+@async_payment_router.post("/process", response_model=Payment, summary="Выполнить оплату",
+                           responses={202: {"model": PaymentAccepted, "description": "Платеж принят в обработку"}})
+async def process_payment(
+    payment_id: int,
+    service: AsyncPaymentService = Depends(),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    """
+    Выполняет обработку платежа с имитацией успешности/неудачи.
+
+    - **payment_id**: ID платежа из метода select-method
+    - **Idempotency-Key**: Повтор запроса с тем же ключом вернет результат первой обработки
+
+    В режиме queued сразу возвращает 202 со ссылкой на статус платежа.
+    """
+    async def execute():
+        try:
+            if not QUEUED_PROCESSING:
+                respond_with(payment_response)
+                return payment_response(await service.process_payment(payment_id))
+            respond_with(accepted_response)
+            with payment_workers.reserve() as submit:
+                payment = await service.start_processing(payment_id)
+                submit(payment.id)
+            return accepted_response(payment)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Payment {payment_id} not found")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return await idempotency_store.run('process', idempotency_key, {"payment_id": payment_id}, execute)
+
+
+@async_payment_router.get("/{payment_id}", response_model=Payment, summary="Получить информацию о платеже")
+async def get_payment(
+    payment_id: int,
+    service: AsyncPaymentService = Depends()
+):
+    """
+    Возвращает детальную информацию о конкретном платеже.
+
+    - **payment_id**: ID платежа
+    """
+    try:
+        return await service.get_payment(payment_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Payment {payment_id} not found")
+
+
+@async_payment_router.get("/", response_model=List[Payment], summary="Получить список платежей")
+async def list_payments(
+    response: Response,
+    payment_filter: PaymentFilter = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    service: AsyncPaymentService = Depends()
+):
+    """
+    Возвращает страницу платежей, новые первыми. Все переданные фильтры применяются одновременно.
+
+    - **customer_user_id**, **assigned_user_id**, **task_id**: Фильтры по заказчику, исполнителю и задаче
+    - **status**, **payment_method**: Фильтры по статусу и способу оплаты
+    - **created_from**, **created_to**: Диапазон даты создания [from, to)
+    - **cursor**: Курсор следующей страницы из заголовка X-Next-Cursor предыдущего ответа
+    - **limit**: Размер страницы (по умолчанию 100, максимум 1000)
+    """
+    try:
+        payments, next_cursor = await service.list_payments(payment_filter, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return payments
+
+
+@async_payment_router.get("/users/{user_id}/balance", summary="Получить баланс пользователя")
+async def get_user_balance(user_id: int, service: AsyncPaymentService = Depends()):
+    """
+    Возвращает доступный баланс пользователя (без сумм, зарезервированных под платежи).
+
+    - **user_id**: ID пользователя
+    """
+    balance = await service.balances.get_balance(user_id)
+    return {"user_id": user_id, "balance": balance}
+
+
+@async_payment_router.get("/users/balances", summary="[TEST] Получить все балансы пользователей")
+async def get_all_user_balances(uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
+    """
+    Возвращает текущие балансы всех пользователей (для проверки изменений).
+    """
+    return {"balances": await uow.balances.get_all_balances()}
+
+
+# Test endpoints
+@async_payment_router.get("/test/users", response_model=List[User],
+                          summary="[TEST] Получить всех тестовых пользователей")
+async def get_test_users(uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
+    """
+    Возвращает список тестовых пользователей с их актуальными балансами.
+    """
+    return build_test_users(await uow.balances.get_all_balances())
+
+
+@async_payment_router.get("/test/tasks", response_model=List[Task], summary="[TEST] Получить все тестовые задачи")
+async def get_test_tasks(uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
+    """
+    Возвращает список всех заданий из базы данных для оплаты.
+    """
+    return await uow.tasks.get_all_tasks()
+
+
+@async_payment_router.post("/test/create-task", response_model=Task, summary="[TEST] Создать тестовую задачу")
+async def create_test_task(
+    title: str,
+    description: str,
+    price: float,
+    customer_id: int,
+    uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)
+):
+    """
+    Создает тестовую задачу и сохраняет в базе данных для оплаты.
+    """
+    task = await uow.tasks.create_task(Task(title=title, description=description, price=price, customer_id=customer_id))
+    await uow.commit()
+    return task
@@ -0,0 +1,55 @@
+from typing import List
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.messaging import MessageConsumer
+from app.models.dead_letter import ParkedQueue, ReplayResult
+from app.rabbitmq import consumers
+
+dead_letter_router = APIRouter(prefix='/admin/dead-letters', tags=['Dead letters'])
+
+
+def get_consumer(queue_name: str) -> MessageConsumer:
+    consumer = consumers.get(queue_name)
+    if consumer is None:
+        raise HTTPException(status_code=404, detail=f"Unknown queue '{queue_name}'")
+    return consumer
+
+
+async def inspect(consumer: MessageConsumer, limit: int) -> ParkedQueue:
+    try:
+        total, messages = await consumer.parked(limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return ParkedQueue(queue=consumer.queue_name, parked_total=total, messages=messages)
+
+
+@dead_letter_router.get("/", response_model=List[ParkedQueue], summary="Число сообщений в parking-очередях")
+async def list_parked_queues():
+    return [await inspect(consumer, 0) for consumer in consumers.values()]
+
+
+@dead_letter_router.get("/{queue_name}", response_model=ParkedQueue, summary="Сообщения parking-очереди")
+async def list_parked_messages(queue_name: str, limit: int = Query(50, ge=1, le=1000)):
+    """
+    Показывает первые limit сообщений parking-очереди без их удаления.
+
+    - **queue_name**: Основная очередь (например, notification_requests)
+    """
+    return await inspect(get_consumer(queue_name), limit)
+
+
+@dead_letter_router.post("/{queue_name}/replay", response_model=ReplayResult,
+                         summary="Вернуть сообщения из parking-очереди в основную")
+async def replay_parked_messages(queue_name: str, limit: int = Query(100, ge=1, le=10000)):
+    """
+    Возвращает до limit сообщений в основную очередь со сброшенным счетчиком попыток.
+
+    - **queue_name**: Основная очередь (например, notification_requests)
+    """
+    consumer = get_consumer(queue_name)
+    try:
+        replayed = await consumer.replay_parked(limit)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return ReplayResult(queue=queue_name, replayed=replayed)
@@ -1,23 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import Dict, List
-
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, List, Optional
+
+from app.idempotency import IDEMPOTENCY_HEADER, idempotency_store, respond_with
+from app.payment_workers import QUEUED_PROCESSING, QueueFullError, payment_workers
+from app.repositories.payment_query import PaymentFilter
 from app.services.payment_service import PaymentService
-from app.models.payment import Payment, PaymentMethod
+from app.models.payment import Payment, PaymentAccepted, PaymentMethod
 from app.models.task import Task
 from app.models.user import User
-from app.repositories.task_repo import TaskRepo
+from app.unit_of_work import UnitOfWork, get_unit_of_work
 from typing import List
 
 
 payment_router = APIRouter(prefix='/payment', tags=['Payment'])
 
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+TEST_USER_NAMES = {
+    1: ("Иван", "Иванов"),
+    2: ("Петр", "Петров"),
+    3: ("Мария", "Сидорова"),
+    4: ("Алексей", "Васильев"),
+    5: ("Ольга", "Николаева")
+}
+
+
+def build_test_users(balances: Dict[int, float]) -> List[User]:
+    """Создает тестовых пользователей с реальными балансами"""
+    users = []
+    for user_id in balances:
+        first_name, last_name = TEST_USER_NAMES.get(user_id, (f"User{user_id}", ""))
+        users.append(User(id=user_id, first_name=first_name, last_name=last_name, balance=balances[user_id]))
+    return users
+
+
+def payment_response(payment: Payment) -> JSONResponse:
+    """200 с платежом; ответ формируется явно, чтобы его можно было сохранить по ключу идемпотентности"""
+    return JSONResponse(content=payment.model_dump(mode='json'))
+
+
+def accepted_response(payment: Payment) -> JSONResponse:
+    """202 Accepted со ссылкой, по которой клиент опрашивает статус платежа"""
+    status_url = f"/api{payment_router.prefix}/{payment.id}"
+    body = PaymentAccepted(payment_id=payment.id, status=payment.status, status_url=status_url)
+    return JSONResponse(status_code=202, content=body.model_dump(mode='json'), headers={"Location": status_url})
+
 
 @payment_router.post("/select-method", response_model=Payment, summary="Выбрать способ оплаты для задачи")
-def select_payment_method(
+async def select_payment_method(
     task_id: int,
     assigned_user_id: int,
     payment_method: PaymentMethod,
-    service: PaymentService = Depends()
+    service: PaymentService = Depends(),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
 ):
     """
     Выбирает метод оплаты для задачи. Сумма берется из цены задачи, проверяется баланс заказчика.
@@ -25,31 +62,56 @@ def select_payment_method(
     - **task_id**: ID задачи, которую нужно оплатить
     - **assigned_user_id**: ID исполнителя, которому переведут деньги
     - **payment_method**: Способ оплаты (card, bank_transfer, electronic_wallet, crypto)
+    - **Idempotency-Key**: Повтор запроса с тем же ключом вернет уже созданный платеж
     """
-    try:
-        return service.select_payment_method(task_id, assigned_user_id, payment_method)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    async def execute():
+        respond_with(payment_response)
+        try:
+            payment = await run_in_threadpool(service.select_payment_method, task_id, assigned_user_id,
+                                              payment_method)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return payment_response(payment)
+
+    params = {"task_id": task_id, "assigned_user_id": assigned_user_id, "payment_method": payment_method}
+    return await idempotency_store.run('select-method', idempotency_key, params, execute)
 
 
-@payment_router.post("/process", response_model=Payment, summary="Выполнить оплату")
-def process_payment(
+@payment_router.post("/process", response_model=Payment, summary="Выполнить оплату",
+                     responses={202: {"model": PaymentAccepted, "description": "Платеж принят в обработку"}})
+async def process_payment(
     payment_id: int,
-    service: PaymentService = Depends()
+    service: PaymentService = Depends(),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
 ):
     """
     Выполняет обработку платежа с имитацией успешности/неудачи.
 
     - **payment_id**: ID платежа из метода select-method
+    - **Idempotency-Key**: Повтор запроса с тем же ключом вернет результат первой обработки
 
     Возможные статусы после обработки: COMPLETED, FAILED, с соответствующей датой и транзакцией.
-    """
-    try:
-        return service.process_payment(payment_id)
-    except KeyError:
-        raise HTTPException(status_code=404, detail=f"Payment {payment_id} not found")
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    В режиме queued сразу возвращает 202 со ссылкой на статус платежа, а обработку
+    завершает пул воркеров; при заполненной очереди возвращает 503.
+    """
+    async def execute():
+        try:
+            if not QUEUED_PROCESSING:
+                respond_with(payment_response)
+                return payment_response(await run_in_threadpool(service.process_payment, payment_id))
+            respond_with(accepted_response)
+            with payment_workers.reserve() as submit:
+                payment = await run_in_threadpool(service.start_processing, payment_id)
+                submit(payment.id)
+            return accepted_response(payment)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+        except KeyError:
+            raise HTTPException(status_code=404, detail=f"Payment {payment_id} not found")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return await idempotency_store.run('process', idempotency_key, {"payment_id": payment_id}, execute)
 
 
 @payment_router.get("/{payment_id}", response_model=Payment, summary="Получить информацию о платеже")
@@ -68,72 +130,77 @@ def get_payment(
         raise HTTPException(status_code=404, detail=f"Payment {payment_id} not found")
 
 
-@payment_router.get("/", response_model=List[Payment], summary="Получить список всех платежей")
-def get_all_payments(service: PaymentService = Depends()):
+@payment_router.get("/", response_model=List[Payment], summary="Получить список платежей")
+def list_payments(
+    response: Response,
+    payment_filter: PaymentFilter = Depends(),
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    service: PaymentService = Depends()
+):
     """
-    Возвращает список всех платежей в системе (для администраторов).
+    Возвращает страницу платежей, новые первыми. Все переданные фильтры применяются одновременно.
+
+    - **customer_user_id**, **assigned_user_id**, **task_id**: Фильтры по заказчику, исполнителю и задаче
+    - **status**, **payment_method**: Фильтры по статусу и способу оплаты
+    - **created_from**, **created_to**: Диапазон даты создания [from, to)
+    - **cursor**: Курсор следующей страницы из заголовка X-Next-Cursor предыдущего ответа
+    - **limit**: Размер страницы (по умолчанию 100, максимум 1000)
     """
-    return service.get_all_payments()
+    try:
+        payments, next_cursor = service.list_payments(payment_filter, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return payments
 
 
 @payment_router.get("/users/{user_id}/balance", summary="Получить баланс пользователя")
 def get_user_balance(user_id: int, service: PaymentService = Depends()):
     """
-    Возвращает текущий баланс пользователя (имитация для тестирования).
+    Возвращает доступный баланс пользователя (без сумм, зарезервированных под платежи).
 
     - **user_id**: ID пользователя
     """
-    balance = service.repo.check_balance(user_id)
+    balance = service.balances.get_balance(user_id)
     return {"user_id": user_id, "balance": balance}
 
 
 @payment_router.get("/users/balances", summary="[TEST] Получить все балансы пользователей")
-def get_all_user_balances():
+def get_all_user_balances(uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Возвращает текущие балансы всех пользователей (для проверки изменений).
     """
-    repo = TaskRepo()
-    balances = repo.get_all_balances()
+    balances = uow.balances.get_all_balances()
     return {"balances": balances}
 
 
 # Test endpoints
 @payment_router.get("/test/users", response_model=List[User], summary="[TEST] Получить всех тестовых пользователей")
-def get_test_users():
+def get_test_users(uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Возвращает список тестовых пользователей с их актуальными балансами.
     """
-    repo = TaskRepo()
-    balances = repo.get_all_balances()
-
-    # Создаем пользователей с реальными балансами
-    users = []
-    names = {
-        1: ("Иван", "Иванов"),
-        2: ("Петр", "Петров"),
-        3: ("Мария", "Сидорова"),
-        4: ("Алексей", "Васильев"),
-        5: ("Ольга", "Николаева")
-    }
-
-    for user_id in balances:
-        first_name, last_name = names.get(user_id, (f"User{user_id}", ""))
-        users.append(User(id=user_id, first_name=first_name, last_name=last_name, balance=balances[user_id]))
-
-    return users
+    return build_test_users(uow.balances.get_all_balances())
 
 
 @payment_router.get("/test/tasks", response_model=List[Task], summary="[TEST] Получить все тестовые задачи")
-def get_test_tasks():
+def get_test_tasks(uow: UnitOfWork = Depends(get_unit_of_work)):
     """
     Возвращает список всех заданий из базы данных для оплаты.
     """
-    repo = TaskRepo()
-    return repo.get_all_tasks()
+    return uow.tasks.get_all_tasks()
 
 
 @payment_router.post("/test/create-task", response_model=Task, summary="[TEST] Создать тестовую задачу")
-def create_test_task(title: str, description: str, price: float, customer_id: int):
+def create_test_task(
+    title: str,
+    description: str,
+    price: float,
+    customer_id: int,
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
     """
     Создает тестовую задачу и сохраняет в базе данных для оплаты.
 
@@ -142,6 +209,6 @@ def create_test_task(title: str, description: str, price: float, customer_id: in
     - **price**: Стоимость задачи
     - **customer_id**: ID заказчика
     """
-    task = Task(title=title, description=description, price=price, customer_id=customer_id)
-    repo = TaskRepo()
-    return repo.create_task(task)
+    task = uow.tasks.create_task(Task(title=title, description=description, price=price, customer_id=customer_id))
+    uow.commit()
+    return task
@@ -0,0 +1,266 @@
+"""
+Идемпотентность POST-запросов по заголовку Idempotency-Key.
+
+Первый запрос с ключом выполняется и сохраняет ответ (только успешный:
+после ошибки транзакция откатана, и повтор выполнится заново), повторы
+получают сохраненный ответ с заголовком Idempotent-Replayed.
+
+- Горячие повторы отвечаются из LRU в памяти процесса без запроса к Postgres;
+- одновременные запросы с одним ключом в процессе ждут результата первого;
+- между процессами и репликами выполнение захватывается строкой таблицы
+  idempotency_keys (см. IdempotencyRepo), второй процесс ждет сохраненного
+  ответа до idempotency_wait_seconds и затем получает 409.
+Ключ, повторно отправленный с другими параметрами, отклоняется с 422.
+
+Ответ сохраняется в той же транзакции, что и бизнес-изменение: эндпоинт
+задает построение ответа (respond_with), сервис передает результат в
+UnitOfWork.commit(result), и строка ключа переходит в completed вместе с
+платежом. Если процесс упадет после коммита, повтор с ключом получит
+сохраненный ответ, а не создаст второй платеж.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.repositories.idempotency_repo import STATUS_COMPLETED, IdempotencyRepo
+from app.settings import settings, USE_ASYNC_DB
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+# Заголовки ответа, которые сохраняются вместе с телом
+STORED_HEADERS = ('location',)
+POLL_INTERVAL_SECONDS = 0.05
+
+
+class StoredResponse:
+    """Сохраненный ответ на запрос с ключом идемпотентности"""
+    __slots__ = ('fingerprint', 'status_code', 'body', 'headers', 'expires_at')
+
+    def __init__(self, fingerprint: str, status_code: int, body: str, headers: Dict[str, str], expires_at: float):
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers
+        self.expires_at = expires_at
+
+    def replay(self, fingerprint: str) -> Response:
+        if fingerprint != self.fingerprint:
+            raise HTTPException(status_code=422,
+                                detail=f"{IDEMPOTENCY_HEADER} was already used with different parameters")
+        return Response(content=self.body, status_code=self.status_code, media_type='application/json',
+                        headers={**self.headers, REPLAYED_HEADER: 'true'})
+
+
+def response_parts(response: Response) -> Tuple[int, str, Dict[str, str]]:
+    """(код, тело, сохраняемые заголовки) ответа"""
+    headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+    return response.status_code, response.body.decode(), headers
+
+
+class PendingKey:
+    """Ключ, захваченный текущим запросом; ответ по нему сохраняется при коммите операции"""
+    __slots__ = ('scope', 'key', 'fingerprint', 'ttl_seconds', 'respond', 'parts', 'stored')
+
+    def __init__(self, scope: str, key: str, fingerprint: str, ttl_seconds: float):
+        self.scope = scope
+        self.key = key
+        self.fingerprint = fingerprint
+        self.ttl_seconds = ttl_seconds
+        self.respond: Optional[Callable[[Any], Response]] = None
+        self.parts: Optional[Tuple[int, str, Dict[str, str]]] = None
+        self.stored: Optional[StoredResponse] = None
+
+    def complete_args(self, result) -> tuple:
+        """Аргументы IdempotencyRepo.complete для ответа на результат операции"""
+        self.parts = response_parts(self.respond(result))
+        return (self.scope, self.key) + self.parts
+
+    def committed(self):
+        code, body, headers = self.parts
+        self.stored = StoredResponse(self.fingerprint, code, body, headers, time.monotonic() + self.ttl_seconds)
+
+
+# Контекст копируется в потоки run_in_threadpool, объект PendingKey общий
+_pending_key: ContextVar[Optional[PendingKey]] = ContextVar('idempotency_pending_key', default=None)
+
+
+def respond_with(respond: Callable[[Any], Response]):
+    """Задать, как из результата операции строится ответ, сохраняемый по ключу запроса"""
+    pending = _pending_key.get()
+    if pending is not None:
+        pending.respond = respond
+
+
+def pending_key(result) -> Optional[PendingKey]:
+    """Ключ, ответ по которому UnitOfWork.commit(result) должен сохранить в своей транзакции"""
+    pending = _pending_key.get()
+    if result is None or pending is None or pending.respond is None or pending.stored is not None:
+        return None
+    return pending
+
+
+def request_fingerprint(scope: str, params: dict) -> str:
+    """Хэш эндпоинта и параметров запроса"""
+    payload = json.dumps({"scope": scope, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    LRU сохраненных ответов и выполняющиеся запросы процесса поверх таблицы
+    idempotency_keys. Используется только из event loop, блокировки не нужны
+    """
+
+    def __init__(self, cache_size: int, ttl_seconds: float, lock_seconds: float, wait_seconds: float):
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        self.lock_seconds = lock_seconds
+        self.wait_seconds = wait_seconds
+        self._cache: 'OrderedDict[Tuple[str, str], StoredResponse]' = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    async def run(self, scope: str, key: Optional[str], params: dict,
+                  execute: Callable[[], Awaitable[Response]]) -> Response:
+        """
+        Выполнить запрос не больше одного раза на ключ
+
+        Args:
+            scope: Имя эндпоинта (ключи разных эндпоинтов не пересекаются)
+            key: Значение заголовка Idempotency-Key; без ключа запрос просто выполняется
+            params: Параметры запроса для проверки повторного использования ключа
+            execute: Корутина, выполняющая запрос и возвращающая ответ
+
+        Returns:
+            Ответ выполнения или сохраненный ответ
+
+        Raises:
+            HTTPException: 400 для слишком длинного ключа, 409 если ключ выполняется
+                другим процессом, 422 если ключ использован с другими параметрами
+        """
+        if key is None:
+            return await execute()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise HTTPException(status_code=400,
+                                detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters")
+
+        fingerprint = request_fingerprint(scope, params)
+        cache_key = (scope, key)
+        stored = self._cached(cache_key)
+        if stored is not None:
+            return stored.replay(fingerprint)
+        in_flight = self._in_flight.get(cache_key)
+        if in_flight is not None:
+            stored = await asyncio.shield(in_flight)
+            if stored is None:
+                # Первое выполнение не сохранило ответ (ошибка) - выполняем заново
+                return await self.run(scope, key, params, execute)
+            return stored.replay(fingerprint)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[cache_key] = future
+        try:
+            response, stored = await self._execute_once(scope, key, fingerprint, execute)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # ожидающих может не быть
+            raise
+        else:
+            future.set_result(stored)
+            if stored is not None:
+                self._remember(cache_key, stored)
+            return response if response is not None else stored.replay(fingerprint)
+        finally:
+            del self._in_flight[cache_key]
+
+    async def _execute_once(self, scope: str, key: str, fingerprint: str,
+                            execute: Callable[[], Awaitable[Response]]):
+        """(ответ выполнения или None, сохраненный ответ или None для неуспешного)"""
+        deadline = time.monotonic() + self.wait_seconds
+        # Ключ занят другим процессом: ждем его ответа или освобождения ключа
+        while not await self._db('claim', scope, key, fingerprint, self.lock_seconds, self.ttl_seconds):
+            row = await self._db('get', scope, key)
+            if row is not None and row.status == STATUS_COMPLETED:
+                return None, StoredResponse(row.fingerprint, row.response_code, row.response_body,
+                                            row.response_headers or {}, time.monotonic() + self.ttl_seconds)
+            if time.monotonic() >= deadline:
+                raise HTTPException(status_code=409, headers={"Retry-After": "1"},
+                                    detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress")
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+        pending = PendingKey(scope, key, fingerprint, self.ttl_seconds)
+        token = _pending_key.set(pending)
+        try:
+            response = await execute()
+        except BaseException:
+            # Ключ, сохраненный вместе с операцией, release не затрагивает
+            await asyncio.shield(self._db('release', scope, key))
+            raise
+        finally:
+            _pending_key.reset(token)
+        if pending.stored is not None:
+            return response, pending.stored
+        if response.status_code >= 400:
+            await self._db('release', scope, key)
+            return response, None
+
+        # Эндпоинт без respond_with: ответ сохраняется отдельной транзакцией
+        code, body, headers = response_parts(response)
+        await self._db('complete', scope, key, code, body, headers)
+        return response, StoredResponse(fingerprint, response.status_code, body, headers,
+                                        time.monotonic() + self.ttl_seconds)
+
+    async def _db(self, method: str, *args):
+        """Вызвать метод репозитория в отдельной короткой транзакции"""
+        if USE_ASYNC_DB:
+            # Асинхронный движок импортируется только при DB_DRIVER=asyncpg
+            from app.async_database import AsyncSessionLocal
+            from app.repositories.async_idempotency_repo import AsyncIdempotencyRepo
+            async with AsyncSessionLocal() as session:
+                result = await getattr(AsyncIdempotencyRepo(session), method)(*args)
+                await session.commit()
+                return result
+        return await run_in_threadpool(_call_repo, method, *args)
+
+    def _cached(self, cache_key: Tuple[str, str]) -> Optional[StoredResponse]:
+        stored = self._cache.get(cache_key)
+        if stored is None:
+            return None
+        if stored.expires_at < time.monotonic():
+            del self._cache[cache_key]
+            return None
+        self._cache.move_to_end(cache_key)
+        return stored
+
+    def _remember(self, cache_key: Tuple[str, str], stored: StoredResponse):
+        self._cache[cache_key] = stored
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+
+def _call_repo(method: str, *args):
+    with SessionLocal() as session:
+        result = getattr(IdempotencyRepo(session), method)(*args)
+        session.commit()
+        return result
+
+
+def purge_expired_keys() -> int:
+    """Удалить просроченные ключи (вызывается при старте сервиса)"""
+    return _call_repo('purge')
+
+
+idempotency_store = IdempotencyStore(settings.idempotency_cache_size, settings.idempotency_ttl_seconds,
+                                     settings.idempotency_lock_seconds, settings.idempotency_wait_seconds)
@@ -4,10 +4,19 @@ from fastapi import FastAPI, Request, Response
 from prometheus_client import Counter, Histogram, Gauge, CONTENT_TYPE_LATEST, generate_latest
 
 from app import rabbitmq
-from app.database import create_tables
-from app.endpoints.payment_router import payment_router
+from app.settings import settings, USE_ASYNC_DB
+from app.database import create_tables, seed_balances
+from app.endpoints.dead_letter_router import dead_letter_router
+from app.idempotency import purge_expired_keys
+from app.outbox_relay import outbox_relay, purge_sent_events
+from app.payment_workers import QUEUED_PROCESSING, payment_workers, stale_payment_sweeper
 from app.logging_config import configure_logging, get_logger
 
+if USE_ASYNC_DB:
+    from app.endpoints.async_payment_router import async_payment_router as payment_router
+else:
+    from app.endpoints.payment_router import payment_router
+
 # Инициализация логирования
 logger = configure_logging()
 
@@ -105,18 +114,41 @@ def startup():
     # Создать таблицы в БД перед запуском
     create_tables()
     log.info("database_tables_created")
+    seed_balances()
+    log.info("idempotency_keys_purged", count=purge_expired_keys())
 
     loop = asyncio.get_event_loop()
     asyncio.ensure_future(rabbitmq.consume(loop))
     log.info("rabbitmq_consumer_started")
 
+    if settings.outbox_relay_enabled:
+        log.info("outbox_events_purged", count=purge_sent_events())
+        outbox_relay.start()
+        log.info("outbox_relay_started", batch_size=outbox_relay.batch_size)
+
+    if QUEUED_PROCESSING:
+        payment_workers.start()
+        log.info("payment_workers_started", workers=payment_workers.concurrency,
+                 queue_size=payment_workers.queue_size)
+
+    # Работает в обоих режимах: и inline, и queued фиксируют PROCESSING до ответа провайдера
+    stale_payment_sweeper.start()
+    log.info("stale_payment_sweeper_started", stale_seconds=stale_payment_sweeper.stale_seconds)
+
     log.info("service_started")
 
 
 @app.on_event('shutdown')
-def shutdown():
+async def shutdown():
     log = get_logger().bind(service="payment-service")
     log.info("service_shutdown")
+    await rabbitmq.stop()
+    await payment_workers.stop()
+    await stale_payment_sweeper.stop()
+    await outbox_relay.stop()
+    if USE_ASYNC_DB:
+        from app.async_database import async_engine
+        await async_engine.dispose()
 
 
 @app.get("/health")
@@ -126,6 +158,7 @@ async def health_check():
 
 
 app.include_router(payment_router, prefix='/api')
+app.include_router(dead_letter_router, prefix='/api')
 
 # Эндпоинт для экспорта метрик
 @app.get("/metrics", include_in_schema=False)
@@ -0,0 +1,400 @@
+"""
+Потребитель очереди RabbitMQ с маршрутизацией по типу сообщения.
+
+Модуль одинаковый в service-payment и service-notifications (у сервисов
+раздельные контексты сборки), менять его нужно в обоих.
+
+- QoS: брокер выдает не больше prefetch_count неподтвержденных сообщений,
+  одновременно выполняется не больше concurrency обработчиков;
+- тип сообщения берется из свойства type, иначе из поля type тела,
+  обработчик и модель pydantic для тела - из таблицы маршрутов;
+- успешные сообщения подтверждаются пачками (ack multiple=True);
+- при исключении сообщение с увеличенным заголовком x-retry-count
+  публикуется в очередь ожидания <queue>.retry.<N>ms: у нее x-message-ttl
+  попытки (экспоненциальный рост) и dead-letter обратно в основную
+  очередь, так что повтор происходит через паузу, без нагрузки на брокер
+  и процессор;
+- после max_retries попыток и при PermanentError (битый JSON,
+  неизвестный тип, невалидное тело) сообщение с причиной в заголовках
+  перекладывается в <queue>.parked, откуда его можно посмотреть и
+  вернуть в основную очередь (parked, replay_parked);
+- метрики: сообщения в обработке, обработанные по результату
+  (rate() дает сообщения в секунду), время обработчика.
+"""
+import asyncio
+import json
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Type
+
+from aio_pika import DeliveryMode, ExchangeType, Message
+from aio_pika.abc import AbstractChannel, AbstractIncomingMessage, AbstractQueue, AbstractRobustConnection
+from prometheus_client import Counter, Gauge, Histogram
+from pydantic import BaseModel, ValidationError
+
+RETRY_HEADER = 'x-retry-count'
+PARKED_HEADER_PREFIX = 'x-parked-'
+
+messages_in_flight = Gauge('amqp_messages_in_flight', 'Messages being handled', ['queue'])
+messages_processed_total = Counter('amqp_messages_processed_total', 'Messages settled by the consumer',
+                                   ['queue', 'type', 'result'])
+handler_seconds = Histogram('amqp_handler_seconds', 'Message handler latency', ['queue', 'type'],
+                            buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+
+Handler = Callable[[Any], Awaitable[None]]
+
+
+class PermanentError(Exception):
+    """Сообщение не будет обработано ни с какой попытки: отклоняется без повторов"""
+
+
+@dataclass
+class Route:
+    handler: Handler
+    model: Optional[Type[BaseModel]] = None
+
+
+class AckBatcher:
+    """
+    Пакетное подтверждение сообщений одного канала.
+
+    Обработчики завершаются не по порядку, а ack с multiple=True
+    подтверждает все сообщения до delivery tag включительно, поэтому
+    подтверждается только непрерывный префикс завершенных сообщений.
+    Delivery tag уникален только в пределах канала: после переподключения
+    состояние сбрасывается, а завершения сообщений старого канала
+    пропускаются, чтобы их теги не совпали с тегами нового
+    """
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self._channel = None  # канал, к которому относятся теги в _order
+        self._order = deque()  # delivery tag в порядке получения
+        self._settled: Dict[int, Optional[AbstractIncomingMessage]] = {}  # None - уже nack/reject
+        self._waiting = 0  # завершенные, но еще не подтвержденные
+
+    def received(self, message: AbstractIncomingMessage):
+        if message.channel is not self._channel:
+            # Новый канал после переподключения: старые теги недействительны,
+            # неподтвержденные сообщения брокер доставит заново
+            self._channel = message.channel
+            self._order.clear()
+            self._settled.clear()
+            self._waiting = 0
+        self._order.append(message.delivery_tag)
+
+    async def ack(self, message: AbstractIncomingMessage):
+        if message.channel is not self._channel:
+            return  # Сообщение закрытого канала брокер доставит заново
+        self._settled[message.delivery_tag] = message
+        self._waiting += 1
+        if self._waiting >= self.batch_size:
+            await self.flush()
+
+    def settled(self, message: AbstractIncomingMessage):
+        """Сообщение уже отклонено или возвращено отдельно - ack для него не нужен"""
+        if message.channel is not self._channel:
+            return
+        self._settled[message.delivery_tag] = None
+
+    async def flush(self):
+        last = None
+        while self._order and self._order[0] in self._settled:
+            message = self._settled.pop(self._order.popleft())
+            if message is not None:
+                last = message
+                self._waiting -= 1
+        if last is not None:
+            try:
+                await last.ack(multiple=True)
+            except Exception:
+                # Канал закрыт: сообщения будут доставлены повторно
+                traceback.print_exc()
+
+
+class MessageConsumer:
+    """
+    Потребитель одной очереди
+
+    Args:
+        queue_name: Имя очереди (объявляется durable)
+        bindings: Пары (topic-обменник, routing key), к которым привязывается очередь
+        prefetch_count: QoS канала - максимум неподтвержденных сообщений
+        concurrency: Максимум одновременно выполняемых обработчиков
+        max_retries: Повторных попыток после ошибки обработчика
+        retry_base_delay: Пауза перед первым повтором, секунды; дальше удваивается
+        retry_max_delay: Максимальная пауза между попытками, секунды
+        ack_batch_size: Сколько завершенных сообщений подтверждать одним ack
+        ack_interval: Как часто подтверждать неполную пачку, секунды
+    """
+
+    def __init__(self, queue_name: str, bindings: Sequence[Tuple[str, str]] = (), prefetch_count: int = 200,
+                 concurrency: int = 100, max_retries: int = 5, retry_base_delay: float = 1.0,
+                 retry_max_delay: float = 300.0, ack_batch_size: int = 50, ack_interval: float = 0.05):
+        if prefetch_count < 1 or concurrency < 1 or not 1 <= ack_batch_size <= prefetch_count:
+            raise ValueError("expected prefetch_count >= 1, concurrency >= 1, 1 <= ack_batch_size <= prefetch_count")
+        self.queue_name = queue_name
+        self.bindings = bindings
+        self.prefetch_count = prefetch_count
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_delays = backoff_delays(max_retries, retry_base_delay, retry_max_delay)
+        self.parking_queue = f"{queue_name}.parked"
+        self.ack_interval = ack_interval
+        self.routes: Dict[str, Route] = {}
+        self.default_route: Optional[Route] = None
+        self._batcher = AckBatcher(ack_batch_size)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._connection: Optional[AbstractRobustConnection] = None
+        self._channel: Optional[AbstractChannel] = None
+        self._queue: Optional[AbstractQueue] = None
+        self._consumer_tag: Optional[str] = None
+        self._flusher: Optional[asyncio.Future] = None
+        self._in_flight = messages_in_flight.labels(queue=queue_name)
+
+    def route(self, message_type: Optional[str], model: Optional[Type[BaseModel]] = None):
+        """
+        Декоратор обработчика сообщений типа message_type (None - для всех
+        остальных типов). Обработчик получает экземпляр model или dict
+        """
+        def register(handler: Handler) -> Handler:
+            if message_type is None:
+                self.default_route = Route(handler, model)
+            else:
+                self.routes[message_type] = Route(handler, model)
+            return handler
+        return register
+
+    async def start(self, connection: AbstractRobustConnection):
+        """Открыть канал, объявить очередь и начать потребление"""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._connection = connection
+        self._channel = await connection.channel()
+        await self._channel.set_qos(prefetch_count=self.prefetch_count)
+        self._queue = await self.declare(self._channel)
+        self._consumer_tag = await self._queue.consume(self._on_message)
+        self._flusher = asyncio.ensure_future(self._flush_periodically())
+
+    async def declare(self, channel: AbstractChannel) -> AbstractQueue:
+        queue = await channel.declare_queue(self.queue_name, durable=True)
+        for exchange_name, routing_key in self.bindings:
+            exchange = await channel.declare_exchange(exchange_name, ExchangeType.TOPIC, durable=True)
+            await queue.bind(exchange, routing_key)
+        # Очереди ожидания повтора: сообщение лежит в них TTL и по dead-letter
+        # через обменник по умолчанию возвращается в основную очередь
+        for delay in sorted(set(self.retry_delays)):
+            await channel.declare_queue(retry_queue_name(self.queue_name, delay), durable=True, arguments={
+                'x-message-ttl': int(delay * 1000),
+                'x-dead-letter-exchange': '',
+                'x-dead-letter-routing-key': self.queue_name,
+            })
+        await channel.declare_queue(self.parking_queue, durable=True)
+        return queue
+
+    async def stop(self):
+        """Перестать получать сообщения, дождаться обработчиков и подтвердить завершенные"""
+        if self._queue is None:
+            return
+        await self._queue.cancel(self._consumer_tag)
+        for _ in range(self.concurrency):
+            await self._semaphore.acquire()
+        self._flusher.cancel()
+        await asyncio.gather(self._flusher, return_exceptions=True)
+        await self._batcher.flush()
+        await self._channel.close()
+        self._queue = None
+
+    def decode(self, message: AbstractIncomingMessage) -> Tuple[str, Route, Any]:
+        """
+        (тип, маршрут, тело для обработчика)
+
+        Raises:
+            PermanentError: Тело не JSON, тип неизвестен или тело не проходит валидацию
+        """
+        try:
+            data = json.loads(message.body)
+        except ValueError as e:
+            raise PermanentError(f"Invalid JSON: {e}") from e
+        message_type = message.type or (data.get('type') if isinstance(data, dict) else None) or 'unknown'
+        route = self.routes.get(message_type, self.default_route)
+        if route is None:
+            raise PermanentError(f"No handler for message type '{message_type}'")
+        if route.model is None:
+            return message_type, route, data
+        try:
+            return message_type, route, route.model.model_validate(data)
+        except ValidationError as e:
+            raise PermanentError(str(e)) from e
+
+    async def _on_message(self, message: AbstractIncomingMessage):
+        self._batcher.received(message)
+        async with self._semaphore:
+            self._in_flight.inc()
+            started = time.perf_counter()
+            message_type = message.type or 'unknown'
+            try:
+                message_type, route, payload = self.decode(message)
+                await route.handler(payload)
+            except PermanentError as e:
+                print(f"Parking message from {self.queue_name} ({message_type}): {e}")
+                result = await self._park(message, 'rejected', e)
+            except Exception as e:
+                traceback.print_exc()
+                result = await self._retry(message, e)
+            else:
+                result = 'ok'
+                await self._batcher.ack(message)
+            finally:
+                handler_seconds.labels(queue=self.queue_name, type=message_type).observe(
+                    time.perf_counter() - started)
+                self._in_flight.dec()
+        messages_processed_total.labels(queue=self.queue_name, type=message_type, result=result).inc()
+
+    async def _retry(self, message: AbstractIncomingMessage, error: Exception) -> str:
+        """
+        Отложить повтор: копия с увеличенным счетчиком попыток уходит в очередь
+        ожидания, исходное сообщение подтверждается. nack(requeue=True) счетчика
+        не хранит и возвращает сообщение сразу, без паузы
+        """
+        attempt = retry_count(message) + 1
+        if attempt > self.max_retries:
+            return await self._park(message, 'exhausted', error)
+        delay = self.retry_delays[attempt - 1]
+        copy = copy_message(message, {RETRY_HEADER: attempt})
+        return await self._move(message, copy, retry_queue_name(self.queue_name, delay), 'retry')
+
+    async def _park(self, message: AbstractIncomingMessage, reason: str, error: Exception) -> str:
+        """Переложить сообщение в parking-очередь с причиной и текстом ошибки"""
+        copy = copy_message(message, {
+            f'{PARKED_HEADER_PREFIX}reason': reason,
+            f'{PARKED_HEADER_PREFIX}error': f"{type(error).__name__}: {error}"[:1000],
+            f'{PARKED_HEADER_PREFIX}at': datetime.now().isoformat(),
+        })
+        return await self._move(message, copy, self.parking_queue, reason)
+
+    async def _move(self, message: AbstractIncomingMessage, copy: Message, routing_key: str, result: str) -> str:
+        """
+        Опубликовать копию (с подтверждением брокера) и подтвердить исходное сообщение.
+        Если публикация не удалась, исходное сообщение возвращается в очередь
+        """
+        try:
+            await self._channel.default_exchange.publish(copy, routing_key=routing_key)
+        except Exception:
+            traceback.print_exc()
+            await message.nack(requeue=True)
+            self._batcher.settled(message)
+            return 'requeued'
+        await self._batcher.ack(message)
+        return result
+
+    async def parked(self, limit: int) -> Tuple[int, List[dict]]:
+        """
+        Посмотреть сообщения parking-очереди, не забирая их
+
+        Returns:
+            (всего сообщений в очереди, первые limit сообщений)
+        """
+        channel = await self._admin_channel()
+        try:
+            queue = await channel.declare_queue(self.parking_queue, durable=True)
+            total = queue.declaration_result.message_count
+            messages = []
+            while len(messages) < limit:
+                message = await queue.get(no_ack=False, fail=False)
+                if message is None:
+                    break
+                messages.append(describe_parked(message))
+            return total, messages
+        finally:
+            # Неподтвержденные сообщения при закрытии канала возвращаются в очередь
+            await channel.close()
+
+    async def replay_parked(self, limit: int) -> int:
+        """
+        Вернуть до limit сообщений из parking-очереди в основную со сброшенным
+        счетчиком попыток
+
+        Returns:
+            Число возвращенных сообщений
+        """
+        channel = await self._admin_channel()
+        replayed = 0
+        try:
+            queue = await channel.declare_queue(self.parking_queue, durable=True)
+            while replayed < limit:
+                message = await queue.get(no_ack=False, fail=False)
+                if message is None:
+                    break
+                headers = {name: value for name, value in (message.headers or {}).items()
+                           if not name.startswith(PARKED_HEADER_PREFIX) and name != 'x-death'}
+                headers[RETRY_HEADER] = 0
+                await channel.default_exchange.publish(copy_message(message, headers, replace=True),
+                                                       routing_key=self.queue_name)
+                await message.ack()
+                replayed += 1
+        finally:
+            await channel.close()
+        return replayed
+
+    async def _admin_channel(self) -> AbstractChannel:
+        if self._connection is None:
+            raise RuntimeError(f"Consumer of {self.queue_name} is not started")
+        return await self._connection.channel()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.ack_interval)
+            await self._batcher.flush()
+
+
+def retry_count(message: AbstractIncomingMessage) -> int:
+    return int((message.headers or {}).get(RETRY_HEADER, 0))
+
+
+def backoff_delays(max_retries: int, base_delay: float, max_delay: float) -> List[float]:
+    """Паузы перед попытками 1..max_retries: base_delay, 2 * base_delay, ... не больше max_delay"""
+    return [min(base_delay * 2 ** attempt, max_delay) for attempt in range(max_retries)]
+
+
+def retry_queue_name(queue_name: str, delay: float) -> str:
+    return f"{queue_name}.retry.{int(delay * 1000)}ms"
+
+
+def describe_parked(message: AbstractIncomingMessage) -> dict:
+    headers = {name: value.decode() if isinstance(value, bytes) else value
+               for name, value in (message.headers or {}).items()}
+    try:
+        body = json.loads(message.body)
+    except ValueError:
+        body = message.body.decode(errors='replace')
+    return {
+        "message_id": message.message_id,
+        "type": message.type,
+        "retries": int(headers.get(RETRY_HEADER, 0)),
+        "reason": headers.get(f'{PARKED_HEADER_PREFIX}reason'),
+        "error": headers.get(f'{PARKED_HEADER_PREFIX}error'),
+        "parked_at": headers.get(f'{PARKED_HEADER_PREFIX}at'),
+        "body": body,
+    }
+
+
+def copy_message(message: AbstractIncomingMessage, headers: dict, replace: bool = False) -> Message:
+    """Копия входящего сообщения для повторной публикации с дополненными (или замененными) заголовками"""
+    return Message(
+        message.body,
+        headers=headers if replace else {**(message.headers or {}), **headers},
+        content_type=message.content_type,
+        delivery_mode=DeliveryMode.PERSISTENT,
+        message_id=message.message_id,
+        type=message.type,
+    )
+
+
+async def start_consumers(connection: AbstractRobustConnection, consumers: List[MessageConsumer]):
+    for consumer in consumers:
+        await consumer.start(connection)
+        print(f"Started consuming {consumer.queue_name} (prefetch {consumer.prefetch_count}, "
+              f"concurrency {consumer.concurrency})")
@@ -0,0 +1,25 @@
+from typing import Any, List, Optional
+
+from pydantic import BaseModel
+
+
+class ParkedMessage(BaseModel):
+    """Сообщение parking-очереди: исчерпало повторы или не может быть обработано"""
+    message_id: Optional[str] = None
+    type: Optional[str] = None
+    retries: int
+    reason: Optional[str] = None  # exhausted, rejected
+    error: Optional[str] = None
+    parked_at: Optional[str] = None
+    body: Any
+
+
+class ParkedQueue(BaseModel):
+    queue: str
+    parked_total: int
+    messages: List[ParkedMessage] = []
+
+
+class ReplayResult(BaseModel):
+    queue: str
+    replayed: int
@@ -32,3 +32,10 @@ class Payment(BaseModel):
     created_at: Optional[str] = None
     completed_at: Optional[str] = None
     transaction_id: Optional[str] = None
+
+
+class PaymentAccepted(BaseModel):
+    """Ответ 202 на /process в режиме queued"""
+    payment_id: int
+    status: PaymentStatus
+    status_url: str
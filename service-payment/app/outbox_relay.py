@@ -0,0 +1,166 @@
+"""
+Публикация событий платежей из outbox в RabbitMQ.
+
+PaymentService записывает событие в payment_outbox в той же транзакции,
+что и смену статуса, поэтому /process не ждет брокера. Relay в фоне
+забирает пачку неотправленных событий (FOR UPDATE SKIP LOCKED), публикует
+их параллельно в канале с publisher confirms и помечает sent_at только
+подтвержденные брокером. Доставка at-least-once: при сбое между
+публикацией и коммитом событие будет отправлено повторно. Сервис
+уведомлений отбрасывает повторы по паре (событие, получатель), см.
+service-notifications/app/rabbitmq.py.
+"""
+import asyncio
+import json
+import time
+import traceback
+from typing import List, Optional, Sequence
+
+from aio_pika import DeliveryMode, ExchangeType, Message, connect_robust
+from aio_pika.abc import AbstractExchange, AbstractRobustConnection
+from prometheus_client import Counter, Histogram
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.repositories.outbox_repo import OutboxRepo
+from app.settings import settings, USE_ASYNC_DB
+
+PAYMENT_EVENTS_EXCHANGE = 'payment_events'
+# Очередь событий для сервиса уведомлений; объявляется и здесь, чтобы события
+# не терялись, пока получатель еще не запущен
+PAYMENT_EVENTS_QUEUE = 'payment_events'
+PAYMENT_EVENTS_ROUTING = 'payment.*'
+PUBLISH_TIMEOUT_SECONDS = 10.0
+
+events_published_total = Counter('outbox_events_published_total', 'Outbox events confirmed by the broker')
+publish_failures_total = Counter('outbox_publish_failures_total', 'Outbox events not confirmed by the broker')
+batch_seconds = Histogram('outbox_batch_seconds', 'Time to publish and mark one outbox batch')
+batch_events = Histogram('outbox_batch_events', 'Events in one outbox batch',
+                         buckets=(1, 10, 50, 100, 250, 500, 1000, 2500))
+
+
+async def declare_topology(connection: AbstractRobustConnection) -> AbstractExchange:
+    """Канал с publisher confirms, обменник событий и очередь сервиса уведомлений"""
+    channel = await connection.channel(publisher_confirms=True)
+    exchange = await channel.declare_exchange(PAYMENT_EVENTS_EXCHANGE, ExchangeType.TOPIC, durable=True)
+    queue = await channel.declare_queue(PAYMENT_EVENTS_QUEUE, durable=True)
+    await queue.bind(exchange, PAYMENT_EVENTS_ROUTING)
+    return exchange
+
+
+def event_message(event_id: int, event_type: str, payload: dict) -> Message:
+    return Message(
+        json.dumps(payload).encode(),
+        content_type='application/json',
+        delivery_mode=DeliveryMode.PERSISTENT,
+        message_id=str(event_id),
+        type=event_type,
+    )
+
+
+class OutboxRelay:
+    """
+    Фоновая публикация outbox пачками
+
+    Args:
+        batch_size: Максимум событий в одной пачке
+        poll_interval: Пауза после неполной пачки, секунды
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float):
+        if batch_size < 1:
+            raise ValueError("expected batch_size >= 1")
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Future] = None
+
+    def start(self):
+        """Запустить relay в текущем event loop"""
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def relay_batch(self, exchange: AbstractExchange) -> int:
+        """
+        Опубликовать одну пачку неотправленных событий
+
+        Returns:
+            Число событий в пачке (подтвержденных и нет)
+        """
+        started = time.monotonic()
+        if USE_ASYNC_DB:
+            # Асинхронный движок импортируется только при DB_DRIVER=asyncpg
+            from app.async_database import AsyncSessionLocal
+            from app.repositories.async_outbox_repo import AsyncOutboxRepo
+            async with AsyncSessionLocal() as session:
+                repo = AsyncOutboxRepo(session)
+                rows = await repo.fetch_pending(self.batch_size)
+                if rows:
+                    await repo.mark_sent(await self._publish(exchange, rows))
+                await session.commit()
+        else:
+            # Сессия по очереди используется из потоков threadpool, не одновременно
+            session = SessionLocal()
+            try:
+                repo = OutboxRepo(session)
+                rows = await run_in_threadpool(repo.fetch_pending, self.batch_size)
+                if rows:
+                    await run_in_threadpool(repo.mark_sent, await self._publish(exchange, rows))
+                await run_in_threadpool(session.commit)
+            finally:
+                await run_in_threadpool(session.close)
+        if rows:
+            batch_events.observe(len(rows))
+            batch_seconds.observe(time.monotonic() - started)
+        return len(rows)
+
+    async def _publish(self, exchange: AbstractExchange, rows: Sequence[tuple]) -> List[int]:
+        """Опубликовать события параллельно; вернуть id подтвержденных брокером"""
+        results = await asyncio.gather(*(
+            exchange.publish(event_message(event_id, event_type, payload), routing_key=event_type,
+                             timeout=PUBLISH_TIMEOUT_SECONDS)
+            for event_id, event_type, payload in rows
+        ), return_exceptions=True)
+        confirmed = [row[0] for row, result in zip(rows, results) if not isinstance(result, BaseException)]
+        events_published_total.inc(len(confirmed))
+        if len(confirmed) < len(rows):
+            # Неподтвержденные события остаются в outbox и уйдут со следующей пачкой
+            publish_failures_total.inc(len(rows) - len(confirmed))
+            failed = next(result for result in results if isinstance(result, BaseException))
+            print(f"Outbox: {len(rows) - len(confirmed)} event(s) not confirmed: {failed!r}")
+        return confirmed
+
+    async def _run(self):
+        connection = None
+        exchange = None
+        while True:
+            try:
+                if exchange is None:
+                    connection = connection or await connect_robust(settings.amqp_url)
+                    exchange = await declare_topology(connection)
+                if await self.relay_batch(exchange) < self.batch_size:
+                    await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                if connection is not None:
+                    await connection.close()
+                raise
+            except Exception:
+                # БД или брокер недоступны: события дождутся в outbox
+                traceback.print_exc()
+                await asyncio.sleep(max(self.poll_interval, 1.0))
+
+
+def purge_sent_events() -> int:
+    """Удалить отправленные события старше outbox_retention_seconds (вызывается при старте сервиса)"""
+    with SessionLocal() as session:
+        count = OutboxRepo(session).purge_sent(settings.outbox_retention_seconds)
+        session.commit()
+        return count
+
+
+outbox_relay = OutboxRelay(settings.outbox_batch_size, settings.outbox_poll_interval)
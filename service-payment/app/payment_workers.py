@@ -0,0 +1,234 @@
+"""
+Пул воркеров фоновой обработки платежей (PAYMENT_PROCESSING_MODE=queued).
+
+/process переводит платеж в PROCESSING и ставит его в очередь, воркеры
+ждут ответа провайдера и завершают платеж (статус, перевод денег, удаление
+задачи). Одновременно обрабатывается не больше payment_workers платежей,
+очередь ограничена payment_queue_size: место резервируется до смены
+статуса, поэтому принятый платеж всегда попадает в очередь.
+Вся работа с очередью идет в потоке event loop, блокировки не нужны.
+
+Очередь живет в памяти процесса: если он остановился, не завершив платеж,
+тот остается в PROCESSING с зарезервированными деньгами. StalePaymentSweeper
+при старте и затем периодически переводит такие платежи в FAILED и
+возвращает резерв заказчику.
+"""
+import asyncio
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SessionLocal
+from app.models.payment import Payment
+from app.services.payment_service import PaymentService, PROVIDER_DELAY_SECONDS, provider_succeeded
+from app.settings import settings, USE_ASYNC_DB
+from app.unit_of_work import UnitOfWork
+
+queue_depth = Gauge('payment_queue_depth', 'Payments accepted and waiting for a worker')
+queue_capacity = Gauge('payment_queue_capacity', 'Maximum payments waiting for a worker')
+workers_busy = Gauge('payment_workers_busy', 'Workers processing a payment')
+workers_total = Gauge('payment_workers', 'Configured payment workers')
+queue_wait_seconds = Histogram('payment_queue_wait_seconds', 'Time a payment waited for a worker')
+processing_seconds = Histogram('payment_processing_seconds', 'Time a worker spent on a payment')
+jobs_total = Counter('payment_jobs_total', 'Payments finished by workers', ['result'])
+queue_rejected_total = Counter('payment_queue_rejected_total', 'Payments rejected because the queue was full')
+stale_failed_total = Counter('payment_stale_failed_total', 'Payments stuck in PROCESSING moved to FAILED')
+
+STALE_SWEEP_BATCH = 100
+
+
+class QueueFullError(Exception):
+    """Очередь обработки платежей заполнена"""
+
+
+class PaymentWorkerPool:
+    """
+    Ограниченная очередь платежей и фиксированное число воркеров
+
+    Args:
+        handler: Корутина, завершающая обработку платежа по id
+        concurrency: Число воркеров
+        queue_size: Максимум платежей, ожидающих воркера
+    """
+
+    def __init__(self, handler: Callable[[int], Awaitable[Payment]], concurrency: int, queue_size: int):
+        if concurrency < 1 or queue_size < 1:
+            raise ValueError("expected concurrency >= 1 and queue_size >= 1")
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self._handler = handler
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Future] = []
+        self._pending = 0  # зарезервированные места и платежи в очереди
+
+    @property
+    def depth(self) -> int:
+        return self._pending
+
+    def start(self):
+        """Запустить воркеров в текущем event loop"""
+        self._queue = asyncio.Queue()
+        self._workers = [asyncio.ensure_future(self._run()) for _ in range(self.concurrency)]
+        workers_total.set(self.concurrency)
+        queue_capacity.set(self.queue_size)
+
+    async def stop(self, timeout: float = 10.0):
+        """Дождаться обработки очереди (не дольше timeout) и остановить воркеров"""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Payment workers stopped with {self._queue.qsize()} payment(s) still queued")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    @contextmanager
+    def reserve(self) -> Iterator[Callable[[int], None]]:
+        """
+        Зарезервировать место в очереди на время перевода платежа в PROCESSING
+
+        Yields:
+            Функция, ставящая платеж в очередь на зарезервированное место
+
+        Raises:
+            QueueFullError: Если очередь заполнена или пул не запущен
+        """
+        if self._queue is None or self._pending >= self.queue_size:
+            queue_rejected_total.inc()
+            raise QueueFullError("Payment queue is full, retry later")
+        self._pending += 1
+        queue_depth.set(self._pending)
+        submitted = False
+
+        def submit(payment_id: int):
+            nonlocal submitted
+            submitted = True
+            self._queue.put_nowait((payment_id, time.monotonic()))
+
+        try:
+            yield submit
+        finally:
+            if not submitted:
+                self._pending -= 1
+                queue_depth.set(self._pending)
+
+    async def _run(self):
+        while True:
+            payment_id, queued_at = await self._queue.get()
+            self._pending -= 1
+            queue_depth.set(self._pending)
+            queue_wait_seconds.observe(time.monotonic() - queued_at)
+            workers_busy.inc()
+            started = time.monotonic()
+            try:
+                payment = await self._handler(payment_id)
+                jobs_total.labels(result=payment.status.value).inc()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Платеж остается в PROCESSING, его завершит StalePaymentSweeper
+                jobs_total.labels(result='error').inc()
+                traceback.print_exc()
+            finally:
+                processing_seconds.observe(time.monotonic() - started)
+                workers_busy.dec()
+                self._queue.task_done()
+
+
+async def complete_payment(payment_id: int) -> Payment:
+    """Дождаться ответа провайдера и завершить платеж в собственной единице работы"""
+    await asyncio.sleep(PROVIDER_DELAY_SECONDS)  # Имитация задержки провайдера
+    is_successful = provider_succeeded()
+    if USE_ASYNC_DB:
+        # Асинхронный движок импортируется только при DB_DRIVER=asyncpg
+        from app.async_database import AsyncSessionLocal
+        from app.async_unit_of_work import AsyncUnitOfWork
+        from app.services.async_payment_service import AsyncPaymentService
+        async with AsyncSessionLocal() as session:
+            return await AsyncPaymentService(AsyncUnitOfWork(session)).complete_processing(payment_id, is_successful)
+    return await run_in_threadpool(_complete_payment_sync, payment_id, is_successful)
+
+
+def _complete_payment_sync(payment_id: int, is_successful: bool) -> Payment:
+    session = SessionLocal()
+    try:
+        return PaymentService(UnitOfWork(session)).complete_processing(payment_id, is_successful)
+    finally:
+        session.close()
+
+
+class StalePaymentSweeper:
+    """
+    Фоновый перевод зависших в PROCESSING платежей в FAILED
+
+    Args:
+        stale_seconds: Платеж в PROCESSING дольше этого считается зависшим
+        interval: Пауза между проверками, секунды
+    """
+
+    def __init__(self, stale_seconds: int, interval: float):
+        self.stale_seconds = stale_seconds
+        self.interval = interval
+        self._task: Optional[asyncio.Future] = None
+
+    def start(self):
+        """Запустить проверки в текущем event loop; первая выполняется сразу"""
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                failed = await fail_stale_payments(self.stale_seconds, STALE_SWEEP_BATCH)
+                if failed:
+                    stale_failed_total.inc(failed)
+                    print(f"Payment sweeper: {failed} payment(s) stuck in PROCESSING moved to FAILED")
+                if failed >= STALE_SWEEP_BATCH:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # БД недоступна: платежи дождутся следующей проверки
+                traceback.print_exc()
+            await asyncio.sleep(self.interval)
+
+
+async def fail_stale_payments(older_than_seconds: int, limit: int) -> int:
+    """Перевести в FAILED не больше limit зависших платежей в собственной единице работы"""
+    if USE_ASYNC_DB:
+        from app.async_database import AsyncSessionLocal
+        from app.async_unit_of_work import AsyncUnitOfWork
+        from app.services.async_payment_service import AsyncPaymentService
+        async with AsyncSessionLocal() as session:
+            return await AsyncPaymentService(AsyncUnitOfWork(session)).fail_stale_processing(older_than_seconds,
+                                                                                              limit)
+    return await run_in_threadpool(_fail_stale_payments_sync, older_than_seconds, limit)
+
+
+def _fail_stale_payments_sync(older_than_seconds: int, limit: int) -> int:
+    session = SessionLocal()
+    try:
+        return PaymentService(UnitOfWork(session)).fail_stale_processing(older_than_seconds, limit)
+    finally:
+        session.close()
+
+
+QUEUED_PROCESSING: bool = settings.payment_processing_mode == 'queued'
+
+payment_workers = PaymentWorkerPool(complete_payment, settings.payment_workers, settings.payment_queue_size)
+
+stale_payment_sweeper = StalePaymentSweeper(settings.payment_stale_seconds, settings.payment_sweep_interval)
@@ -1,30 +1,37 @@
-import json
-import traceback
 from asyncio import AbstractEventLoop
 from aio_pika.abc import AbstractRobustConnection
-from aio_pika import connect_robust, IncomingMessage
+from aio_pika import connect_robust
 
+from app.messaging import MessageConsumer, start_consumers
 from app.settings import settings
 
+payment_notifications = MessageConsumer(
+    'payment_notifications',
+    prefetch_count=settings.consumer_prefetch_count,
+    concurrency=settings.consumer_concurrency,
+    max_retries=settings.consumer_max_retries,
+    retry_base_delay=settings.consumer_retry_base_delay,
+    retry_max_delay=settings.consumer_retry_max_delay,
+    ack_batch_size=settings.consumer_ack_batch_size,
+    ack_interval=settings.consumer_ack_interval,
+)
 
-async def process_payment_notification(msg: IncomingMessage):
-    try:
-        data = json.loads(msg.body.decode())
-        # TODO: Обработать сообщение о платеже
-        print(f"Received payment notification: {data}")
-        await msg.ack()
-    except Exception as e:
-        traceback.print_exc()
-        await msg.ack()
+
+@payment_notifications.route(None)
+async def process_payment_notification(data: dict):
+    # TODO: Обработать сообщение о платеже
+    print(f"Received payment notification: {data}")
 
 
 async def consume(loop: AbstractEventLoop) -> AbstractRobustConnection:
     connection = await connect_robust(settings.amqp_url, loop=loop)
-    channel = await connection.channel()
+    await start_consumers(connection, [payment_notifications])
+    return connection
 
-    queue = await channel.declare_queue('payment_notifications', durable=True)
 
-    await queue.consume(process_payment_notification)
-    print('Started RabbitMQ consuming for payments...')
+# Потребители по имени очереди (для app.endpoints.dead_letter_router)
+consumers = {consumer.queue_name: consumer for consumer in [payment_notifications]}
 
-    return connection
+
+async def stop():
+    await payment_notifications.stop()
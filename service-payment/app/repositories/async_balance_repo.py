@@ -0,0 +1,55 @@
+"""
+Асинхронный репозиторий балансов (AsyncSession, asyncpg).
+Те же условные UPDATE ... RETURNING, что в BalanceRepo
+"""
+from typing import Dict
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.balance_repo import (ENTRY_RELEASE, ENTRY_RESERVE, balances_table, ledger_entry,
+                                           ledger_statement, release_statement, reserve_statement,
+                                           settlement_steps)
+
+
+class AsyncBalanceRepo:
+    db: AsyncSession
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_balance(self, user_id: int) -> float:
+        balance = (await self.db.execute(
+            select(balances_table.c.balance).where(balances_table.c.user_id == user_id)
+        )).scalar()
+        return balance if balance is not None else 0.0
+
+    async def get_all_balances(self) -> Dict[int, float]:
+        rows = await self.db.execute(
+            select(balances_table.c.user_id, balances_table.c.balance).order_by(balances_table.c.user_id)
+        )
+        return {row.user_id: row.balance for row in rows}
+
+    async def reserve(self, user_id: int, amount: float, payment_id: int) -> bool:
+        row = (await self.db.execute(reserve_statement(user_id, amount))).first()
+        if row is None:
+            return False
+        await self.db.execute(ledger_statement([ledger_entry(row, payment_id, ENTRY_RESERVE, -amount, amount)]))
+        return True
+
+    async def release(self, user_id: int, amount: float, payment_id: int) -> bool:
+        row = (await self.db.execute(release_statement(user_id, amount))).first()
+        if row is None:
+            return False
+        await self.db.execute(ledger_statement([ledger_entry(row, payment_id, ENTRY_RELEASE, amount, -amount)]))
+        return True
+
+    async def settle(self, from_user: int, to_user: int, amount: float, payment_id: int) -> bool:
+        entries = []
+        for statement, entry_type, amount_delta, reserved_delta in settlement_steps(from_user, to_user, amount):
+            row = (await self.db.execute(statement)).first()
+            if row is None:
+                return False
+            entries.append(ledger_entry(row, payment_id, entry_type, amount_delta, reserved_delta))
+        await self.db.execute(ledger_statement(entries))
+        return True
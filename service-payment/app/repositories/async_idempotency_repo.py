@@ -0,0 +1,32 @@
+"""
+Асинхронный репозиторий ключей идемпотентности (AsyncSession, asyncpg).
+Те же запросы, что в IdempotencyRepo
+"""
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repositories.idempotency_repo import (claim_statement, complete_statement, get_statement,
+                                               release_statement, takeover_statement)
+
+
+class AsyncIdempotencyRepo:
+    db: AsyncSession
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def claim(self, scope: str, key: str, fingerprint: str, lock_seconds: float, ttl_seconds: float) -> bool:
+        if (await self.db.execute(claim_statement(scope, key, fingerprint, lock_seconds, ttl_seconds))).first():
+            return True
+        result = await self.db.execute(takeover_statement(scope, key, fingerprint, lock_seconds, ttl_seconds))
+        return result.first() is not None
+
+    async def get(self, scope: str, key: str) -> Optional[tuple]:
+        return (await self.db.execute(get_statement(scope, key))).first()
+
+    async def complete(self, scope: str, key: str, code: int, body: str, headers: dict):
+        await self.db.execute(complete_statement(scope, key, code, body, headers))
+
+    async def release(self, scope: str, key: str):
+        await self.db.execute(release_statement(scope, key))
@@ -0,0 +1,27 @@
+"""
+Асинхронный репозиторий outbox событий платежей (AsyncSession, asyncpg).
+Те же запросы, что в OutboxRepo
+"""
+from typing import List, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.payment import Payment
+from app.repositories.outbox_repo import add_statement, mark_sent_statement, pending_statement
+
+
+class AsyncOutboxRepo:
+    db: AsyncSession
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add(self, payment: Payment):
+        await self.db.execute(add_statement(payment))
+
+    async def fetch_pending(self, limit: int) -> List[tuple]:
+        return (await self.db.execute(pending_statement(limit))).all()
+
+    async def mark_sent(self, event_ids: Sequence[int]):
+        if event_ids:
+            await self.db.execute(mark_sent_statement(event_ids))
@@ -0,0 +1,60 @@
+"""
+Асинхронный репозиторий платежей (AsyncSession, asyncpg).
+Не коммитит сам: транзакцией управляет app.async_unit_of_work.AsyncUnitOfWork
+"""
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.payment import Payment as DBPayment
+from app.models.payment import Payment as ModelPayment, PaymentStatus
+from app.repositories.payment_query import PaymentFilter, list_statement, split_page
+from app.repositories.payment_repo import stale_processing_statement, to_model_payment, transition_statement
+
+
+class AsyncPaymentRepo:
+    db: AsyncSession
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_payments(self, payment_filter: PaymentFilter, limit: int,
+                            cursor: str = None) -> tuple[list[ModelPayment], str | None]:
+        """Страница платежей по фильтрам, см. PaymentRepo.list_payments"""
+        rows = (await self.db.execute(list_statement(payment_filter, limit, cursor))).scalars().all()
+        rows, next_cursor = split_page(rows, limit)
+        return [to_model_payment(p) for p in rows], next_cursor
+
+    async def get_payment(self, payment_id: int) -> ModelPayment | None:
+        db_payment = await self.db.get(DBPayment, payment_id)
+        return to_model_payment(db_payment) if db_payment else None
+
+    async def create_payment(self, payment: ModelPayment) -> ModelPayment:
+        if payment.id and await self.db.get(DBPayment, payment.id):
+            raise KeyError(f"Payment {payment.id} already exists")
+
+        db_payment = DBPayment(
+            customer_user_id=payment.customer_user_id,
+            assigned_user_id=payment.assigned_user_id,
+            task_id=payment.task_id,
+            amount=payment.amount,
+            payment_method=payment.payment_method,
+            status=payment.status,
+            created_at=datetime.fromisoformat(payment.created_at) if payment.created_at else datetime.utcnow()
+        )
+        self.db.add(db_payment)
+        await self.db.flush()
+        return to_model_payment(db_payment)
+
+    async def transition_status(self, payment_id: int, expected: PaymentStatus, status: PaymentStatus,
+                                transaction_id: str = None, completed_at: datetime = None) -> ModelPayment | None:
+        """Compare-and-set смена статуса, см. PaymentRepo.transition_status"""
+        result = await self.db.execute(transition_statement(payment_id, expected, status, transaction_id,
+                                                            completed_at))
+        row = result.first()
+        return to_model_payment(row) if row else None
+
+    async def list_stale_processing(self, older_than_seconds: int, limit: int) -> list[int]:
+        """id платежей, зависших в PROCESSING, см. PaymentRepo.list_stale_processing"""
+        result = await self.db.execute(stale_processing_statement(older_than_seconds, limit))
+        return list(result.scalars().all())
@@ -0,0 +1,42 @@
+"""
+Асинхронный репозиторий задач (AsyncSession, asyncpg)
+"""
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.task import Task as DBTask
+from app.models.task import Task as ModelTask
+
+
+class AsyncTaskRepo:
+    db: AsyncSession
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_all_tasks(self) -> list[ModelTask]:
+        result = await self.db.execute(select(DBTask))
+        return [ModelTask.from_orm(t) for t in result.scalars()]
+
+    async def get_task_by_id(self, task_id: int) -> ModelTask | None:
+        db_task = await self.db.get(DBTask, task_id)
+        return ModelTask.from_orm(db_task) if db_task else None
+
+    async def create_task(self, task: ModelTask) -> ModelTask:
+        db_task = DBTask(
+            title=task.title,
+            description=task.description,
+            price=task.price,
+            customer_id=task.customer_id
+        )
+        self.db.add(db_task)
+        await self.db.flush()
+        return ModelTask.from_orm(db_task)
+
+    async def delete_task(self, task_id: int) -> bool:
+        result = await self.db.execute(
+            delete(DBTask).where(DBTask.id == task_id).execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            print(f"Task {task_id} deleted after successful payment")
+        return bool(result.rowcount)
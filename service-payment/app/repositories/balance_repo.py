@@ -0,0 +1,169 @@
+"""
+Репозиторий балансов пользователей и журнала движений.
+
+Каждое изменение баланса - один условный UPDATE ... RETURNING: проверка
+суммы и списание выполняются атомарно в БД без SELECT FOR UPDATE, поэтому
+параллельные запросы из любых воркеров и реплик не могут списать деньги дважды.
+Запись в журнал идет в той же транзакции. Не коммитит сам: транзакцией
+управляет app.unit_of_work.UnitOfWork
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.schemas.balance import Balance, BalanceLedger
+
+balances_table = Balance.__table__
+ledger_table = BalanceLedger.__table__
+
+# Начальные балансы тестовых пользователей (раньше хранились в памяти процесса)
+INITIAL_BALANCES = {
+    1: 500.0,
+    2: 200.0,
+    3: 1000.0,
+    4: 750.0,
+    5: 300.0
+}
+
+ENTRY_SEED = 'seed'
+ENTRY_RESERVE = 'reserve'
+ENTRY_RELEASE = 'release'
+ENTRY_DEBIT = 'debit'
+ENTRY_CREDIT = 'credit'
+
+_returning = (balances_table.c.user_id, balances_table.c.balance, balances_table.c.reserved)
+
+
+def reserve_statement(user_id: int, amount: float):
+    """Перенести amount из balance в reserved, если хватает средств"""
+    return (
+        update(balances_table)
+        .where(balances_table.c.user_id == user_id, balances_table.c.balance >= amount)
+        .values(balance=balances_table.c.balance - amount, reserved=balances_table.c.reserved + amount,
+                updated_at=func.now())
+        .returning(*_returning)
+    )
+
+
+def release_statement(user_id: int, amount: float):
+    """Вернуть резерв в balance (платеж не прошел)"""
+    return (
+        update(balances_table)
+        .where(balances_table.c.user_id == user_id, balances_table.c.reserved >= amount)
+        .values(balance=balances_table.c.balance + amount, reserved=balances_table.c.reserved - amount,
+                updated_at=func.now())
+        .returning(*_returning)
+    )
+
+
+def debit_reserved_statement(user_id: int, amount: float):
+    """Списать зарезервированную сумму (платеж прошел)"""
+    return (
+        update(balances_table)
+        .where(balances_table.c.user_id == user_id, balances_table.c.reserved >= amount)
+        .values(reserved=balances_table.c.reserved - amount, updated_at=func.now())
+        .returning(*_returning)
+    )
+
+
+def credit_statement(user_id: int, amount: float):
+    """Зачислить amount, создав баланс получателя при необходимости"""
+    statement = pg_insert(balances_table).values(user_id=user_id, balance=amount, reserved=0.0)
+    return statement.on_conflict_do_update(
+        index_elements=[balances_table.c.user_id],
+        set_={"balance": balances_table.c.balance + statement.excluded.balance, "updated_at": func.now()}
+    ).returning(*_returning)
+
+
+def seed_statement(balances: Dict[int, float]):
+    """Создать отсутствующие балансы; возвращает только созданные строки"""
+    rows = [{"user_id": user_id, "balance": balance, "reserved": 0.0} for user_id, balance in balances.items()]
+    return pg_insert(balances_table).values(rows).on_conflict_do_nothing().returning(*_returning)
+
+
+def ledger_entry(row, payment_id: Optional[int], entry_type: str, amount: float, reserved_delta: float = 0.0) -> dict:
+    """Запись журнала по строке, возвращенной UPDATE ... RETURNING"""
+    return {
+        "user_id": row.user_id,
+        "payment_id": payment_id,
+        "entry_type": entry_type,
+        "amount": amount,
+        "reserved_delta": reserved_delta,
+        "balance_after": row.balance,
+        "reserved_after": row.reserved,
+    }
+
+
+def ledger_statement(entries: List[dict]):
+    return insert(ledger_table).values(entries)
+
+
+def settlement_steps(from_user: int, to_user: int, amount: float):
+    """
+    Шаги перевода (statement, тип записи, изменение balance, изменение reserved)
+    в порядке возрастания user_id: встречные переводы блокируют строки
+    в одном порядке и не взаимоблокируются
+    """
+    steps = [
+        (from_user, debit_reserved_statement(from_user, amount), ENTRY_DEBIT, 0.0, -amount),
+        (to_user, credit_statement(to_user, amount), ENTRY_CREDIT, amount, 0.0),
+    ]
+    return [step[1:] for step in sorted(steps, key=lambda step: step[0])]
+
+
+class BalanceRepo:
+    db: Session
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_balance(self, user_id: int) -> float:
+        balance = self.db.execute(
+            select(balances_table.c.balance).where(balances_table.c.user_id == user_id)
+        ).scalar()
+        return balance if balance is not None else 0.0
+
+    def get_all_balances(self) -> Dict[int, float]:
+        rows = self.db.execute(
+            select(balances_table.c.user_id, balances_table.c.balance).order_by(balances_table.c.user_id)
+        )
+        return {row.user_id: row.balance for row in rows}
+
+    def reserve(self, user_id: int, amount: float, payment_id: int) -> bool:
+        """Зарезервировать сумму платежа; False, если средств недостаточно"""
+        row = self.db.execute(reserve_statement(user_id, amount)).first()
+        if row is None:
+            return False
+        self.db.execute(ledger_statement([ledger_entry(row, payment_id, ENTRY_RESERVE, -amount, amount)]))
+        return True
+
+    def release(self, user_id: int, amount: float, payment_id: int) -> bool:
+        """Вернуть резерв платежа; False, если резерва нет"""
+        row = self.db.execute(release_statement(user_id, amount)).first()
+        if row is None:
+            return False
+        self.db.execute(ledger_statement([ledger_entry(row, payment_id, ENTRY_RELEASE, amount, -amount)]))
+        return True
+
+    def settle(self, from_user: int, to_user: int, amount: float, payment_id: int) -> bool:
+        """
+        Перевести зарезервированную сумму получателю.
+        При False часть изменений уже выполнена - транзакцию нужно откатить
+        """
+        entries = []
+        for statement, entry_type, amount_delta, reserved_delta in settlement_steps(from_user, to_user, amount):
+            row = self.db.execute(statement).first()
+            if row is None:
+                return False
+            entries.append(ledger_entry(row, payment_id, entry_type, amount_delta, reserved_delta))
+        self.db.execute(ledger_statement(entries))
+        return True
+
+    def seed(self, balances: Dict[int, float]) -> int:
+        """Создать отсутствующие балансы с записью seed в журнале; возвращает число созданных"""
+        rows = self.db.execute(seed_statement(balances)).all()
+        if rows:
+            self.db.execute(ledger_statement([ledger_entry(row, None, ENTRY_SEED, row.balance) for row in rows]))
+        return len(rows)
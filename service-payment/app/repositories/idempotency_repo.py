@@ -0,0 +1,99 @@
+"""
+Репозиторий ключей идемпотентности.
+
+Выполнение по ключу захватывается вставкой строки in_progress с арендой
+locked_until (INSERT ... ON CONFLICT DO NOTHING); брошенную (аренда
+истекла) или просроченную строку забирает условный UPDATE. Оба запроса
+атомарны, поэтому выполнить запрос может только один процесс.
+Не коммитит сам: каждый шаг - отдельная короткая транзакция вызывающего кода
+"""
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.schemas.idempotency import IdempotencyKey
+
+keys_table = IdempotencyKey.__table__
+
+STATUS_IN_PROGRESS = 'in_progress'
+STATUS_COMPLETED = 'completed'
+
+
+def _by_key(scope: str, key: str):
+    return and_(keys_table.c.scope == scope, keys_table.c.key == key)
+
+
+def claim_statement(scope: str, key: str, fingerprint: str, lock_seconds: float, ttl_seconds: float):
+    return pg_insert(keys_table).values(
+        scope=scope, key=key, fingerprint=fingerprint, status=STATUS_IN_PROGRESS,
+        locked_until=func.now() + timedelta(seconds=lock_seconds),
+        expires_at=func.now() + timedelta(seconds=ttl_seconds)
+    ).on_conflict_do_nothing().returning(keys_table.c.key)
+
+
+def takeover_statement(scope: str, key: str, fingerprint: str, lock_seconds: float, ttl_seconds: float):
+    """Забрать ключ с истекшей арендой выполнения или истекшим сроком хранения"""
+    abandoned = and_(keys_table.c.status == STATUS_IN_PROGRESS, keys_table.c.locked_until < func.now())
+    return (
+        update(keys_table)
+        .where(_by_key(scope, key), or_(abandoned, keys_table.c.expires_at < func.now()))
+        .values(fingerprint=fingerprint, status=STATUS_IN_PROGRESS,
+                locked_until=func.now() + timedelta(seconds=lock_seconds),
+                expires_at=func.now() + timedelta(seconds=ttl_seconds),
+                response_code=None, response_body=None, response_headers=None)
+        .returning(keys_table.c.key)
+    )
+
+
+def get_statement(scope: str, key: str):
+    return select(
+        keys_table.c.fingerprint, keys_table.c.status, keys_table.c.response_code,
+        keys_table.c.response_body, keys_table.c.response_headers
+    ).where(_by_key(scope, key), keys_table.c.expires_at >= func.now())
+
+
+def complete_statement(scope: str, key: str, code: int, body: str, headers: dict):
+    return (
+        update(keys_table)
+        .where(_by_key(scope, key), keys_table.c.status == STATUS_IN_PROGRESS)
+        .values(status=STATUS_COMPLETED, response_code=code, response_body=body, response_headers=headers,
+                locked_until=None)
+    )
+
+
+def release_statement(scope: str, key: str):
+    """Удалить захват после ошибки: повтор с тем же ключом выполнится заново"""
+    return delete(keys_table).where(_by_key(scope, key), keys_table.c.status == STATUS_IN_PROGRESS)
+
+
+def purge_statement():
+    return delete(keys_table).where(keys_table.c.expires_at < func.now())
+
+
+class IdempotencyRepo:
+    db: Session
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def claim(self, scope: str, key: str, fingerprint: str, lock_seconds: float, ttl_seconds: float) -> bool:
+        """Захватить выполнение по ключу; False, если ключ занят или уже выполнен"""
+        if self.db.execute(claim_statement(scope, key, fingerprint, lock_seconds, ttl_seconds)).first():
+            return True
+        return self.db.execute(takeover_statement(scope, key, fingerprint, lock_seconds, ttl_seconds)).first() \
+            is not None
+
+    def get(self, scope: str, key: str) -> Optional[tuple]:
+        return self.db.execute(get_statement(scope, key)).first()
+
+    def complete(self, scope: str, key: str, code: int, body: str, headers: dict):
+        self.db.execute(complete_statement(scope, key, code, body, headers))
+
+    def release(self, scope: str, key: str):
+        self.db.execute(release_statement(scope, key))
+
+    def purge(self) -> int:
+        return self.db.execute(purge_statement()).rowcount
@@ -0,0 +1,86 @@
+"""
+Репозиторий outbox событий платежей.
+
+Запись события (add) идет в транзакции вызывающего сервиса вместе со
+сменой статуса, поэтому событие появляется тогда и только тогда, когда
+зафиксирован переход. Relay забирает пачку неотправленных событий с
+FOR UPDATE SKIP LOCKED, так что несколько экземпляров сервиса не
+публикуют одно событие одновременно. Не коммитит сам
+"""
+from datetime import datetime, timedelta
+from typing import List, Sequence
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.payment import Payment, PaymentStatus
+from app.schemas.outbox import OutboxEvent
+
+outbox_table = OutboxEvent.__table__
+
+EVENT_TYPES = {
+    PaymentStatus.COMPLETED: 'payment.completed',
+    PaymentStatus.FAILED: 'payment.failed',
+}
+
+
+def payment_event(payment: Payment) -> dict:
+    """Тело события о платеже в конечном статусе"""
+    return {
+        "payment_id": payment.id,
+        "task_id": payment.task_id,
+        "customer_user_id": payment.customer_user_id,
+        "assigned_user_id": payment.assigned_user_id,
+        "amount": payment.amount,
+        "payment_method": payment.payment_method.value,
+        "status": payment.status.value,
+        "transaction_id": payment.transaction_id,
+        "completed_at": payment.completed_at,
+        "occurred_at": datetime.now().isoformat(),
+    }
+
+
+def add_statement(payment: Payment):
+    return insert(outbox_table).values(
+        payment_id=payment.id, event_type=EVENT_TYPES[payment.status], payload=payment_event(payment)
+    )
+
+
+def pending_statement(limit: int):
+    return (
+        select(outbox_table.c.id, outbox_table.c.event_type, outbox_table.c.payload)
+        .where(outbox_table.c.sent_at.is_(None))
+        .order_by(outbox_table.c.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+
+def mark_sent_statement(event_ids: Sequence[int]):
+    return update(outbox_table).where(outbox_table.c.id.in_(event_ids)).values(sent_at=func.now())
+
+
+def purge_sent_statement(retention_seconds: float):
+    return delete(outbox_table).where(outbox_table.c.sent_at < func.now() - timedelta(seconds=retention_seconds))
+
+
+class OutboxRepo:
+    db: Session
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def add(self, payment: Payment):
+        """Записать событие о переходе платежа в COMPLETED или FAILED"""
+        self.db.execute(add_statement(payment))
+
+    def fetch_pending(self, limit: int) -> List[tuple]:
+        """Заблокировать и вернуть до limit неотправленных событий (id, event_type, payload)"""
+        return self.db.execute(pending_statement(limit)).all()
+
+    def mark_sent(self, event_ids: Sequence[int]):
+        if event_ids:
+            self.db.execute(mark_sent_statement(event_ids))
+
+    def purge_sent(self, retention_seconds: float) -> int:
+        return self.db.execute(purge_sent_statement(retention_seconds)).rowcount
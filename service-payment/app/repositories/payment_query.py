@@ -0,0 +1,86 @@
+"""
+Фильтры и keyset-пагинация списка платежей.
+
+Страницы упорядочены по (created_at, id) по убыванию, следующая страница
+начинается строго после последней строки предыдущей: WHERE (created_at, id) < курсор.
+Для каждого фильтра по пользователю, задаче или статусу есть индекс
+(колонка, created_at, id), поэтому страница читается одним проходом
+по индексу за время, не зависящее от размера таблицы.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, tuple_
+
+from app.models.payment import PaymentMethod, PaymentStatus
+from app.schemas.payment import Payment as DBPayment
+
+
+class PaymentFilter:
+    """Набор фильтров для выборки платежей. Незаданные (None) фильтры не применяются."""
+
+    def __init__(self, customer_user_id: Optional[int] = None, assigned_user_id: Optional[int] = None,
+                 task_id: Optional[int] = None, status: Optional[PaymentStatus] = None,
+                 payment_method: Optional[PaymentMethod] = None, created_from: Optional[datetime] = None,
+                 created_to: Optional[datetime] = None):
+        self.customer_user_id = customer_user_id
+        self.assigned_user_id = assigned_user_id
+        self.task_id = task_id
+        self.status = status
+        self.payment_method = payment_method
+        self.created_from = created_from
+        self.created_to = created_to
+
+    def conditions(self) -> list:
+        """Условия WHERE для заданных фильтров"""
+        candidates = [
+            (DBPayment.customer_user_id == self.customer_user_id, self.customer_user_id),
+            (DBPayment.assigned_user_id == self.assigned_user_id, self.assigned_user_id),
+            (DBPayment.task_id == self.task_id, self.task_id),
+            (DBPayment.status == self.status, self.status),
+            (DBPayment.payment_method == self.payment_method, self.payment_method),
+            (DBPayment.created_at >= self.created_from, self.created_from),
+            (DBPayment.created_at < self.created_to, self.created_to),
+        ]
+        return [condition for condition, value in candidates if value is not None]
+
+
+def encode_cursor(created_at: datetime, payment_id: int) -> str:
+    """Непрозрачный курсор страницы по последней строке"""
+    raw = json.dumps([created_at.isoformat(), payment_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Raises:
+        ValueError: Если курсор поврежден
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, payment_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(payment_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor '{cursor}'") from e
+
+
+def list_statement(payment_filter: PaymentFilter, limit: int, cursor: Optional[str] = None):
+    """
+    SELECT страницы платежей; выбирается limit + 1 строка, чтобы узнать,
+    есть ли следующая страница, без отдельного COUNT
+    """
+    statement = select(DBPayment).where(*payment_filter.conditions())
+    if cursor is not None:
+        created_at, payment_id = decode_cursor(cursor)
+        statement = statement.where(tuple_(DBPayment.created_at, DBPayment.id) < tuple_(created_at, payment_id))
+    return statement.order_by(DBPayment.created_at.desc(), DBPayment.id.desc()).limit(limit + 1)
+
+
+def split_page(rows: List[DBPayment], limit: int) -> Tuple[List[DBPayment], Optional[str]]:
+    """(строки страницы, курсор следующей страницы или None)"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].created_at, rows[-1].id)
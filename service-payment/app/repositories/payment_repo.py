@@ -1,51 +1,91 @@
 """
-Репозиторий для работы с платежами
+Репозиторий для работы с платежами.
+Не коммитит сам: транзакцией управляет app.unit_of_work.UnitOfWork
 """
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
-from app.database import get_db
 from app.schemas.payment import Payment as DBPayment
 from app.models.payment import Payment as ModelPayment, PaymentStatus, PaymentMethod
-from datetime import datetime
+from app.repositories.payment_query import PaymentFilter, list_statement, split_page
+from datetime import datetime, timedelta
+
+payments_table = DBPayment.__table__
+
+
+def to_model_payment(db_payment: DBPayment) -> ModelPayment:
+    """Строка таблицы payments -> модель API"""
+    return ModelPayment(
+        id=db_payment.id,
+        customer_user_id=db_payment.customer_user_id,
+        assigned_user_id=db_payment.assigned_user_id,
+        task_id=db_payment.task_id,
+        amount=db_payment.amount,
+        payment_method=db_payment.payment_method,
+        status=db_payment.status,
+        created_at=db_payment.created_at.isoformat() if db_payment.created_at else None,
+        completed_at=db_payment.completed_at.isoformat() if db_payment.completed_at else None,
+        transaction_id=db_payment.transaction_id
+    )
+
+
+def transition_statement(payment_id: int, expected: PaymentStatus, status: PaymentStatus,
+                         transaction_id: str = None, completed_at: datetime = None):
+    """UPDATE payments SET status = :status ... WHERE id = :id AND status = :expected RETURNING *"""
+    values = {"status": status}
+    if transaction_id:
+        values["transaction_id"] = transaction_id
+    if completed_at:
+        values["completed_at"] = completed_at
+    if status == PaymentStatus.PROCESSING:
+        values["processing_started_at"] = datetime.now()
+    return (
+        update(payments_table)
+        .where(payments_table.c.id == payment_id, payments_table.c.status == expected)
+        .values(**values)
+        .returning(*payments_table.c)
+    )
+
+
+def stale_processing_statement(older_than_seconds: int, limit: int):
+    """
+    id платежей в PROCESSING дольше older_than_seconds. У платежей, начатых до
+    появления processing_started_at, время отсчитывается от created_at
+    """
+    cutoff = datetime.now() - timedelta(seconds=older_than_seconds)
+    started_at = func.coalesce(payments_table.c.processing_started_at, payments_table.c.created_at)
+    return (
+        select(payments_table.c.id)
+        .where(payments_table.c.status == PaymentStatus.PROCESSING, started_at < cutoff)
+        .order_by(payments_table.c.id)
+        .limit(limit)
+    )
 
 
 class PaymentRepo:
     db: Session
 
-    def __init__(self):
-        self.db = next(get_db())
-
-    def get_all_payments(self) -> list[ModelPayment]:
-        payments = []
-        for p in self.db.query(DBPayment).all():
-            payments.append(ModelPayment(
-                id=p.id,
-                customer_user_id=p.customer_user_id,
-                assigned_user_id=p.assigned_user_id,
-                task_id=p.task_id,
-                amount=p.amount,
-                payment_method=p.payment_method,
-                status=p.status,
-                created_at=p.created_at.isoformat() if p.created_at else None,
-                completed_at=p.completed_at.isoformat() if p.completed_at else None,
-                transaction_id=p.transaction_id
-            ))
-        return payments
+    def __init__(self, db: Session):
+        self.db = db
+
+    def list_payments(self, payment_filter: PaymentFilter, limit: int,
+                      cursor: str = None) -> tuple[list[ModelPayment], str | None]:
+        """
+        Страница платежей по фильтрам, новые первыми
+
+        Returns:
+            (платежи, курсор следующей страницы или None)
+
+        Raises:
+            ValueError: Если курсор поврежден
+        """
+        rows = self.db.execute(list_statement(payment_filter, limit, cursor)).scalars().all()
+        rows, next_cursor = split_page(rows, limit)
+        return [to_model_payment(p) for p in rows], next_cursor
 
     def get_payment(self, payment_id: int) -> ModelPayment | None:
         db_payment = self.db.query(DBPayment).filter(DBPayment.id == payment_id).first()
         if db_payment:
-            return ModelPayment(
-                id=db_payment.id,
-                customer_user_id=db_payment.customer_user_id,
-                assigned_user_id=db_payment.assigned_user_id,
-                task_id=db_payment.task_id,
-                amount=db_payment.amount,
-                payment_method=db_payment.payment_method,
-                status=db_payment.status,
-                created_at=db_payment.created_at.isoformat() if db_payment.created_at else None,
-                completed_at=db_payment.completed_at.isoformat() if db_payment.completed_at else None,
-                transaction_id=db_payment.transaction_id
-            )
+            return to_model_payment(db_payment)
         return None
 
     def create_payment(self, payment: ModelPayment) -> ModelPayment:
@@ -64,38 +104,21 @@ class PaymentRepo:
             created_at=datetime.fromisoformat(payment.created_at) if payment.created_at else datetime.utcnow()
         )
         self.db.add(db_payment)
-        self.db.commit()
-        self.db.refresh(db_payment)
-        return ModelPayment(
-            id=db_payment.id,
-            customer_user_id=db_payment.customer_user_id,
-            assigned_user_id=db_payment.assigned_user_id,
-            task_id=db_payment.task_id,
-            amount=db_payment.amount,
-            payment_method=db_payment.payment_method,
-            status=db_payment.status,
-            created_at=db_payment.created_at.isoformat() if db_payment.created_at else None,
-            completed_at=db_payment.completed_at.isoformat() if db_payment.completed_at else None,
-            transaction_id=db_payment.transaction_id
-        )
+        self.db.flush()
+        return to_model_payment(db_payment)
 
-    def update_payment_status(self, payment_id: int, status: PaymentStatus, transaction_id: str = None, completed_at: datetime = None):
-        db_payment = self.db.query(DBPayment).filter(DBPayment.id == payment_id).first()
-        if db_payment:
-            db_payment.status = status
-            if transaction_id:
-                db_payment.transaction_id = transaction_id
-            if completed_at:
-                db_payment.completed_at = completed_at
-            self.db.commit()
-
-    def check_balance(self, user_id: int) -> float:
-        # Use task repo to get real balance
-        from .task_repo import TaskRepo
-        task_repo = TaskRepo()
-        return task_repo.get_balance(user_id)
-
-    def deduct_balance(self, user_id: int, amount: float) -> bool:
-        # Check if balance >= amount (for validation before payment)
-        current_balance = self.check_balance(user_id)
-        return current_balance >= amount
+    def transition_status(self, payment_id: int, expected: PaymentStatus, status: PaymentStatus,
+                          transaction_id: str = None, completed_at: datetime = None) -> ModelPayment | None:
+        """
+        Сменить статус, только если платеж сейчас в статусе expected (compare-and-set).
+        Один UPDATE ... RETURNING: из одновременных переходов успешен ровно один
+
+        Returns:
+            Платеж после перехода или None, если платежа нет или статус уже другой
+        """
+        row = self.db.execute(transition_statement(payment_id, expected, status, transaction_id, completed_at)).first()
+        return to_model_payment(row) if row else None
+
+    def list_stale_processing(self, older_than_seconds: int, limit: int) -> list[int]:
+        """id платежей, зависших в PROCESSING, см. stale_processing_statement"""
+        return list(self.db.execute(stale_processing_statement(older_than_seconds, limit)).scalars().all())
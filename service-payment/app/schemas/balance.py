@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, Float, DateTime, Integer, Index, func
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base(name="BaseBalance")
+
+
+class Balance(Base):
+    __tablename__ = 'balances'
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    balance = Column(Float, nullable=False, default=0.0)  # Доступно для новых платежей
+    reserved = Column(Float, nullable=False, default=0.0)  # Зарезервировано под платежи в обработке
+    updated_at = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class BalanceLedger(Base):
+    """
+    Журнал движений по балансам, только добавление записей.
+    Для каждого пользователя sum(amount) = balance, sum(reserved_delta) = reserved
+    """
+    __tablename__ = 'balance_ledger'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    payment_id = Column(Integer, nullable=True)
+    entry_type = Column(String, nullable=False)  # seed, reserve, release, debit, credit
+    amount = Column(Float, nullable=False)  # Изменение balance
+    reserved_delta = Column(Float, nullable=False, default=0.0)  # Изменение reserved
+    balance_after = Column(Float, nullable=False)
+    reserved_after = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_balance_ledger_user', 'user_id', 'id'),
+        Index('idx_balance_ledger_payment', 'payment_id'),
+    )
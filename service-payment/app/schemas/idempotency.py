@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime, JSON, func
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base(name="BaseIdempotency")
+
+
+class IdempotencyKey(Base):
+    """Результат запроса с заголовком Idempotency-Key (повтор возвращает его же)"""
+    __tablename__ = 'idempotency_keys'
+
+    scope = Column(String, primary_key=True)  # Эндпоинт: select-method, process
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)  # Хэш параметров запроса
+    status = Column(String, nullable=False)  # in_progress, completed
+    response_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    response_headers = Column(JSON, nullable=True)
+    locked_until = Column(DateTime, nullable=True)  # Аренда выполнения для in_progress
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    expires_at = Column(DateTime, nullable=False, index=True)
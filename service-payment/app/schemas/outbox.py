@@ -0,0 +1,24 @@
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, JSON, String, func, text
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base(name="BaseOutbox")
+
+
+class OutboxEvent(Base):
+    """
+    Событие платежа, записанное в одной транзакции со сменой статуса.
+    Публикуется в RabbitMQ фоновым app.outbox_relay, после подтверждения брокера sent_at заполняется
+    """
+    __tablename__ = 'payment_outbox'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    payment_id = Column(Integer, nullable=False)
+    event_type = Column(String, nullable=False)  # payment.completed, payment.failed
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Очередь неотправленных событий: relay читает ее по возрастанию id
+        Index('idx_payment_outbox_unsent', 'id', postgresql_where=text('sent_at IS NULL')),
+    )
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, String, Float, DateTime, Enum, Integer
+from datetime import datetime
+
+from sqlalchemy import Column, String, Float, DateTime, Enum, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -16,9 +18,17 @@ class Payment(Base):
     amount = Column(Float, nullable=False)
     payment_method = Column(Enum(PaymentMethod), nullable=False)
     status = Column(Enum(PaymentStatus), nullable=False, default=PaymentStatus.PENDING)
-    created_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
+    processing_started_at = Column(DateTime, nullable=True)  # для поиска зависших в PROCESSING
     transaction_id = Column(String, nullable=True)
 
-    # Note: Balance checking would require user table in this DB or API call
-    # For now, keep as is, balance is simulated
+    # Индексы под keyset-пагинацию списка (created_at, id) с фильтрами,
+    # см. app/repositories/payment_query.py
+    __table_args__ = (
+        Index('idx_payments_created', 'created_at', 'id'),
+        Index('idx_payments_customer_created', 'customer_user_id', 'created_at', 'id'),
+        Index('idx_payments_assigned_created', 'assigned_user_id', 'created_at', 'id'),
+        Index('idx_payments_task_created', 'task_id', 'created_at', 'id'),
+        Index('idx_payments_status_created', 'status', 'created_at', 'id'),
+    )
@@ -0,0 +1,141 @@
+import asyncio
+import random
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import Depends
+
+from app.async_unit_of_work import AsyncUnitOfWork, get_async_unit_of_work
+from app.models.payment import Payment, PaymentStatus, PaymentMethod
+from app.repositories.async_balance_repo import AsyncBalanceRepo
+from app.repositories.async_outbox_repo import AsyncOutboxRepo
+from app.repositories.async_payment_repo import AsyncPaymentRepo
+from app.repositories.payment_query import PaymentFilter
+from app.repositories.async_task_repo import AsyncTaskRepo
+from app.services.payment_service import PROVIDER_DELAY_SECONDS, provider_succeeded
+
+
+class AsyncPaymentService:
+    """Асинхронная версия PaymentService: те же правила, ожидание БД и провайдера не занимает поток"""
+    uow: AsyncUnitOfWork
+    repo: AsyncPaymentRepo
+    tasks: AsyncTaskRepo
+    balances: AsyncBalanceRepo
+    outbox: AsyncOutboxRepo
+
+    def __init__(self, uow: AsyncUnitOfWork = Depends(get_async_unit_of_work)):
+        self.uow = uow
+        self.repo = uow.payments
+        self.tasks = uow.tasks
+        self.balances = uow.balances
+        self.outbox = uow.outbox
+
+    async def select_payment_method(self, task_id: int, assigned_user_id: int,
+                                    payment_method: PaymentMethod) -> Payment:
+        task = await self.tasks.get_task_by_id(task_id)
+        if not task:
+            raise ValueError(f"Task {task_id} not found")
+
+        amount = task.price
+
+        payment = Payment(
+            customer_user_id=task.customer_id,
+            assigned_user_id=assigned_user_id,
+            task_id=task_id,
+            amount=amount,
+            payment_method=payment_method,
+            status=PaymentStatus.PENDING,
+            created_at=datetime.now().isoformat()
+        )
+        payment = await self.repo.create_payment(payment)
+
+        # Резервируем сумму у заказчика в той же транзакции, что и создание платежа
+        if not await self.balances.reserve(task.customer_id, amount, payment.id):
+            raise ValueError(f"Insufficient balance for customer {task.customer_id}")
+        await self.uow.commit(payment)
+        return payment
+
+    async def process_payment(self, payment_id: int) -> Payment:
+        # PROCESSING фиксируется до ответа провайдера, см. PaymentService.process_payment
+        payment = await self._begin_processing(payment_id)
+        await self.uow.commit()
+
+        await asyncio.sleep(PROVIDER_DELAY_SECONDS)  # Имитация задержки
+
+        payment = await self._finish_processing(payment.id, provider_succeeded())
+        await self.uow.commit(payment)
+        return payment
+
+    async def start_processing(self, payment_id: int) -> Payment:
+        """Перевести платеж в PROCESSING для фоновой обработки воркером"""
+        payment = await self._begin_processing(payment_id)
+        await self.uow.commit(payment)
+        return payment
+
+    async def complete_processing(self, payment_id: int, is_successful: bool) -> Payment:
+        """Завершить платеж в PROCESSING по ответу провайдера (вызывается воркером)"""
+        payment = await self._finish_processing(payment_id, is_successful)
+        await self.uow.commit()
+        return payment
+
+    async def fail_stale_processing(self, older_than_seconds: int, limit: int) -> int:
+        """Перевести зависшие в PROCESSING платежи в FAILED, см. PaymentService.fail_stale_processing"""
+        failed = 0
+        for payment_id in await self.repo.list_stale_processing(older_than_seconds, limit):
+            try:
+                await self._finish_processing(payment_id, False)
+            except (KeyError, ValueError):
+                continue  # Воркер успел завершить платеж
+            await self.uow.commit()
+            failed += 1
+        return failed
+
+    async def _begin_processing(self, payment_id: int) -> Payment:
+        payment = await self.repo.transition_status(payment_id, PaymentStatus.PENDING, PaymentStatus.PROCESSING)
+        if not payment:
+            await self._raise_transition_error(payment_id)
+        return payment
+
+    async def _finish_processing(self, payment_id: int, is_successful: bool) -> Payment:
+        completed_at = datetime.now()
+        if is_successful:
+            transaction_id = f"TXN-{random.randint(100000, 999999)}"
+            payment = await self.repo.transition_status(payment_id, PaymentStatus.PROCESSING,
+                                                        PaymentStatus.COMPLETED, transaction_id, completed_at)
+            if not payment:
+                await self._raise_transition_error(payment_id)
+
+            # Перевод зарезервированных денег от заказчика к исполнителю
+            if not await self.balances.settle(payment.customer_user_id, payment.assigned_user_id, payment.amount,
+                                              payment_id):
+                raise ValueError(f"No reserved funds for payment {payment_id}")
+            await self.tasks.delete_task(payment.task_id)
+            print("Payment transfer completed, balances updated, task deleted")
+        else:
+            payment = await self.repo.transition_status(payment_id, PaymentStatus.PROCESSING, PaymentStatus.FAILED,
+                                                        completed_at=completed_at)
+            if not payment:
+                await self._raise_transition_error(payment_id)
+            if not await self.balances.release(payment.customer_user_id, payment.amount, payment_id):
+                print(f"No reserved funds to release for payment {payment_id}")
+
+        # Событие для RabbitMQ фиксируется вместе со сменой статуса, публикует его app.outbox_relay
+        await self.outbox.add(payment)
+        return payment
+
+    async def _raise_transition_error(self, payment_id: int):
+        """Переход не выполнен: платежа нет (KeyError) или он уже в другом статусе (ValueError)"""
+        payment = await self.repo.get_payment(payment_id)
+        if not payment:
+            raise KeyError(f"Payment {payment_id} not found")
+        raise ValueError(f"Payment is already {payment.status}")
+
+    async def get_payment(self, payment_id: int) -> Payment:
+        payment = await self.repo.get_payment(payment_id)
+        if not payment:
+            raise KeyError(f"Payment {payment_id} not found")
+        return payment
+
+    async def list_payments(self, payment_filter: PaymentFilter, limit: int,
+                            cursor: Optional[str] = None) -> Tuple[List[Payment], Optional[str]]:
+        return await self.repo.list_payments(payment_filter, limit, cursor)
@@ -1,32 +1,48 @@
 import random
 import time
 from datetime import datetime
-from typing import List
+from typing import List, Optional, Tuple
+
+from fastapi import Depends
 
 from app.models.payment import Payment, PaymentStatus, PaymentMethod
+from app.repositories.balance_repo import BalanceRepo
+from app.repositories.outbox_repo import OutboxRepo
+from app.repositories.payment_query import PaymentFilter
 from app.repositories.payment_repo import PaymentRepo
 from app.repositories.task_repo import TaskRepo
+from app.unit_of_work import UnitOfWork, get_unit_of_work
+
+PROVIDER_DELAY_SECONDS = 0.1
+
+
+def provider_succeeded() -> bool:
+    """Имитация ответа платежного провайдера: 90% успешных оплат"""
+    return random.random() > 0.1
 
 
 class PaymentService:
+    uow: UnitOfWork
     repo: PaymentRepo
+    tasks: TaskRepo
+    balances: BalanceRepo
+    outbox: OutboxRepo
 
-    def __init__(self):
-        self.repo = PaymentRepo()
+    def __init__(self, uow: UnitOfWork = Depends(get_unit_of_work)):
+        self.uow = uow
+        self.repo = uow.payments
+        self.tasks = uow.tasks
+        self.balances = uow.balances
+        self.outbox = uow.outbox
 
     def select_payment_method(self, task_id: int, assigned_user_id: int, payment_method: PaymentMethod) -> Payment:
         # Get task to get customer_id and amount
-        task_repo = TaskRepo()
-        task = task_repo.get_task_by_id(task_id)
+        task = self.tasks.get_task_by_id(task_id)
         if not task:
             raise ValueError(f"Task {task_id} not found")
 
         amount = task.price
 
-        # Check balance of customer
-        if not self.repo.deduct_balance(task.customer_id, amount):
-            raise ValueError(f"Insufficient balance for customer {task.customer_id}")
-
         payment = Payment(
             customer_user_id=task.customer_id,
             assigned_user_id=assigned_user_id,
@@ -36,54 +52,109 @@ class PaymentService:
             status=PaymentStatus.PENDING,
             created_at=datetime.now().isoformat()
         )
-        return self.repo.create_payment(payment)
+        payment = self.repo.create_payment(payment)
+
+        # Резервируем сумму у заказчика в той же транзакции, что и создание платежа
+        if not self.balances.reserve(task.customer_id, amount, payment.id):
+            raise ValueError(f"Insufficient balance for customer {task.customer_id}")
+        self.uow.commit(payment)
+        return payment
 
     def process_payment(self, payment_id: int) -> Payment:
-        payment = self.repo.get_payment(payment_id)
-        if not payment:
-            raise KeyError(f"Payment {payment_id} not found")
+        # PROCESSING фиксируется до ответа провайдера: на время ожидания не держим
+        # транзакцию, соединение и блокировку строки. Если процесс упадет до
+        # второй транзакции, платеж завершит StalePaymentSweeper
+        payment = self._begin_processing(payment_id)
+        self.uow.commit()
 
-        if payment.status != PaymentStatus.PENDING:
-            raise ValueError(f"Payment is already {payment.status}")
+        time.sleep(PROVIDER_DELAY_SECONDS)  # Имитация задержки
 
-        self.repo.update_payment_status(payment_id, PaymentStatus.PROCESSING)
-        payment.status = PaymentStatus.PROCESSING
+        # Смена статуса, перевод денег и удаление задачи фиксируются одной транзакцией
+        payment = self._finish_processing(payment.id, provider_succeeded())
+        self.uow.commit(payment)
+        return payment
 
-        time.sleep(0.1)  # Имитация задержки
+    def start_processing(self, payment_id: int) -> Payment:
+        """Перевести платеж в PROCESSING для фоновой обработки воркером"""
+        payment = self._begin_processing(payment_id)
+        self.uow.commit(payment)
+        return payment
+
+    def complete_processing(self, payment_id: int, is_successful: bool) -> Payment:
+        """Завершить платеж в PROCESSING по ответу провайдера (вызывается воркером)"""
+        payment = self._finish_processing(payment_id, is_successful)
+        self.uow.commit()
+        return payment
+
+    def fail_stale_processing(self, older_than_seconds: int, limit: int) -> int:
+        """
+        Перевести в FAILED платежи, зависшие в PROCESSING, и вернуть резерв заказчику.
+        Каждый платеж фиксируется отдельной транзакцией
+
+        Returns:
+            Число переведенных в FAILED платежей
+        """
+        failed = 0
+        for payment_id in self.repo.list_stale_processing(older_than_seconds, limit):
+            try:
+                self._finish_processing(payment_id, False)
+            except (KeyError, ValueError):
+                continue  # Воркер успел завершить платеж
+            self.uow.commit()
+            failed += 1
+        return failed
+
+    def _begin_processing(self, payment_id: int) -> Payment:
+        payment = self.repo.transition_status(payment_id, PaymentStatus.PENDING, PaymentStatus.PROCESSING)
+        if not payment:
+            self._raise_transition_error(payment_id)
+        return payment
 
-        is_successful = random.random() > 0.1
+    def _finish_processing(self, payment_id: int, is_successful: bool) -> Payment:
+        completed_at = datetime.now()
         if is_successful:
             transaction_id = f"TXN-{random.randint(100000, 999999)}"
-            completed_at = datetime.now()
-            self.repo.update_payment_status(payment_id, PaymentStatus.COMPLETED, transaction_id, completed_at)
-            payment.status = PaymentStatus.COMPLETED
-            payment.transaction_id = transaction_id
-            payment.completed_at = completed_at.isoformat()
-
-            # Перевод денег от заказчика к исполнителю
-            task_repo = TaskRepo()
-            success = task_repo.transfer_payment(payment.customer_user_id, payment.assigned_user_id, payment.amount)
-            if success:
-                # Удаляем задачу после успешной оплаты и перевода денег
-                task_repo.delete_task(payment.task_id)
-
-                print("Payment transfer completed, balances updated, task deleted")
-            else:
-                print("Payment transfer failed - insufficient funds")
+            payment = self.repo.transition_status(payment_id, PaymentStatus.PROCESSING, PaymentStatus.COMPLETED,
+                                                  transaction_id, completed_at)
+            if not payment:
+                self._raise_transition_error(payment_id)
+
+            # Перевод зарезервированных денег от заказчика к исполнителю
+            if not self.balances.settle(payment.customer_user_id, payment.assigned_user_id, payment.amount,
+                                        payment_id):
+                raise ValueError(f"No reserved funds for payment {payment_id}")
+            # Удаляем задачу после успешной оплаты и перевода денег
+            self.tasks.delete_task(payment.task_id)
+            print("Payment transfer completed, balances updated, task deleted")
 
         else:
-            completed_at = datetime.now()
-            self.repo.update_payment_status(payment_id, PaymentStatus.FAILED, completed_at=completed_at)
-            payment.status = PaymentStatus.FAILED
-            payment.completed_at = completed_at.isoformat()
+            payment = self.repo.transition_status(payment_id, PaymentStatus.PROCESSING, PaymentStatus.FAILED,
+                                                  completed_at=completed_at)
+            if not payment:
+                self._raise_transition_error(payment_id)
+
+            # Возвращаем резерв заказчику
+            if not self.balances.release(payment.customer_user_id, payment.amount, payment_id):
+                print(f"No reserved funds to release for payment {payment_id}")
+
+        # Событие для RabbitMQ фиксируется вместе со сменой статуса, публикует его app.outbox_relay
+        self.outbox.add(payment)
 
         return payment
 
+    def _raise_transition_error(self, payment_id: int):
+        """Переход не выполнен: платежа нет (KeyError) или он уже в другом статусе (ValueError)"""
+        payment = self.repo.get_payment(payment_id)
+        if not payment:
+            raise KeyError(f"Payment {payment_id} not found")
+        raise ValueError(f"Payment is already {payment.status}")
+
     def get_payment(self, payment_id: int) -> Payment:
         payment = self.repo.get_payment(payment_id)
         if not payment:
             raise KeyError(f"Payment {payment_id} not found")
         return payment
 
-    def get_all_payments(self) -> List[Payment]:
-        return self.repo.get_all_payments()
+    def list_payments(self, payment_filter: PaymentFilter, limit: int,
+                      cursor: Optional[str] = None) -> Tuple[List[Payment], Optional[str]]:
+        return self.repo.list_payments(payment_filter, limit, cursor)
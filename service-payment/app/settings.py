@@ -4,6 +4,46 @@ class Settings(BaseSettings):
     amqp_url: str
     postgres_url: str
 
+    # Пул соединений SQLAlchemy
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_recycle: int = 1800  # секунды; соединения старше переоткрываются
+    db_echo: bool = False
+    # psycopg2 - синхронные обработчики в threadpool, asyncpg - async-обработчики
+    db_driver: str = 'psycopg2'
+
+    # inline - /process ждет провайдера; queued - 202 и обработка пулом воркеров
+    payment_processing_mode: str = 'inline'
+    payment_workers: int = 16
+    payment_queue_size: int = 1000
+    # Платежи в PROCESSING дольше этого (процесс остановился с платежом в очереди)
+    # переводятся в FAILED с возвратом резерва; проверка при старте и раз в интервал
+    payment_stale_seconds: int = 600
+    payment_sweep_interval: float = 60.0
+
+    # Ключи идемпотентности (заголовок Idempotency-Key)
+    idempotency_ttl_seconds: int = 86400
+    idempotency_cache_size: int = 10000
+    idempotency_lock_seconds: int = 30  # после этого брошенное выполнение забирает другой запрос
+    idempotency_wait_seconds: float = 5.0  # ожидание ключа, занятого другим процессом, до 409
+
+    # Потребление очередей RabbitMQ (app.messaging)
+    consumer_prefetch_count: int = 200
+    consumer_concurrency: int = 100
+    consumer_max_retries: int = 5
+    consumer_retry_base_delay: float = 1.0  # секунды до первого повтора, дальше пауза удваивается
+    consumer_retry_max_delay: float = 300.0
+    consumer_ack_batch_size: int = 50
+    consumer_ack_interval: float = 0.05  # секунды; неполная пачка ack отправляется не реже
+
+    # Публикация событий платежей из outbox (app.outbox_relay)
+    outbox_relay_enabled: bool = True
+    outbox_batch_size: int = 500
+    outbox_poll_interval: float = 0.5  # пауза, когда неотправленных событий меньше пачки
+    outbox_retention_seconds: int = 7 * 86400  # отправленные события старше удаляются при старте
+
     model_config = SettingsConfigDict(env_file='.env')
 
 settings = Settings()
+
+USE_ASYNC_DB: bool = settings.db_driver == 'asyncpg'
@@ -0,0 +1,66 @@
+"""
+Единица работы на время запроса: одна сессия и одна транзакция
+на все репозитории платежного потока
+"""
+from typing import Iterator
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.idempotency import pending_key
+from app.repositories.balance_repo import BalanceRepo
+from app.repositories.idempotency_repo import IdempotencyRepo
+from app.repositories.outbox_repo import OutboxRepo
+from app.repositories.payment_repo import PaymentRepo
+from app.repositories.task_repo import TaskRepo
+
+
+class UnitOfWork:
+    session: Session
+    payments: PaymentRepo
+    tasks: TaskRepo
+    balances: BalanceRepo
+    outbox: OutboxRepo
+    idempotency: IdempotencyRepo
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.payments = PaymentRepo(session)
+        self.tasks = TaskRepo(session)
+        self.balances = BalanceRepo(session)
+        self.outbox = OutboxRepo(session)
+        self.idempotency = IdempotencyRepo(session)
+
+    def commit(self, result=None):
+        """
+        Зафиксировать транзакцию
+
+        Args:
+            result: Итог операции; если запрос пришел с Idempotency-Key, ответ
+                на него сохраняется по ключу в этой же транзакции
+        """
+        pending = pending_key(result)
+        if pending is not None:
+            self.idempotency.complete(*pending.complete_args(result))
+        self.session.commit()
+        if pending is not None:
+            pending.committed()
+
+    def rollback(self):
+        self.session.rollback()
+
+
+def get_unit_of_work() -> Iterator[UnitOfWork]:
+    """
+    Зависимость FastAPI: открывает сессию на запрос и всегда закрывает ее.
+    Репозитории не коммитят сами - сервис вызывает commit() один раз в конце
+    операции, а все незакоммиченное при ошибке откатывается
+    """
+    session = SessionLocal()
+    try:
+        yield UnitOfWork(session)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
@@ -0,0 +1,94 @@
+"""
+Пропускная способность app.messaging.MessageConsumer (сообщений в секунду)
+для разных prefetch_count.
+
+Для каждого значения --prefetch скрипт публикует --messages сообщений во
+временную очередь, запускает потребитель с обработчиком, ждущим
+--handler-ms миллисекунд (имитация ввода-вывода), и измеряет время до
+подтверждения всех сообщений.
+
+Запуск (нужен RabbitMQ из AMQP_URL / .env):
+    cd service-payment && python -m benchmarks.bench_consumer --messages 50000 --prefetch 10,100,500
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from aio_pika import Message, connect_robust
+
+from app.messaging import MessageConsumer, retry_queue_name
+from app.settings import settings
+
+QUEUE_NAME = 'bench_consumer'
+
+
+async def publish(connection, count: int):
+    channel = await connection.channel()
+    queue = await channel.declare_queue(QUEUE_NAME, durable=True)
+    await queue.purge()
+    for start in range(0, count, 1000):
+        await asyncio.gather(*(
+            channel.default_exchange.publish(
+                Message(json.dumps({"type": "bench", "n": n}).encode(), content_type='application/json'),
+                routing_key=QUEUE_NAME)
+            for n in range(start, min(start + 1000, count))
+        ))
+    await channel.close()
+
+
+async def measure(connection, args, prefetch: int) -> float:
+    await publish(connection, args.messages)
+    done = asyncio.Event()
+    handled = 0
+    consumer = MessageConsumer(QUEUE_NAME, prefetch_count=prefetch, concurrency=args.concurrency or prefetch,
+                               ack_batch_size=max(1, min(args.ack_batch_size, prefetch)))
+
+    @consumer.route('bench')
+    async def handle(data: dict):
+        nonlocal handled
+        if args.handler_ms:
+            await asyncio.sleep(args.handler_ms / 1000)
+        handled += 1
+        if handled == args.messages:
+            done.set()
+
+    started = time.perf_counter()
+    await consumer.start(connection)
+    await done.wait()
+    await consumer.stop()
+    return args.messages / (time.perf_counter() - started)
+
+
+async def run(args) -> int:
+    connection = await connect_robust(args.amqp_url or settings.amqp_url)
+    try:
+        for prefetch in args.prefetch:
+            rate = await measure(connection, args, prefetch)
+            print(f"prefetch {prefetch:>5}: {rate:>9.0f} messages/s")
+        channel = await connection.channel()
+        cleanup = MessageConsumer(QUEUE_NAME)
+        for name in [QUEUE_NAME, cleanup.parking_queue] + [retry_queue_name(QUEUE_NAME, delay)
+                                                          for delay in set(cleanup.retry_delays)]:
+            await channel.queue_delete(name)
+    finally:
+        await connection.close()
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--prefetch", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[1, 10, 100, 500])
+    parser.add_argument("--concurrency", type=int, default=0, help="По умолчанию равна prefetch")
+    parser.add_argument("--ack-batch-size", type=int, default=50)
+    parser.add_argument("--handler-ms", type=float, default=1.0)
+    parser.add_argument("--amqp-url", default=None, help="По умолчанию AMQP_URL из настроек")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Пропускная способность relay outbox (events/sec) для разных размеров пачки.
+
+Для каждого --batch-sizes скрипт добавляет в payment_outbox --events
+событий типа bench.payment, публикует их через OutboxRelay.relay_batch
+до опустошения outbox и проверяет, что во временную очередь,
+привязанную к bench.#, пришло каждое событие (повторы допускаются,
+это at-least-once). Обычные события payment.* публикуются попутно и в
+расчет не входят.
+
+Запуск (нужны БД из POSTGRES_URL и RabbitMQ из AMQP_URL / .env):
+    cd service-payment && python -m benchmarks.bench_outbox_relay --events 20000 --batch-sizes 1,100,500
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from aio_pika import connect_robust
+from sqlalchemy import text
+
+from app.database import create_tables, engine
+from app.outbox_relay import OutboxRelay, PAYMENT_EVENTS_EXCHANGE, declare_topology
+from app.settings import settings
+
+BENCH_EVENT_TYPE = 'bench.payment'
+
+SEED_SQL = """
+INSERT INTO payment_outbox (payment_id, event_type, payload)
+SELECT g, :event_type, json_build_object('payment_id', g, 'status', 'completed')
+FROM generate_series(1, :events) AS g
+"""
+
+
+def seed(events: int):
+    with engine.begin() as conn:
+        conn.execute(text(SEED_SQL), {"event_type": BENCH_EVENT_TYPE, "events": events})
+
+
+async def measure(connection, events: int, batch_size: int) -> tuple:
+    """(events/sec, получено уникальных событий)"""
+    exchange = await declare_topology(connection)
+    channel = await connection.channel()
+    queue = await channel.declare_queue(exclusive=True, auto_delete=True)
+    await queue.bind(PAYMENT_EVENTS_EXCHANGE, 'bench.#')
+    received = set()
+
+    async def on_message(message):
+        received.add(message.message_id)
+        await message.ack()
+
+    await queue.consume(on_message)
+    await asyncio.to_thread(seed, events)
+
+    relay = OutboxRelay(batch_size, poll_interval=0)
+    started = time.perf_counter()
+    while await relay.relay_batch(exchange):
+        pass
+    elapsed = time.perf_counter() - started
+
+    deadline = time.monotonic() + 10
+    while len(received) < events and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    await channel.close()
+    return events / elapsed, len(received)
+
+
+async def run(args) -> int:
+    create_tables()
+    failures = 0
+    connection = await connect_robust(args.amqp_url or settings.amqp_url)
+    try:
+        for batch_size in args.batch_sizes:
+            rate, received = await measure(connection, args.events, batch_size)
+            lost = args.events - received
+            failures += lost > 0
+            print(f"{'FAIL' if lost else 'ok  '} batch {batch_size:>5}: {rate:>9.0f} events/s, "
+                  f"received {received}/{args.events}")
+    finally:
+        await connection.close()
+    print("OK" if not failures else "some events were not delivered")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--batch-sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[1, 100, 500])
+    parser.add_argument("--amqp-url", default=None, help="По умолчанию AMQP_URL из настроек")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Нагрузочный тест платежного API: постоянная конкурентность --concurrency
+в течение --duration секунд, вывод RPS и задержек p50/p99.
+
+Сценарии:
+    read    - GET /api/payment/{id} по заранее созданным платежам;
+    process - select-method + process (ожидание провайдера 100 мс).
+
+Сравнение синхронной и асинхронной сборки при одинаковом CPU - сервер
+запускается дважды на одном ядре:
+    DB_DRIVER=psycopg2 taskset -c 0 uvicorn app.main:app --port 8000
+    DB_DRIVER=asyncpg  taskset -c 0 uvicorn app.main:app --port 8000
+
+Запуск:
+    cd service-payment && python -m benchmarks.bench_sync_vs_async --scenario read --concurrency 200
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+
+async def prepare(client: httpx.AsyncClient, count: int) -> list:
+    """Создать задачи (и для сценария read - платежи по ним); возвращает id"""
+    task_ids = []
+    for index in range(count):
+        response = await client.post("/api/payment/test/create-task", params={
+            "title": f"bench-{index}", "description": "", "price": 0.01, "customer_id": 3
+        })
+        response.raise_for_status()
+        task_ids.append(response.json()["id"])
+    return task_ids
+
+
+async def select_method(client: httpx.AsyncClient, task_id: int) -> int:
+    response = await client.post("/api/payment/select-method", params={
+        "task_id": task_id, "assigned_user_id": 1, "payment_method": "card"
+    })
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def run(args) -> int:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        task_ids = await prepare(client, args.prepare)
+        payment_ids = [await select_method(client, task_id) for task_id in task_ids] if args.scenario == "read" else []
+        next_task = iter(task_ids)
+
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + args.duration
+
+        async def one_request():
+            if args.scenario == "read":
+                return await client.get(f"/api/payment/{payment_ids[len(latencies) % len(payment_ids)]}")
+            task_id = next(next_task, None)
+            if task_id is None:
+                raise RuntimeError("prepared tasks are exhausted, increase --prepare")
+            payment_id = await select_method(client, task_id)
+            return await client.post("/api/payment/process", params={"payment_id": payment_id})
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await one_request()
+                    if response.status_code >= 500:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] if latencies else 0.0
+    print(f"{args.scenario}: {len(latencies)} ok, {errors} failed in {elapsed:.1f} s, "
+          f"{len(latencies) / elapsed:.0f} req/s, p50 {statistics.median(latencies) if latencies else 0.0:.1f} ms, "
+          f"p99 {p99:.1f} ms")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=("read", "process"), default="read")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--prepare", type=int, default=2000, help="Сколько задач создать заранее")
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
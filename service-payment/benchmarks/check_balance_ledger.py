@@ -0,0 +1,106 @@
+"""
+Проверка балансов под конкурентной нагрузкой: --transfers переводов между
+--users пользователями из --threads потоков, каждый перевод - отдельная
+транзакция (резерв, затем перевод или возврат резерва, как в платежном потоке).
+
+Проверяется, что:
+- ни один баланс не ушел в минус (нет двойного списания);
+- сумма денег пользователей не изменилась, резервов не осталось;
+- по каждому пользователю сумма записей журнала равна балансу.
+
+Каждый запуск использует новых пользователей (ID от --base-user), журнал
+только дополняется.
+
+Запуск (нужна БД из POSTGRES_URL / .env):
+    cd service-payment && python -m benchmarks.check_balance_ledger --transfers 5000 --threads 15
+"""
+import argparse
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, select
+
+from app.database import SessionLocal, create_tables
+from app.repositories.balance_repo import BalanceRepo, balances_table, ledger_table
+
+
+def transfer(users: list, amount: float) -> str:
+    """Один перевод в своей транзакции; возвращает исход"""
+    from_user, to_user = random.sample(users, 2)
+    with SessionLocal() as session:
+        repo = BalanceRepo(session)
+        if not repo.reserve(from_user, amount, None):
+            session.rollback()
+            return "insufficient"
+        if random.random() < 0.1:
+            repo.release(from_user, amount, None)
+            outcome = "released"
+        elif repo.settle(from_user, to_user, amount, None):
+            outcome = "settled"
+        else:
+            session.rollback()
+            return "settle_failed"
+        session.commit()
+        return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--transfers", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=15)
+    parser.add_argument("--initial", type=float, default=100.0)
+    parser.add_argument("--amount", type=float, default=7.0)
+    parser.add_argument("--base-user", type=int, default=int(time.time()) % 1_000_000 * 1000 + 1_000_000_000)
+    args = parser.parse_args()
+
+    create_tables()
+    users = list(range(args.base_user, args.base_user + args.users))
+    with SessionLocal() as session:
+        BalanceRepo(session).seed({user_id: args.initial for user_id in users})
+        session.commit()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        outcomes = list(executor.map(lambda _: transfer(users, args.amount), range(args.transfers)))
+    elapsed = time.perf_counter() - started
+
+    failures = []
+    with SessionLocal() as session:
+        rows = session.execute(
+            select(balances_table.c.user_id, balances_table.c.balance, balances_table.c.reserved)
+            .where(balances_table.c.user_id.in_(users))
+        ).all()
+        ledger = {
+            row.user_id: row for row in session.execute(
+                select(ledger_table.c.user_id, func.sum(ledger_table.c.amount).label("amount"),
+                       func.sum(ledger_table.c.reserved_delta).label("reserved"))
+                .where(ledger_table.c.user_id.in_(users))
+                .group_by(ledger_table.c.user_id)
+            )
+        }
+
+    total = sum(row.balance + row.reserved for row in rows)
+    if abs(total - args.initial * args.users) > 1e-6:
+        failures.append(f"total money {total:.2f} != {args.initial * args.users:.2f}")
+    for row in rows:
+        if row.balance < 0 or row.reserved < 0:
+            failures.append(f"user {row.user_id}: balance {row.balance}, reserved {row.reserved}")
+        if abs(row.reserved) > 1e-6:
+            failures.append(f"user {row.user_id}: {row.reserved} left reserved")
+        entry = ledger.get(row.user_id)
+        if entry is None or abs(entry.amount - row.balance) > 1e-6 or abs(entry.reserved - row.reserved) > 1e-6:
+            failures.append(f"user {row.user_id}: ledger does not match balance {row.balance}")
+
+    counts = {outcome: outcomes.count(outcome) for outcome in sorted(set(outcomes))}
+    print(f"{args.transfers} transfers in {elapsed:.2f} s ({args.transfers / elapsed:.0f}/s): {counts}")
+    for failure in failures[:20]:
+        print(f"FAIL {failure}")
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
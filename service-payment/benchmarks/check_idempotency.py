@@ -0,0 +1,75 @@
+"""
+Проверка ключей идемпотентности на запущенном сервисе: --concurrency
+одновременных select-method и затем process с одним Idempotency-Key.
+
+Ожидается, что создан ровно один платеж, все ответы одинаковы,
+повторы помечены заголовком Idempotent-Replayed, а ключ с другими
+параметрами отклоняется с 422.
+
+Запуск:
+    cd service-payment && python -m benchmarks.check_idempotency --url http://localhost:8000
+"""
+import argparse
+import asyncio
+import sys
+import uuid
+
+import httpx
+
+
+async def run(args) -> int:
+    failures = []
+    async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+        task = (await client.post("/api/payment/test/create-task", params={
+            "title": "idempotency-check", "description": "", "price": 1.0, "customer_id": 3
+        })).json()
+
+        params = {"task_id": task["id"], "assigned_user_id": 1, "payment_method": "card"}
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        responses = await asyncio.gather(*(
+            client.post("/api/payment/select-method", params=params, headers=headers)
+            for _ in range(args.concurrency)
+        ))
+        bodies = {response.text for response in responses}
+        replayed = sum(response.headers.get("Idempotent-Replayed") == "true" for response in responses)
+        created = len((await client.get("/api/payment/", params={"task_id": task["id"]})).json())
+        if len(bodies) != 1 or responses[0].status_code != 200:
+            failures.append(f"select-method: {len(bodies)} distinct responses, statuses "
+                            f"{sorted({response.status_code for response in responses})}")
+        if created != 1:
+            failures.append(f"select-method: {created} payments created")
+        if replayed != args.concurrency - 1:
+            failures.append(f"select-method: {replayed} replayed responses, expected {args.concurrency - 1}")
+
+        mismatch = await client.post("/api/payment/select-method", params={**params, "assigned_user_id": 2},
+                                     headers=headers)
+        if mismatch.status_code != 422:
+            failures.append(f"reused key with other params: HTTP {mismatch.status_code}")
+
+        payment_id = responses[0].json()["id"]
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+        responses = await asyncio.gather(*(
+            client.post("/api/payment/process", params={"payment_id": payment_id}, headers=headers)
+            for _ in range(args.concurrency)
+        ))
+        statuses = sorted({response.status_code for response in responses})
+        if len({response.text for response in responses}) != 1 or statuses[-1] >= 400:
+            failures.append(f"process: statuses {statuses}, {len({r.text for r in responses})} distinct bodies")
+
+    print(f"{args.concurrency} concurrent requests per endpoint")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
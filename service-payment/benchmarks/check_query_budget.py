@@ -0,0 +1,104 @@
+"""
+Бюджет SQL-запросов на эндпоинт: каждый запрос сценария выполняется через
+TestClient, число выполненных SQL-операторов считается событием SQLAlchemy
+before_cursor_execute и сравнивается с бюджетом. Превышение любого бюджета
+завершает скрипт с кодом 1 - так ловятся N+1 и лишние SELECT перед UPDATE.
+
+Учитываются DB_DRIVER (синхронный или асинхронный движок) и
+PAYMENT_PROCESSING_MODE (в режиме queued /process только меняет статус).
+
+Запуск (нужна БД из POSTGRES_URL / .env):
+    cd service-payment && python -m benchmarks.check_query_budget
+"""
+import argparse
+import sys
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import create_tables, engine, seed_balances
+from app.payment_workers import QUEUED_PROCESSING, payment_workers
+from app.settings import USE_ASYNC_DB
+
+statements = []
+
+
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    engines = [engine]
+    if USE_ASYNC_DB:
+        from app.async_database import async_engine
+        from app.endpoints.async_payment_router import async_payment_router as router
+        engines.append(async_engine.sync_engine)
+    else:
+        from app.endpoints.payment_router import payment_router as router
+    app.include_router(router, prefix='/api')
+    if QUEUED_PROCESSING:
+        app.add_event_handler("startup", payment_workers.start)
+    for counted_engine in engines:
+        event.listen(counted_engine, "before_cursor_execute", count_statement)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--verbose", action="store_true", help="Печатать SQL каждого запроса")
+    args = parser.parse_args()
+
+    create_tables()
+    seed_balances()
+    results = []
+
+    with TestClient(build_app()) as client:
+        def measure(name: str, budget: int, method: str, path: str, **kwargs):
+            statements.clear()
+            response = client.request(method, path, **kwargs)
+            results.append((name, budget, len(statements), response.status_code, list(statements)))
+            return response
+
+        task = measure("POST /test/create-task", 1, "POST", "/api/payment/test/create-task", params={
+            "title": "query-budget", "description": "", "price": 1.0, "customer_id": 3
+        }).json()
+        select_params = {"task_id": task["id"], "assigned_user_id": 1, "payment_method": "card"}
+        # задача, платеж, резерв, запись журнала
+        payment = measure("POST /select-method", 4, "POST", "/api/payment/select-method",
+                          params=select_params).json()
+        key = {"Idempotency-Key": str(uuid.uuid4())}
+        # + захват и сохранение ключа
+        measure("POST /select-method (new key)", 6, "POST", "/api/payment/select-method",
+                params=select_params, headers=key)
+        measure("POST /select-method (repeated key)", 0, "POST", "/api/payment/select-method",
+                params=select_params, headers=key)
+        measure("GET /{payment_id}", 1, "GET", f"/api/payment/{payment['id']}")
+        measure("GET /", 1, "GET", "/api/payment/")
+        measure("GET /?customer_user_id", 1, "GET", "/api/payment/", params={"customer_user_id": 3, "limit": 10})
+        # два перехода статуса, списание резерва, зачисление, журнал, удаление задачи, событие в outbox
+        measure("POST /process", 1 if QUEUED_PROCESSING else 7, "POST", "/api/payment/process",
+                params={"payment_id": payment["id"]})
+        # неудавшийся переход и чтение статуса для текста ошибки
+        measure("POST /process (already processed)", 2, "POST", "/api/payment/process",
+                params={"payment_id": payment["id"]})
+        measure("GET /users/{user_id}/balance", 1, "GET", "/api/payment/users/3/balance")
+        measure("GET /users/balances", 1, "GET", "/api/payment/users/balances")
+        measure("GET /test/tasks", 1, "GET", "/api/payment/test/tasks")
+
+    failures = 0
+    for name, budget, count, status_code, executed in results:
+        over = count > budget
+        failures += over
+        print(f"{'FAIL' if over else 'ok  '} {name:<36} {count:>2} / {budget} statements (HTTP {status_code})")
+        if args.verbose or over:
+            for statement in executed:
+                print(f"       {' '.join(statement.split())[:160]}")
+    print("OK" if not failures else f"{failures} endpoint(s) over budget")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Проверка утечек соединений: --requests последовательных запросов к
+платежному API (создание задачи, выбор метода оплаты, оплата, чтение,
+ошибки 400/404) через TestClient.
+
+После каждого запроса пул не должен держать выданных соединений,
+каждый запрос берет из пула не больше одного соединения (одна сессия
+на запрос), а число физических соединений не растет выше
+pool_size + max_overflow.
+
+Запуск (нужна БД из POSTGRES_URL / .env):
+    cd service-payment && python -m benchmarks.check_session_leaks --requests 1000
+"""
+import argparse
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import create_tables, engine
+from app.endpoints.payment_router import payment_router
+from app.settings import settings
+
+counters = {"connect": 0, "checkout": 0, "checkin": 0}
+
+
+def _count(name):
+    def listener(*args):
+        counters[name] += 1
+    return listener
+
+
+def scenario(client: TestClient, step: int):
+    """Очередной запрос сценария; возвращает ответ"""
+    kind = step % 6
+    if kind == 0:
+        return client.post("/api/payment/test/create-task", params={
+            "title": f"leak-check-{step}", "description": "", "price": 1.0, "customer_id": 3
+        })
+    if kind == 1:
+        task_id = client.get("/api/payment/test/tasks").json()[-1]["id"]
+        return client.post("/api/payment/select-method", params={
+            "task_id": task_id, "assigned_user_id": 1, "payment_method": "card"
+        })
+    if kind == 2:
+        payment_id = client.get("/api/payment/", params={"limit": 1}).json()[0]["id"]
+        return client.post("/api/payment/process", params={"payment_id": payment_id})
+    if kind == 3:
+        return client.get("/api/payment/999999999")
+    if kind == 4:
+        return client.post("/api/payment/select-method", params={
+            "task_id": 999999999, "assigned_user_id": 1, "payment_method": "card"
+        })
+    return client.get("/api/payment/users/balances")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    create_tables()
+    app = FastAPI()
+    app.include_router(payment_router, prefix='/api')
+    for name in counters:
+        event.listen(engine, name, _count(name))
+
+    failures = []
+    max_connections = settings.db_pool_size + settings.db_max_overflow
+    with TestClient(app) as client:
+        for step in range(args.requests):
+            before = counters["checkout"]
+            response = scenario(client, step)
+            if response.status_code >= 500:
+                failures.append(f"step {step}: HTTP {response.status_code}")
+            # Сценарные шаги 1-2 делают по два HTTP-запроса
+            expected = 2 if step % 6 in (1, 2) else 1
+            if counters["checkout"] - before > expected:
+                failures.append(f"step {step}: {counters['checkout'] - before} checkouts for {expected} request(s)")
+            if engine.pool.checkedout():
+                failures.append(f"step {step}: {engine.pool.checkedout()} connection(s) still checked out")
+                break
+
+    if counters["checkout"] != counters["checkin"]:
+        failures.append(f"checkouts {counters['checkout']} != checkins {counters['checkin']}")
+    if counters["connect"] > max_connections:
+        failures.append(f"{counters['connect']} physical connections opened, limit {max_connections}")
+
+    print(f"{args.requests} scenario steps: {counters['checkout']} checkouts, {counters['checkin']} checkins, "
+          f"{counters['connect']} connections opened, pool: {engine.pool.status()}")
+    for failure in failures[:20]:
+        print(f"FAIL {failure}")
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Проверка планов GET /api/payment/: каждая комбинация фильтров из
+app/repositories/payment_query.py должна читаться по индексу без Seq Scan
+и без сортировки, а первая и глубокая (по курсору) страницы - занимать
+одинаковое время.
+
+Скрипт в одной транзакции добавляет в payments --rows строк, выполняет
+ANALYZE и EXPLAIN ANALYZE для каждой комбинации, после чего откатывает
+транзакцию.
+
+Запуск (нужна БД из POSTGRES_URL / .env):
+    cd service-payment && python -m benchmarks.explain_payment_listing --rows 5000000
+"""
+import argparse
+import enum
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.database import create_tables, engine
+from app.models.payment import PaymentMethod, PaymentStatus
+from app.repositories.payment_query import PaymentFilter, encode_cursor, list_statement
+
+SEED_SQL = """
+INSERT INTO payments (customer_user_id, assigned_user_id, task_id, amount, payment_method, status, created_at)
+SELECT g % 100000, (g * 7) % 100000, g, (g % 1000) / 10.0,
+       (ARRAY['CARD', 'BANK_TRANSFER', 'ELECTRONIC_WALLET', 'CRYPTO'])[1 + g % 4]::paymentmethod,
+       (ARRAY['PENDING', 'PROCESSING', 'COMPLETED', 'FAILED'])[1 + g % 4]::paymentstatus,
+       now() - (g % 1000000) * interval '1 minute'
+FROM generate_series(1, :rows) AS g
+"""
+
+FILTER_VALUES = {
+    "customer_user_id": 42,
+    "assigned_user_id": 42,
+    "task_id": 4242,
+    "status": PaymentStatus.PROCESSING,
+    "created_from": datetime.now() - timedelta(days=30),
+}
+
+
+def explain(conn, payment_filter: PaymentFilter, limit: int, cursor=None):
+    """(план, время выполнения в мс)"""
+    compiled = list_statement(payment_filter, limit, cursor).compile(dialect=postgresql.dialect())
+    # Enum в БД хранится по имени члена
+    params = {name: value.name if isinstance(value, enum.Enum) else value for name, value in compiled.params.items()}
+    started = time.perf_counter()
+    plan = conn.exec_driver_sql(f"EXPLAIN ANALYZE {compiled}", params).scalars().all()
+    return "\n".join(plan), (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    create_tables()
+    failures = 0
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            conn.execute(text(SEED_SQL), {"rows": args.rows})
+            conn.exec_driver_sql("ANALYZE payments")
+
+            combos = [()] + [(name,) for name in FILTER_VALUES] + [("customer_user_id", "status"),
+                                                                    ("assigned_user_id", "created_from")]
+            for names in combos:
+                payment_filter = PaymentFilter(**{name: FILTER_VALUES[name] for name in names})
+                plan, first_ms = explain(conn, payment_filter, args.limit)
+                deep_cursor = encode_cursor(datetime.now() - timedelta(days=600), 2 ** 31 - 1)
+                _, deep_ms = explain(conn, payment_filter, args.limit, deep_cursor)
+                bad = "Seq Scan" in plan or "Sort" in plan
+                failures += bad
+                print(f"{'FAIL' if bad else 'ok  '} {'+'.join(names) or 'no filters':<32} "
+                      f"first page {first_ms:.1f} ms, deep page {deep_ms:.1f} ms")
+                if args.verbose or bad:
+                    print("     " + plan.replace("\n", "\n     "))
+            # payment_method без отдельного индекса: фильтруется поверх индекса (created_at, id)
+            _, method_ms = explain(conn, PaymentFilter(payment_method=PaymentMethod.CRYPTO), args.limit)
+            print(f"info payment_method only                first page {method_ms:.1f} ms")
+        finally:
+            transaction.rollback()
+
+    print("OK" if not failures else f"{failures} plan(s) use Seq Scan or Sort")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""
+Тесты версии страницы для ETag (routers/conditional.py)
+"""
+from routers.conditional import make_etag, rows_version
+
+
+def test_rows_version_empty_page():
+    assert rows_version([]) == (0, None, None)
+
+
+def test_rows_version_skips_null_updated_at():
+    rows = [
+        {"id": 1, "updated_at": None},
+        {"id": 2, "updated_at": "2024-05-01 10:00:00"},
+        {"id": 3, "updated_at": None},
+    ]
+    assert rows_version(rows) == (3, 6, "2024-05-01 10:00:00")
+
+
+def test_rows_version_all_null_updated_at():
+    rows = [{"id": 1, "updated_at": None}, {"id": 2, "updated_at": None}]
+    assert rows_version(rows) == (2, 3, None)
+
+
+def test_rows_version_matches_db_page_version():
+    # get_*_page_version возвращает (count, sum(id), max(updated_at)), где max пропускает NULL
+    rows = [{"id": 4, "updated_at": None}, {"id": 5, "updated_at": "2024-05-02 08:30:00"}]
+    db_version = (2, 9, "2024-05-02 08:30:00")
+    assert make_etag("tasks", *rows_version(rows)) == make_etag("tasks", *db_version)